@@ -1,40 +1,90 @@
+from functools import wraps
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from flasgger import Swagger
+from app import config
+from app.utils.event_loop import worker_loop
+from app.utils.json_provider import OrjsonProvider
+from app.utils.pool_metrics import PoolMetrics
 
 # Initialize the database instance
 db = SQLAlchemy()
 
-DATABASE_URL = 'postgresql+asyncpg://postgres:@localhost/book_management_system'
-engine = create_async_engine(DATABASE_URL, echo=True)
+DATABASE_URL = config.DATABASE_URL
 
-# Create an AsyncSession
-async_session = sessionmaker(
+def _create_engine(url):
+    return create_async_engine(
+        url,
+        echo=config.SQL_ECHO,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args={
+            # SQLAlchemy's prepared statement cache and asyncpg's own
+            'prepared_statement_cache_size': config.DB_STATEMENT_CACHE_SIZE,
+            'statement_cache_size': config.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+# Primary: every write, and reads that must see the client's own recent writes
+engine = _create_engine(DATABASE_URL)
+pool_metrics = PoolMetrics()
+pool_metrics.attach(engine)
+
+# Read replicas, used by read-only sessions (see app.utils.replica_router)
+replica_engines = [_create_engine(url) for url in config.DATABASE_REPLICA_URLS]
+
+# Create an AsyncSession; use app.utils.db_utils.read_session/write_session rather than this directly
+async_session = async_sessionmaker(
     bind=engine,
-    class_=AsyncSession,
     expire_on_commit=False,
 )
 
+class BookManagementApp(Flask):
+    """Flask app whose async views all run on the process-wide worker loop."""
+
+    json_provider_class = OrjsonProvider
+
+    def async_to_sync(self, func):
+        # Flask's default (asgiref) spins up a fresh event loop per request, which
+        # discards every pooled asyncpg connection. Run on the long-lived loop instead.
+        @wraps(func)
+        def run(*args, **kwargs):
+            return worker_loop.run(func(*args, **kwargs))
+        return run
+
 def create_app():
-    app = Flask(__name__)
+    app = BookManagementApp(__name__)
 
     Swagger(app)
     # Configure the app
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL # Update with your DB URI
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL # Set through the DATABASE_URL environment variable
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Disable track modifications
     
     # Initialize the database with the app
     db.init_app(app)
-    
-    # Set the db.session to the async sessionmaker
-    db.session = scoped_session(async_session)
 
     # Import and register blueprints here
-    from app.routes import book_routes, generate_summary, review_routes
+    from app.routes import book_routes, generate_summary, job_routes, metrics_routes, review_routes
     app.register_blueprint(book_routes.bp)
     app.register_blueprint(generate_summary.bp)
+    app.register_blueprint(job_routes.bp)
+    app.register_blueprint(metrics_routes.bp)
     app.register_blueprint(review_routes.bp)
 
+    # Compress JSON/NDJSON bodies; registered first so it runs after every other hook
+    from app.utils.compression import compress_response
+    app.after_request(compress_response)
+
+    # Pin a client's reads to the primary briefly after its own writes
+    from app.utils.replica_router import remember_write
+    app.after_request(remember_write)
+
+    # Register CLI commands (flask <command>)
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import click
+from app import config
+from app.services import summary_service  # Registers the generate_summary job handler
+from app.services.auth_service import create_api_key, create_user, revoke_api_key, set_password
+from app.services.batch_summary import Checkpoint, directory_content, select_book_ids, summarize_books
+from app.services.jobs import JobRunner
+from app.services.rating_service import reconcile_ratings
+from app.services.review_import import import_reviews, IMPORT_BATCH_SIZE
+from app.utils.db_utils import write_session
+from app.utils.ingest import iter_records
+
+# File extensions understood by the import commands
+IMPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'json': 'application/json',
+}
+
+
+@click.command('reconcile-ratings')
+def reconcile_ratings_command():
+    """Recompute every book's review_count/rating_sum from the reviews table."""
+    async def run():
+        async with write_session() as session:
+            fixed = await reconcile_ratings(session)
+        return fixed
+
+    fixed = asyncio.run(run())
+    click.echo(f"Reconciled rating aggregates for {fixed} book(s)")
+
+
+@click.command('import-reviews')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(sorted(IMPORT_FORMATS)),
+              help='Input format; defaults to the file extension.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True,
+              help='Reviews written per COPY and aggregate update.')
+def import_reviews_command(path, file_format, batch_size):
+    """Stream reviews from an NDJSON, CSV or JSON file into the database."""
+    file_format = file_format or path.rsplit('.', 1)[-1].lower()
+    if file_format not in IMPORT_FORMATS:
+        raise click.BadParameter(f"cannot infer the format of {path}; pass --format", param_hint='--format')
+
+    with open(path, 'rb') as stream:
+        report = asyncio.run(import_reviews(iter_records(stream, IMPORT_FORMATS[file_format]), batch_size))
+
+    click.echo(f"Inserted {report.inserted} review(s), {report.failed} failed")
+    for error in report.errors:
+        click.echo(f"  row {error['row']}: {error['error']}", err=True)
+
+
+@click.command('run-jobs')
+@click.option('--concurrency', default=max(config.JOB_CONCURRENCY, 1), show_default=True,
+              help='Jobs run at once by this process.')
+def run_jobs_command(concurrency):
+    """Run queued background jobs (e.g. summaries) until interrupted."""
+    click.echo(f"Running jobs, {concurrency} at a time")
+    asyncio.run(JobRunner(concurrency, config.JOB_POLL_INTERVAL).serve())
+
+
+@click.command('summarize-books')
+@click.option('--content-dir', required=True, type=click.Path(exists=True, file_okay=False),
+              help='Directory holding each book\'s text as <book_id>.txt.')
+@click.option('--id', 'ids', multiple=True, type=int, help='Book to summarize; repeatable. Defaults to every book.')
+@click.option('--genre', help='Only books of this genre.')
+@click.option('--author', help='Only books by this author.')
+@click.option('--missing-only', is_flag=True, help='Only books that have no summary yet.')
+@click.option('--concurrency', default=config.SUMMARY_BATCH_CONCURRENCY, show_default=True,
+              help='Books summarized at once.')
+@click.option('--batch-size', default=config.SUMMARY_BATCH_SIZE, show_default=True,
+              help='Summaries stored per UPDATE.')
+@click.option('--attempts', default=config.SUMMARY_BATCH_ATTEMPTS, show_default=True,
+              help='Tries per book, with exponential backoff, before it is reported as failed.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='File recording finished books; rerun with the same file to resume after a crash.')
+def summarize_books_command(content_dir, ids, genre, author, missing_only, concurrency, batch_size, attempts, checkpoint):
+    """(Re)generate the summaries of many books, e.g. after a model upgrade."""
+    async def run():
+        book_ids = await select_book_ids(ids, genre, author, missing_only)
+        click.echo(f"Summarizing {len(book_ids)} book(s), {concurrency} at a time")
+        return await summarize_books(
+            book_ids,
+            directory_content(content_dir),
+            concurrency=concurrency,
+            batch_size=batch_size,
+            attempts=attempts,
+            checkpoint=Checkpoint(checkpoint) if checkpoint else None,
+        )
+
+    report = asyncio.run(run())
+    click.echo(f"Summarized {report.summarized} book(s), {report.skipped} skipped, {report.failed} failed")
+    for error in report.errors:
+        click.echo(f"  book {error['book_id']}: {error['error']}", err=True)
+
+
+@click.command('create-user')
+@click.argument('username')
+@click.password_option(help='Prompted for when omitted.')
+def create_user_command(username, password):
+    """Create an API user; only a salted hash of the password is stored."""
+    user_id = asyncio.run(create_user(username, password))
+    click.echo(f"Created user {username} (id {user_id})")
+
+
+@click.command('set-password')
+@click.argument('username')
+@click.password_option(help='Prompted for when omitted.')
+def set_password_command(username, password):
+    """Change a user's password."""
+    if not asyncio.run(set_password(username, password)):
+        raise click.ClickException(f"No user named {username}")
+    click.echo(f"Password changed; other workers stop accepting the old one within {config.AUTH_CACHE_TTL}s")
+
+
+@click.command('create-api-key')
+@click.argument('username')
+@click.option('--name', help='What the key is for, e.g. the client using it.')
+def create_api_key_command(username, name):
+    """Issue an API key for a user. The key is shown once; only its hash is stored."""
+    key = asyncio.run(create_api_key(username, name))
+    if key is None:
+        raise click.ClickException(f"No user named {username}")
+    click.echo(key)
+
+
+@click.command('revoke-api-key')
+@click.argument('prefix')
+def revoke_api_key_command(prefix):
+    """Revoke an API key by its prefix (the part after bms_)."""
+    if not asyncio.run(revoke_api_key(prefix)):
+        raise click.ClickException(f"No live API key with prefix {prefix}")
+    click.echo(f"Revoked; workers stop accepting it within {config.AUTH_CACHE_TTL}s")
+
+
+def register_commands(app):
+    app.cli.add_command(reconcile_ratings_command)
+    app.cli.add_command(import_reviews_command)
+    app.cli.add_command(run_jobs_command)
+    app.cli.add_command(summarize_books_command)
+    app.cli.add_command(create_user_command)
+    app.cli.add_command(set_password_command)
+    app.cli.add_command(create_api_key_command)
+    app.cli.add_command(revoke_api_key_command)
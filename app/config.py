@@ -0,0 +1,113 @@
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Database
+DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql+asyncpg://postgres:@localhost/book_management_system')
+# Comma separated read replica URLs; read-only sessions are spread across them round-robin
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+# Seconds a replica is skipped after failing to hand out a connection
+REPLICA_FAILURE_COOLDOWN = _env_int('REPLICA_FAILURE_COOLDOWN', 30)
+# Seconds after a client's own write during which its reads go to the primary (0 disables)
+READ_YOUR_WRITES_SECONDS = _env_int('READ_YOUR_WRITES_SECONDS', 5)
+# Log every SQL statement; very expensive, only for local debugging
+SQL_ECHO = _env_bool('SQL_ECHO', False)
+
+# Connection pool, per worker process: size it so workers * (size + overflow) stays under the server's max_connections
+DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)  # seconds to wait for a free connection
+DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)  # seconds before a connection is replaced
+DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+# Prepared statements cached per connection; set to 0 behind PgBouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = _env_int('DB_STATEMENT_CACHE_SIZE', 100)
+
+# In-process cache for single-book and summary reads
+BOOK_CACHE_MAX_ENTRIES = _env_int('BOOK_CACHE_MAX_ENTRIES', 10000)
+BOOK_CACHE_TTL = _env_int('BOOK_CACHE_TTL', 300)  # seconds
+BOOK_CACHE_MAX_BYTES = _env_int('BOOK_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+# Worker processes `python run.py` starts, each with its own per-worker cache
+WEB_CONCURRENCY = _env_int('WEB_CONCURRENCY', os.cpu_count() or 1)
+# Shared tier behind the per-worker cache: 'local' (none), 'sqlite' or 'redis'. With several workers
+# it defaults to 'sqlite', so a write in one worker invalidates the copies (and ETags) of the others.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite' if WEB_CONCURRENCY > 1 else 'local').strip().lower()
+# redis:// URL for the redis backend, database file path for the sqlite backend
+CACHE_URL = os.environ.get('CACHE_URL', '')
+# With a shared tier, per-worker copies live at most this long in case an invalidation is missed
+CACHE_LOCAL_TTL = _env_int('CACHE_LOCAL_TTL', 30)
+# How often a worker checks the sqlite backend for other workers' invalidations
+CACHE_SYNC_INTERVAL_MS = _env_int('CACHE_SYNC_INTERVAL_MS', 200)
+
+# Response compression; bodies smaller than COMPRESS_MIN_SIZE bytes are sent as they are (-1 disables)
+COMPRESS_MIN_SIZE = _env_int('COMPRESS_MIN_SIZE', 1024)
+COMPRESS_GZIP_LEVEL = _env_int('COMPRESS_GZIP_LEVEL', 6)
+COMPRESS_BROTLI_QUALITY = _env_int('COMPRESS_BROTLI_QUALITY', 4)
+COMPRESS_ZSTD_LEVEL = _env_int('COMPRESS_ZSTD_LEVEL', 3)
+
+# Background jobs: runners per worker process (0 leaves jobs to `flask run-jobs`)
+JOB_CONCURRENCY = _env_int('JOB_CONCURRENCY', 2)
+# Seconds an idle runner waits before checking for jobs enqueued by other processes
+JOB_POLL_INTERVAL = _env_int('JOB_POLL_INTERVAL', 2)
+# Seconds after which a running job is presumed abandoned (its process died) and retried
+JOB_TIMEOUT = _env_int('JOB_TIMEOUT', 600)
+JOB_MAX_ATTEMPTS = _env_int('JOB_MAX_ATTEMPTS', 3)
+# Days finished jobs stay queryable through GET /jobs/<id>
+JOB_RETENTION_DAYS = _env_int('JOB_RETENTION_DAYS', 7)
+
+# Text generation backend: 'ollama' (an Ollama server) or 'fake' (deterministic, for load tests)
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'ollama').strip().lower()
+LLM_URL = os.environ.get('LLM_URL', 'http://localhost:11434')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'llama3.1')
+LLM_TIMEOUT = _env_int('LLM_TIMEOUT', 120)  # seconds per call; for streams, per fragment
+LLM_CONNECT_TIMEOUT = _env_int('LLM_CONNECT_TIMEOUT', 5)
+# Pooled connections to the model server, per process
+LLM_MAX_CONNECTIONS = _env_int('LLM_MAX_CONNECTIONS', 16)
+# Model calls in flight at once per process; streamed summaries are refused with 503 while all are taken
+LLM_MAX_CONCURRENCY = _env_int('LLM_MAX_CONCURRENCY', 8)
+LLM_BUSY_RETRY_AFTER = _env_int('LLM_BUSY_RETRY_AFTER', 10)  # seconds, sent as Retry-After
+# Simulated latency of the fake backend: before the first fragment, and between fragments
+FAKE_LLM_LATENCY_MS = _env_int('FAKE_LLM_LATENCY_MS', 0)
+FAKE_LLM_TOKEN_LATENCY_MS = _env_int('FAKE_LLM_TOKEN_LATENCY_MS', 0)
+
+# Long content is summarized map-reduce: chunks of this many (estimated) tokens, summarized in parallel
+SUMMARY_CHUNK_TOKENS = _env_int('SUMMARY_CHUNK_TOKENS', 3000)
+# Model calls one summary makes at once
+SUMMARY_PARALLELISM = _env_int('SUMMARY_PARALLELISM', 4)
+
+# Batch summarization (`flask summarize-books`, POST /books/generate-summaries): books summarized at once,
+# summaries stored per UPDATE, and attempts per book before it is reported as failed
+SUMMARY_BATCH_CONCURRENCY = _env_int('SUMMARY_BATCH_CONCURRENCY', 8)
+SUMMARY_BATCH_SIZE = _env_int('SUMMARY_BATCH_SIZE', 100)
+SUMMARY_BATCH_ATTEMPTS = _env_int('SUMMARY_BATCH_ATTEMPTS', 3)
+
+# Authentication: scrypt cost of new password/key hashes (a power of two), and how long and how
+# many verified credentials each process remembers before checking the hash again
+AUTH_SCRYPT_N = _env_int('AUTH_SCRYPT_N', 2 ** 14)
+AUTH_CACHE_TTL = _env_int('AUTH_CACHE_TTL', 60)  # seconds; also bounds how long a revoked key keeps working elsewhere
+AUTH_CACHE_MAX_ENTRIES = _env_int('AUTH_CACHE_MAX_ENTRIES', 10000)
+# Hash checks each process runs at once; more wait, so failed logins cannot occupy every thread
+AUTH_MAX_CONCURRENCY = _env_int('AUTH_MAX_CONCURRENCY', 2)
+
+# Token-bucket rate limits, as "<requests>/<second|minute|hour>" (empty disables one): per client
+# (user, else address) and per route across all clients. Exceeding either answers 429 with Retry-After.
+RATE_LIMIT_ENABLED = _env_bool('RATE_LIMIT_ENABLED', True)
+RATE_LIMIT_SUMMARY = os.environ.get('RATE_LIMIT_SUMMARY', '20/minute')
+RATE_LIMIT_SUMMARY_TOTAL = os.environ.get('RATE_LIMIT_SUMMARY_TOTAL', '600/minute')
+RATE_LIMIT_BOOKS = os.environ.get('RATE_LIMIT_BOOKS', '120/minute')
+RATE_LIMIT_BOOKS_TOTAL = os.environ.get('RATE_LIMIT_BOOKS_TOTAL', '6000/minute')
+RATE_LIMIT_BULK = os.environ.get('RATE_LIMIT_BULK', '10/minute')
+RATE_LIMIT_BULK_TOTAL = os.environ.get('RATE_LIMIT_BULK_TOTAL', '')
+# Failed credential checks (each one a full hash) per client address; once spent, the address gets 429s
+# before anything is hashed until a token is back. Valid credentials never take a token.
+RATE_LIMIT_AUTH = os.environ.get('RATE_LIMIT_AUTH', '10/minute')
+RATE_LIMIT_AUTH_TOTAL = os.environ.get('RATE_LIMIT_AUTH_TOTAL', '')
+# Where the buckets live: 'memory' (per worker) or 'redis' (shared; RATE_LIMIT_URL, else CACHE_URL)
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').strip().lower()
+RATE_LIMIT_URL = os.environ.get('RATE_LIMIT_URL', '')
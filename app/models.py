@@ -1,11 +1,50 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, Computed, event, func
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import deferred
 
 # Initialize the database instance
 db = SQLAlchemy()
 
+# Weighted document searched by /books/search: title ranks above author, author above summary
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'C')"
+)
+
+# Bumps updated_at when a book's own columns change and reviews_updated_at when its rating
+# aggregates do, whichever code path (or manual SQL) writes the row. clock_timestamp() rather
+# than now() keeps the versions increasing when a transaction waited on the row lock.
+BOOKS_TOUCH_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION books_touch() RETURNS trigger AS $$
+BEGIN
+    IF (NEW.title, NEW.author, NEW.genre, NEW.year_published, NEW.summary)
+       IS DISTINCT FROM (OLD.title, OLD.author, OLD.genre, OLD.year_published, OLD.summary) THEN
+        NEW.updated_at := clock_timestamp();
+    END IF;
+    IF (NEW.review_count, NEW.rating_sum) IS DISTINCT FROM (OLD.review_count, OLD.rating_sum) THEN
+        NEW.reviews_updated_at := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+BOOKS_TOUCH_TRIGGER_SQL = "CREATE TRIGGER books_touch BEFORE UPDATE ON books FOR EACH ROW EXECUTE FUNCTION books_touch()"
+
 # Book model definition
 class Book(db.Model):
     __tablename__ = 'books'
+    # Back the filters and sorts of GET /books; (column, id) pairs serve keyset pagination
+    __table_args__ = (
+        db.Index('ix_books_author_id', 'author', 'id'),
+        db.Index('ix_books_title_id', 'title', 'id'),
+        db.Index('ix_books_year_published_id', 'year_published', 'id'),
+        db.Index('ix_books_genre_year_published_id', 'genre', 'year_published', 'id'),
+        # Full-text search over title/author/summary and fuzzy author matching for /books/search
+        db.Index('ix_books_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_books_author_trgm', 'author', postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -13,6 +52,14 @@ class Book(db.Model):
     genre = db.Column(db.String(100), nullable=True)
     year_published = db.Column(db.Integer, nullable=True)
     summary = db.Column(db.Text, nullable=True) 
+    # Rating aggregates kept in step with `reviews` by the review write paths
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    # Versions behind the ETag/Last-Modified validators, set by the books_touch trigger
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    reviews_updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Maintained by PostgreSQL; deferred so ORM loads never pull it
+    search_vector = deferred(db.Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
     
     # Relationship to reviews
     reviews = db.relationship('Review', backref='book', lazy=True, cascade="all, delete-orphan")
@@ -20,9 +67,17 @@ class Book(db.Model):
     def __repr__(self):
         return f"<Book {self.title} by {self.author}>"
 
+event.listen(Book.__table__, 'after_create', DDL(BOOKS_TOUCH_FUNCTION_SQL).execute_if(dialect='postgresql'))
+event.listen(Book.__table__, 'after_create', DDL(BOOKS_TOUCH_TRIGGER_SQL).execute_if(dialect='postgresql'))
+
 # Review model definition
 class Review(db.Model):
     __tablename__ = 'reviews'
+    # Serve per-book lookups: keyset pages by recency, and by rating / min_rating
+    __table_args__ = (
+        db.Index('ix_reviews_book_id_id', 'book_id', 'id'),
+        db.Index('ix_reviews_book_id_rating_id', 'book_id', 'rating', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     review_text = db.Column(db.Text, nullable=False)
@@ -30,4 +85,72 @@ class Review(db.Model):
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
     
     def __repr__(self):
-        return f"<Review {self.rating}/5 for Book ID {self.book_id}>"
\ No newline at end of file
+        return f"<Review {self.rating}/5 for Book ID {self.book_id}>"
+
+# Background job definition (see app/services/jobs.py)
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    # Runners claim the oldest pending job; finished jobs drop out of the index
+    __table_args__ = (
+        db.Index('ix_jobs_pending', 'created_at', postgresql_where=db.text("status IN ('queued', 'running')")),
+        # At most one pending job per dedupe key, so identical requests share one job
+        db.Index('ux_jobs_dedupe_key_pending', 'dedupe_key', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(JSONB, nullable=False)
+    dedupe_key = db.Column(db.String(200), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', server_default='queued')
+    result = db.Column(JSONB, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.kind} {self.id} {self.status}>"
+
+# Generated summaries by content hash (see app/services/summary_cache.py)
+class SummaryCache(db.Model):
+    __tablename__ = 'summary_cache'
+
+    # sha256 of the model, prompt templates, chunking settings and normalized content
+    content_hash = db.Column(db.String(64), primary_key=True)
+    model = db.Column(db.String(100), nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<SummaryCache {self.content_hash[:12]} ({self.model})>"
+
+# API users (see app/services/auth_service.py); passwords are stored as salted scrypt hashes
+class User(db.Model):
+    __tablename__ = 'users'
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(150), nullable=False, unique=True)
+    password_hash = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    api_keys = db.relationship('ApiKey', backref='user', lazy=True, cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<User {self.username}>"
+
+# API keys, looked up by their public prefix and verified against the hash of the secret part
+class ApiKey(db.Model):
+    __tablename__ = 'api_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    prefix = db.Column(db.String(16), nullable=False, unique=True)
+    key_hash = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+    revoked_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ApiKey {self.prefix} of user {self.user_id}>"
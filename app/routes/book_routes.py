@@ -1,7 +1,18 @@
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, Response, request, jsonify, abort
 from app import db
-from app.models import Book, Review
-from app.utils.db_utils import db_session
+from app.models import Book
+from app.schemas import book_schema
+from app.services.book_import import import_books
+from app.services.rating_service import average_rating
+from app.utils.cache import book_cache, invalidate_book, invalidate_reviews
+from app.utils.conditional import Validators, is_conditional, make_etag, to_version
+from app.utils.db_utils import read_session, write_session
+from app.utils.ingest import iter_records
+from app.utils.json_provider import dumps_bytes
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit, parse_sort, order_by_keyset, keyset_after
+from app.utils.query_params import parse_int_arg
+from app.utils.rate_limit import rate_limit
+from app.utils.streaming import iterate_async
 from sqlalchemy import func
 from flasgger.utils import swag_from
 from app.utils.decorators.auth import authenticate
@@ -9,9 +20,24 @@ from app.utils.decorators.auth import authenticate
 # Define a blueprint for book-related routes
 bp = Blueprint('book_routes', __name__)
 
+# Columns clients may sort by; each has a matching (column, id) index
+SORTABLE_FIELDS = ('id', 'title', 'author', 'year_published')
+
+# Text search configuration used by the search_vector column
+SEARCH_CONFIG = 'english'
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Rows fetched per round trip when streaming the catalogue
+STREAM_BATCH_SIZE = 1000
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
 # Route to add a new book (POST /books)
-@authenticate
 @bp.route('/books', methods=['POST'])
+@authenticate
 async def add_book():
     """
     Add a new book
@@ -80,74 +106,387 @@ async def add_book():
         year_published=data.get('year_published'),
         summary=data.get('summary')
     )
-    async with db_session() as session:
+    async with write_session() as session:
         session.add(new_book)
-        await session.commit()
     
     return jsonify({"message": "Book added successfully", "book_id": new_book.id}), 201
 
-# Route to get all books (GET /books)
+# Route to bulk import books (POST /books/bulk)
+@bp.route('/books/bulk', methods=['POST'])
 @authenticate
-@bp.route('/books', methods=['GET'])
-async def get_books():
+@rate_limit('bulk')
+async def add_books_bulk():
     """
-    Retrieve all books
+    Bulk import books from a JSON array, NDJSON or CSV body
     ---
     security:
       - BasicAuth: []  # Requires Basic Authentication
-    responses:
-      200:
-        description: A list of all books
+    consumes:
+      - application/json
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - name: books
+        in: body
+        required: true
+        description: >
+          Books with the same fields as POST /books, as a JSON array, one JSON object
+          per line (NDJSON) or CSV with a header row. NDJSON and CSV are streamed.
         schema:
           type: array
           items:
             type: object
             properties:
-              id:
-                type: integer
-                description: The ID of the book.
-                example: 1
               title:
                 type: string
-                description: The title of the book.
                 example: "The Great Gatsby"
               author:
                 type: string
-                description: The author of the book.
                 example: "F. Scott Fitzgerald"
               genre:
                 type: string
-                description: The genre of the book.
                 example: "Fiction"
               year_published:
                 type: integer
-                description: The year the book was published.
                 example: 1925
               summary:
                 type: string
-                description: A brief summary of the book.
                 example: "A novel set in the 1920s."
+    responses:
+      200:
+        description: Import report; invalid rows are skipped and listed in `errors`
+        schema:
+          type: object
+          properties:
+            inserted:
+              type: integer
+              example: 99998
+            failed:
+              type: integer
+              example: 2
+            errors:
+              type: array
+              items:
+                type: object
+                properties:
+                  row:
+                    type: integer
+                    description: 1-based position of the record in the upload.
+                    example: 17
+                  error:
+                    type: string
+                    example: "Missing required field: title"
+            errors_truncated:
+              type: boolean
+              description: True when more rows failed than are listed.
+              example: false
+      400:
+        description: Body is not a valid JSON array
+      415:
+        description: Unsupported content type
       401:
         description: Unauthorized access
       500:
         description: Internal server error
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
     """
-    async with db_session() as session:
-        books = await session.execute(db.select(Book))
-        books_list = books.scalars().all()
-        
-        return jsonify([{
-            "id": book.id,
-            "title": book.title,
-            "author": book.author,
-            "genre": book.genre,
-            "year_published": book.year_published,
-            "summary": book.summary
-        } for book in books_list]), 200
-    
-# Route to get a book by ID (GET /books/<id>)
+    records = iter_records(request.stream, request.mimetype)
+    report = await import_books(records)
+
+    return jsonify(report.to_dict()), 200
+
+# Route to get all books (GET /books)
+@bp.route('/books', methods=['GET'])
+@authenticate
+@rate_limit('books')
+async def get_books():
+    """
+    Retrieve books, one keyset-paginated page at a time
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of books to return (default 100, max 1000).
+        example: 100
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Opaque cursor taken from the `next_cursor` of the previous page.
+      - name: stream
+        in: query
+        type: string
+        enum: [ndjson, json]
+        required: false
+        description: Stream every book as NDJSON or as a JSON array instead of returning a page.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma separated columns to return (`id` and the sort column are always included). Defaults to every column.
+        example: "title,author"
+      - name: author
+        in: query
+        type: string
+        required: false
+        description: Only return books by this exact author.
+        example: "F. Scott Fitzgerald"
+      - name: genre
+        in: query
+        type: string
+        required: false
+        description: Only return books of this exact genre.
+        example: "Fiction"
+      - name: year_min
+        in: query
+        type: integer
+        required: false
+        description: Only return books published in or after this year.
+        example: 1900
+      - name: year_max
+        in: query
+        type: integer
+        required: false
+        description: Only return books published in or before this year.
+        example: 1950
+      - name: sort
+        in: query
+        type: string
+        enum: [id, -id, title, -title, author, -author, year_published, -year_published]
+        required: false
+        description: Sort column, prefixed with - for descending order. Defaults to id.
+        example: "-year_published"
+    responses:
+      200:
+        description: A page of books
+        schema:
+          type: object
+          properties:
+            books:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                    description: The ID of the book.
+                    example: 1
+                  title:
+                    type: string
+                    description: The title of the book.
+                    example: "The Great Gatsby"
+                  author:
+                    type: string
+                    description: The author of the book.
+                    example: "F. Scott Fitzgerald"
+                  genre:
+                    type: string
+                    description: The genre of the book.
+                    example: "Fiction"
+                  year_published:
+                    type: integer
+                    description: The year the book was published.
+                    example: 1925
+                  summary:
+                    type: string
+                    description: A brief summary of the book.
+                    example: "A novel set in the 1920s."
+            next_cursor:
+              type: string
+              description: Cursor for the next page, null on the last page.
+              example: "WyJpZCIsMTAwLDEwMF0"
+      400:
+        description: Invalid limit, cursor, stream mode, fields, filter or sort
+      401:
+        description: Unauthorized access
+      500:
+        description: Internal server error
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
+    """
+    stream_mode = request.args.get('stream')
+    sort, descending = parse_sort(request.args.get('sort'), SORTABLE_FIELDS)
+    sort_column = getattr(Book, sort)
+
+    # The sort column is always selected so the next cursor can be built from the last row
+    fields = book_schema.parse_fields(request.args.get('fields'), always=('id', sort))
+    query = order_by_keyset(_filter_books(book_schema.select(fields)), sort_column, Book.id, descending)
+    if stream_mode is not None:
+        if stream_mode not in STREAM_FORMATS:
+            abort(400, description="stream must be one of: ndjson, json")
+        return _stream_books(stream_mode, query, fields)
+
+    limit = parse_limit(request.args.get('limit'))
+    query = query.limit(limit + 1)
+    after = request.args.get('after')
+    if after:
+        cursor = decode_cursor(after)
+        if len(cursor) != 3 or cursor[0] != request.args.get('sort', 'id'):
+            abort(400, description="Cursor does not match the requested sort")
+        query = keyset_after(query, sort_column, Book.id, cursor[1], cursor[2], descending)
+
+    async with read_session() as session:
+        books = await session.execute(query)
+        books_list = books.all()
+
+    next_cursor = None
+    if len(books_list) > limit:
+        books_list = books_list[:limit]
+        last = books_list[-1]
+        next_cursor = encode_cursor(request.args.get('sort', 'id'), getattr(last, sort), last.id)
+
+    return jsonify({
+        "books": book_schema.dump_many(books_list, fields),
+        "next_cursor": next_cursor
+    }), 200
+
+def _filter_books(query):
+    """Apply the author/genre/year filters from the query string; each one is backed by an index on `books`."""
+    if 'author' in request.args:
+        query = query.where(Book.author == request.args['author'])
+    if 'genre' in request.args:
+        query = query.where(Book.genre == request.args['genre'])
+
+    year_min = parse_int_arg(request.args, 'year_min')
+    if year_min is not None:
+        query = query.where(Book.year_published >= year_min)
+    year_max = parse_int_arg(request.args, 'year_max')
+    if year_max is not None:
+        query = query.where(Book.year_published <= year_max)
+
+    return query
+
+def _stream_books(stream_mode, query, fields):
+    """Stream every matching book from a server-side cursor, one batch in memory at a time."""
+    async def generate():
+        if stream_mode == 'json':
+            yield b'['
+        first = True
+        # Server-side cursors only live inside a transaction; autocommit reads cannot open one
+        async with read_session(snapshot=True) as session:
+            result = await session.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+            async for partition in result.partitions():
+                encoded = [dumps_bytes(book) for book in book_schema.dump_many(partition, fields)]
+                if stream_mode == 'ndjson':
+                    yield b''.join(line + b'\n' for line in encoded)
+                else:
+                    yield (b'' if first else b',') + b','.join(encoded)
+                first = False
+        if stream_mode == 'json':
+            yield b']'
+
+    return Response(iterate_async(generate), mimetype=STREAM_FORMATS[stream_mode])
+
+# Route to search books (GET /books/search)
+@bp.route('/books/search', methods=['GET'])
 @authenticate
+@rate_limit('books')
+async def search_books():
+    """
+    Full-text search over book titles, authors and summaries
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Search terms; supports quoted phrases, OR and -exclusions.
+        example: "jazz age"
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of results to return (default 20, max 100).
+        example: 20
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma separated columns to return (`id` is always included). Defaults to every column.
+        example: "title,author"
+    responses:
+      200:
+        description: Books ranked by relevance
+        schema:
+          type: object
+          properties:
+            match:
+              type: string
+              enum: [fulltext, fuzzy_author]
+              description: Whether results came from the full-text index or the fuzzy author fallback.
+              example: "fulltext"
+            books:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                    description: The ID of the book.
+                    example: 1
+                  title:
+                    type: string
+                    description: The title of the book.
+                    example: "The Great Gatsby"
+                  rank:
+                    type: number
+                    format: float
+                    description: Relevance of the book to the query.
+                    example: 0.6
+      400:
+        description: Missing query or invalid parameters
+      401:
+        description: Unauthorized access
+      500:
+        description: Internal server error
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        abort(400, description="Missing required query parameter: q")
+
+    limit = parse_limit(request.args.get('limit'), default=SEARCH_PAGE_SIZE, maximum=MAX_SEARCH_PAGE_SIZE)
+    fields = book_schema.parse_fields(request.args.get('fields'))
+
+    # Ranked full-text match, served by the GIN index on search_vector
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank(Book.search_vector, tsquery).label('rank')
+    fulltext = (
+        book_schema.select(fields, rank)
+        .where(Book.search_vector.op('@@')(tsquery))
+        .order_by(rank.desc(), Book.id)
+        .limit(limit)
+    )
+
+    async with read_session() as session:
+        books = (await session.execute(fulltext)).all()
+        match = 'fulltext'
+
+        if not books:
+            # Fall back to trigram similarity on the author, served by the pg_trgm GIN index
+            similarity = func.similarity(Book.author, q).label('rank')
+            fuzzy = (
+                book_schema.select(fields, similarity)
+                .where(Book.author.op('%')(q))
+                .order_by(similarity.desc(), Book.id)
+                .limit(limit)
+            )
+            books = (await session.execute(fuzzy)).all()
+            match = 'fuzzy_author'
+
+    return jsonify({"match": match, "books": book_schema.dump_many(books, fields, extra=('rank',))}), 200
+
+# Route to get a book by ID (GET /books/<id>)
 @bp.route('/books/<int:id>', methods=['GET'])
+@authenticate
 async def get_book(id):
     """
     Retrieve a book by ID
@@ -161,9 +500,25 @@ async def get_book(id):
         required: true
         description: The ID of the book to retrieve.
         example: 1
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma separated columns to return (`id` is always included). Defaults to every column.
+        example: "title,author"
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of the copy the client holds; answered with 304 if it is still current.
+      - name: If-Modified-Since
+        in: header
+        type: string
+        required: false
+        description: Checked only without If-None-Match.
     responses:
       200:
-        description: A book object
+        description: A book object, with ETag and Last-Modified headers
         schema:
           type: object
           properties:
@@ -191,6 +546,8 @@ async def get_book(id):
               type: string
               description: A brief summary of the book.
               example: "A novel set in the 1920s."
+      304:
+        description: The client's copy is current; no body
       404:
         description: Book not found
         schema:
@@ -204,25 +561,46 @@ async def get_book(id):
       500:
         description: Internal server error
     """
-    async with db_session() as session:
-        book = await session.execute(db.select(Book).filter_by(id=id))
-        book = book.scalars().first()
-        
-        if not book:
+    fields = book_schema.parse_fields(request.args.get('fields'))
+
+    # The cache holds the whole row so any `fields` projection can be served from it
+    cached = await book_cache.get(f'book:{id}')
+    if cached is None:
+        async with read_session() as session:
+            if is_conditional():
+                # Revalidate against the version alone before fetching the row
+                updated_at = await session.scalar(db.select(Book.updated_at).filter_by(id=id))
+                if updated_at is None:
+                    abort(404, description="Book not found")
+                validators = _book_validators(id, to_version(updated_at), fields)
+                if validators.not_modified():
+                    return validators.not_modified_response()
+
+            row = await session.execute(book_schema.select(None, Book.updated_at).filter_by(id=id))
+            row = row.first()
+
+        if not row:
             abort(404, description="Book not found")
-        
-        return jsonify({
-            "id": book.id,
-            "title": book.title,
-            "author": book.author,
-            "genre": book.genre,
-            "year_published": book.year_published,
-            "summary": book.summary
-        }), 200
+
+        cached = {
+            "book": book_schema.dump(row),
+            "version": to_version(row.updated_at),
+        }
+        await book_cache.set(f'book:{id}', cached)
+
+    validators = _book_validators(id, cached["version"], fields)
+    if validators.not_modified():
+        return validators.not_modified_response()
+
+    return validators.apply(jsonify(book_schema.project(cached["book"], fields))), 200
+
+
+def _book_validators(id, version, fields):
+    return Validators(make_etag('book', id, version, ','.join(fields)), version)
 
 # Route to update a book by ID (PUT /books/<id>)
-@authenticate
 @bp.route('/books/<int:id>', methods=['PUT'])
+@authenticate
 async def update_book(id):
     """
     Update a book by ID
@@ -287,7 +665,7 @@ async def update_book(id):
     """
     data = request.get_json()
     
-    async with db_session() as session:
+    async with write_session() as session:
         book = await session.execute(db.select(Book).filter_by(id=id))
         book = book.scalars().first()
 
@@ -299,14 +677,13 @@ async def update_book(id):
         book.genre = data.get('genre', book.genre)
         book.year_published = data.get('year_published', book.year_published)
         book.summary = data.get('summary', book.summary)
-        
-        await session.commit()
-        
-        return jsonify({"message": "Book updated successfully"}), 200
+
+    await invalidate_book(id)
+    return jsonify({"message": "Book updated successfully"}), 200
 
 # Route to delete a book by ID (DELETE /books/<id>)
-@authenticate
 @bp.route('/books/<int:id>', methods=['DELETE'])
+@authenticate
 async def delete_book(id):
     """
     Delete a book by ID
@@ -342,21 +719,22 @@ async def delete_book(id):
       500:
         description: Internal server error
     """
-    async with db_session() as session:
+    async with write_session() as session:
         book = await session.execute(db.select(Book).filter_by(id=id))
         book = book.scalars().first()
         
         if not book:
             abort(404, description="Book not found")
         
-        session.delete(book)
-        await session.commit()
-        
-        return jsonify({"message": "Book deleted successfully"}), 200
+        await session.delete(book)
+
+    await invalidate_book(id)
+    await invalidate_reviews(id)
+    return jsonify({"message": "Book deleted successfully"}), 200
 
 # Route to get summary for a book by ID (GET /books/<id>/summary)
-@authenticate
 @bp.route('/books/<int:id>/summary', methods=['GET'])
+@authenticate
 async def get_book_summary(id):
     """
     Retrieve a book's summary and average rating by ID
@@ -398,17 +776,20 @@ async def get_book_summary(id):
       500:
         description: Internal server error
     """
-    async with db_session() as session:
-        book = await session.execute(db.select(Book).filter_by(id=id))
-        book = book.scalars().first()
-        
-        # Calculate the average rating
-        avg_rating_result = await session.execute(
-            db.select(func.avg(Review.rating)).filter_by(book_id=book.id)
-        )
-        avg_rating = avg_rating_result.scalar()  # Get the average rating
-        
+    summary = await book_cache.get(f'summary:{id}')
+    if summary is None:
+        async with read_session() as session:
+            book = await session.execute(
+                db.select(Book.summary, Book.review_count, Book.rating_sum).filter_by(id=id)
+            )
+            book = book.first()
+
         if not book:
             abort(404, description="Book not found")
-        
-        return jsonify({"summary": book.summary, "avg_rating": avg_rating})
\ No newline at end of file
+
+        # The average comes from the denormalized aggregates instead of scanning reviews
+        avg_rating = average_rating(book.review_count, book.rating_sum)
+        summary = {"summary": book.summary, "avg_rating": avg_rating}
+        await book_cache.set(f'summary:{id}', summary)
+
+    return jsonify(summary)
\ No newline at end of file
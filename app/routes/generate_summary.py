@@ -1,18 +1,27 @@
-from flask import Blueprint, request, jsonify, abort
-from app.services.llama_service import generate_summary
-from app.utils.db_utils import db_session
-from app import db
+from flask import Blueprint, Response, request, jsonify, abort, url_for
+from app.services import batch_summary  # Registers the summarize_books job handler
+from app.services.jobs import enqueue
+from app.services.llama_service import llm_slots
+from app.services.summarizer import stream_summary
+from app.services.summary_cache import find_summary, store_summary, summary_cache_stats, summary_key
+from app.services.summary_service import save_summary
+from app.utils.db_utils import read_session
+from app import config, db
 from app.models import Book
 from app.utils.decorators.auth import authenticate
+from app.utils.json_provider import dumps_bytes
+from app.utils.rate_limit import rate_limit, reject_when_busy
+from app.utils.streaming import iterate_async
 
 # Define a blueprint for book-summary-related routes
 bp = Blueprint('generate_summary', __name__)
 
-@authenticate
 @bp.route("/books/<int:book_id>/generate-summary", methods=['POST'])
+@authenticate
+@rate_limit('summary')
 async def generate_book_summary(book_id):
     """
-    Generate a summary for a book by ID
+    Queue generation of a summary for a book by ID
     ---
     security:
       - BasicAuth: []  # Requires Basic Authentication
@@ -36,7 +45,7 @@ async def generate_book_summary(book_id):
               example: "This book provides an in-depth look at..."
     responses:
       200:
-        description: Summary generated successfully
+        description: The same content was summarized before; the cached summary was saved to the book
         schema:
           type: object
           properties:
@@ -44,6 +53,32 @@ async def generate_book_summary(book_id):
               type: string
               description: The generated summary of the book.
               example: "A brief overview of the book's main themes."
+      202:
+        description: Summary generation queued; poll the job for the result
+        headers:
+          Location:
+            type: string
+            description: URL of the job, e.g. /jobs/<job_id>
+        schema:
+          type: object
+          properties:
+            job_id:
+              type: string
+              description: ID of the background job generating the summary.
+              example: "6f1c2a0e4b5d4f0e9a7c3b2d1e0f9a8b"
+            status:
+              type: string
+              enum: [queued, running]
+              description: Status of the job; an identical pending request returns its job instead of a new one.
+              example: "queued"
+      404:
+        description: Book not found
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "Book not found"
       400:
         description: Missing required field
         schema:
@@ -52,36 +87,235 @@ async def generate_book_summary(book_id):
             message:
               type: string
               example: "Missing required field: content"
-      500:
-        description: Internal server error
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
+    """
+    data = request.get_json()
+    
+    # Validate incoming data (you can improve this with Pydantic later)
+    if not data or 'content' not in data:
+        abort(400, description="Missing required field: content")
+
+    # Check the book exists before queueing any work
+    async with read_session() as session:
+        book = await session.execute(db.select(Book.id).filter_by(id=book_id))
+        if book.first() is None:
+            abort(404, description="Book not found")
+
+    # Content summarized before, for any book, is answered straight from the cache
+    key = summary_key(data['content'])
+    summary = await find_summary(key)
+    if summary is not None:
+        if not await save_summary(book_id, summary):
+            abort(404, description="Book not found")
+        return jsonify({"summary": summary}), 200
+
+    # The model takes tens of seconds, so it runs as a background job instead of holding this request;
+    # resubmitting while that job is pending returns the same job
+    job = await enqueue(
+        'generate_summary',
+        {"book_id": book_id, "content": data['content']},
+        dedupe_key=f"generate_summary:{book_id}:{key}",
+    )
+    if not job.created:
+        summary_cache_stats.coalesced += 1
+
+    response = jsonify({"job_id": job.id.hex, "status": job.status})
+    response.headers['Location'] = url_for('job_routes.get_job', job_id=job.id.hex)
+    return response, 202
+
+
+# Route to stream a book summary as it is generated (POST /books/<book_id>/generate-summary/stream)
+@bp.route("/books/<int:book_id>/generate-summary/stream", methods=['POST'])
+@authenticate
+@rate_limit('summary')
+async def stream_book_summary(book_id):
+    """
+    Generate a summary for a book by ID, streaming it as server-sent events
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    produces:
+      - text/event-stream
+    parameters:
+      - name: book_id
+        in: path
+        type: integer
+        required: true
+        description: The ID of the book for which to generate the summary.
+        example: 1
+      - in: body
+        name: content
+        required: true
+        description: JSON object containing the content to summarize.
         schema:
           type: object
           properties:
-            error:
+            content:
               type: string
-              example: "An error occurred while generating the summary."
+              description: The content to be summarized.
+              example: "This book provides an in-depth look at..."
+    responses:
+      200:
+        description: >
+          An event stream. `token` events (`{"text": ...}`) carry the summary as the
+          model writes it; the stream ends with a `done` event (`{"summary": ...}`) once
+          the summary is saved to the book, or an `error` event (`{"message": ...}`).
+          Content summarized before is sent as a single `token` event.
+        schema:
+          type: string
+          example: "event: token\ndata: {\"text\": \"A brief\"}\n\n"
+      404:
+        description: Book not found
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "Book not found"
+      400:
+        description: Missing required field
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "Missing required field: content"
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
+      503:
+        description: Every model slot is busy; retry after the number of seconds in the Retry-After header
     """
     data = request.get_json()
-    
-    # Validate incoming data (you can improve this with Pydantic later)
+
     if not data or 'content' not in data:
         abort(400, description="Missing required field: content")
 
-    book_content = data['content']
+    async with read_session() as session:
+        book = await session.execute(db.select(Book.id).filter_by(id=book_id))
+        if book.first() is None:
+            abort(404, description="Book not found")
 
-    try:
-        # Call the Llama model to generate summary
-        summary = await generate_summary(book_content)
+    content = data['content']
+    key = summary_key(content)
+    cached = await find_summary(key)
+    if cached is None:
+        # A stream holds a model slot for its whole response, so it is refused rather than queued
+        reject_when_busy(llm_slots, config.LLM_BUSY_RETRY_AFTER)
 
-        # Save the summary to the database
-        async with db_session() as session:
-            book = await session.execute(db.select(Book).filter_by(id=book_id)).scalar()
-            
-            book.summary = summary
-            await session.commit()
-        
-        return jsonify({"summary": summary}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    async def generate():
+        # Sent straight away so the client knows the request was accepted while long content is reduced
+        yield b": summarizing\n\n"
+        if cached is not None:
+            summary = cached
+            yield _event('token', {"text": summary})
+        else:
+            summary_cache_stats.misses += 1
+            fragments = []
+            try:
+                async for fragment in stream_summary(content):
+                    fragments.append(fragment)
+                    yield _event('token', {"text": fragment})
+            except Exception as e:
+                yield _event('error', {"message": str(e)})
+                return
+            summary = ''.join(fragments)
+            await store_summary(key, summary)
+
+        if not await save_summary(book_id, summary):
+            yield _event('error', {"message": "Book not found"})
+            return
+        yield _event('done', {"summary": summary})
+
+    response = Response(iterate_async(generate), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep nginx-style proxies from buffering the events
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _event(name, data):
+    return b"event: " + name.encode() + b"\ndata: " + dumps_bytes(data) + b"\n\n"
+
+
+# Route to queue summaries for many books at once (POST /books/generate-summaries)
+@bp.route("/books/generate-summaries", methods=['POST'])
+@authenticate
+@rate_limit('summary')
+async def generate_book_summaries():
+    """
+    Queue generation of summaries for many books in one background job
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    parameters:
+      - in: body
+        name: books
+        required: true
+        description: >
+          The books to summarize with the content of each. They are summarized
+          SUMMARY_BATCH_CONCURRENCY at a time, each retried with backoff, and the
+          summaries are stored SUMMARY_BATCH_SIZE books per UPDATE.
+        schema:
+          type: object
+          properties:
+            books:
+              type: array
+              items:
+                type: object
+                properties:
+                  book_id:
+                    type: integer
+                    example: 1
+                  content:
+                    type: string
+                    example: "This book provides an in-depth look at..."
+    responses:
+      202:
+        description: >
+          Batch queued; poll the job, whose result reports how many books were
+          summarized and which failed
+        headers:
+          Location:
+            type: string
+            description: URL of the job, e.g. /jobs/<job_id>
+        schema:
+          type: object
+          properties:
+            job_id:
+              type: string
+              example: "6f1c2a0e4b5d4f0e9a7c3b2d1e0f9a8b"
+            status:
+              type: string
+              example: "queued"
+      400:
+        description: Missing or invalid books
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "books[0].content must be a non-empty string"
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
+    """
+    data = request.get_json(silent=True)
+    books = data.get('books') if isinstance(data, dict) else None
+    if not isinstance(books, list) or not books:
+        abort(400, description="Missing required field: books")
+
+    for index, item in enumerate(books):
+        book_id = item.get('book_id') if isinstance(item, dict) else None
+        if not isinstance(book_id, int) or isinstance(book_id, bool):
+            abort(400, description=f"books[{index}].book_id must be an integer")
+        if not isinstance(item.get('content'), str) or not item['content'].strip():
+            abort(400, description=f"books[{index}].content must be a non-empty string")
 
+    job = await enqueue(
+        'summarize_books',
+        {"books": [{"book_id": item['book_id'], "content": item['content']} for item in books]},
+    )
 
+    response = jsonify({"job_id": job.id.hex, "status": job.status})
+    response.headers['Location'] = url_for('job_routes.get_job', job_id=job.id.hex)
+    return response, 202
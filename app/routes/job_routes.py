@@ -0,0 +1,84 @@
+import uuid
+from flask import Blueprint, jsonify, abort
+from app.services.jobs import JOB_FIELDS, get_job as load_job
+from app.utils.decorators.auth import authenticate
+
+# Define a blueprint for background job routes
+bp = Blueprint('job_routes', __name__)
+
+# Route to get the status of a background job (GET /jobs/<job_id>)
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@authenticate
+async def get_job(job_id):
+    """
+    Retrieve the status of a background job, such as a queued summary generation
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: The job ID returned when the job was queued.
+        example: "6f1c2a0e4b5d4f0e9a7c3b2d1e0f9a8b"
+    responses:
+      200:
+        description: The job's status, and its result once it has succeeded
+        schema:
+          type: object
+          properties:
+            id:
+              type: string
+              example: "6f1c2a0e4b5d4f0e9a7c3b2d1e0f9a8b"
+            kind:
+              type: string
+              example: "generate_summary"
+            status:
+              type: string
+              enum: [queued, running, succeeded, failed]
+              example: "succeeded"
+            result:
+              type: object
+              description: Output of a succeeded job, e.g. {"summary": "..."} for summaries.
+            error:
+              type: string
+              description: Why a failed job failed.
+            attempts:
+              type: integer
+              example: 1
+            created_at:
+              type: string
+              format: date-time
+            started_at:
+              type: string
+              format: date-time
+            finished_at:
+              type: string
+              format: date-time
+      404:
+        description: Job not found
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "Job not found"
+      401:
+        description: Unauthorized access
+    """
+    try:
+        job_id = uuid.UUID(job_id)
+    except ValueError:
+        abort(404, description="Job not found")
+
+    job = await load_job(job_id)
+    if job is None:
+        abort(404, description="Job not found")
+
+    job = dict(zip(JOB_FIELDS, job))
+    job['id'] = job['id'].hex
+    for name in ('created_at', 'started_at', 'finished_at'):
+        if job[name] is not None:
+            job[name] = job[name].isoformat()
+    return jsonify(job), 200
@@ -0,0 +1,213 @@
+from flask import Blueprint, jsonify
+from app import engine, pool_metrics
+from app.services.auth_service import verify_slots
+from app.services.jobs import job_runner
+from app.services.llama_service import llm_slots
+from app.services.summary_cache import summary_cache_stats
+from app.utils.cache import book_cache
+from app.utils.rate_limit import rate_limiter
+from app.utils.decorators.auth import authenticate
+from app.utils.replica_router import replica_router
+
+# Define a blueprint for operational metrics
+bp = Blueprint('metrics_routes', __name__)
+
+# Route to get runtime metrics of this worker process (GET /metrics)
+@bp.route('/metrics', methods=['GET'])
+@authenticate
+def get_metrics():
+    """
+    Retrieve runtime metrics of the worker process serving the request
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    responses:
+      200:
+        description: Connection pool metrics for the primary and each read replica, and cache counters
+        schema:
+          type: object
+          properties:
+            db_pool:
+              type: object
+              properties:
+                size:
+                  type: integer
+                  description: Configured pool size (DB_POOL_SIZE).
+                  example: 10
+                checked_out:
+                  type: integer
+                  description: Connections currently in use.
+                  example: 3
+                checked_in:
+                  type: integer
+                  description: Idle connections held by the pool.
+                  example: 7
+                overflow:
+                  type: integer
+                  description: Connections currently open beyond the pool size (negative while the pool is still filling).
+                  example: 0
+                connects:
+                  type: integer
+                  description: New database connections opened.
+                  example: 10
+                checkouts:
+                  type: integer
+                  example: 12045
+                checkins:
+                  type: integer
+                  example: 12042
+                overflow_checkouts:
+                  type: integer
+                  description: Checkouts served by an overflow connection.
+                  example: 12
+                invalidations:
+                  type: integer
+                  description: Connections discarded after an error or failed pre-ping.
+                  example: 0
+                timeouts:
+                  type: integer
+                  description: Sessions that gave up waiting for a connection (DB_POOL_TIMEOUT).
+                  example: 0
+                wait_seconds_avg:
+                  type: number
+                  format: float
+                  description: Average time a session waited for its connection.
+                  example: 0.0004
+                wait_seconds_max:
+                  type: number
+                  format: float
+                  example: 0.012
+            db_replicas:
+              type: array
+              description: One entry per read replica (DATABASE_REPLICA_URLS).
+              items:
+                type: object
+                properties:
+                  host:
+                    type: string
+                    example: "replica-1.internal"
+                  healthy:
+                    type: boolean
+                    description: False while the replica is skipped after a connection failure.
+                    example: true
+                  failures:
+                    type: integer
+                    example: 0
+                  pool:
+                    type: object
+                    description: Same counters as db_pool, for this replica.
+            book_cache:
+              type: object
+              description: In-process cache of single-book and summary reads.
+              properties:
+                entries:
+                  type: integer
+                  example: 812
+                bytes:
+                  type: integer
+                  description: Estimated size of the cached values (bounded by BOOK_CACHE_MAX_BYTES).
+                  example: 402118
+                hits:
+                  type: integer
+                  example: 10452
+                misses:
+                  type: integer
+                  example: 1310
+                hit_rate:
+                  type: number
+                  format: float
+                  example: 0.889
+                evictions:
+                  type: integer
+                  description: Entries dropped to stay within the entry or memory budget.
+                  example: 0
+                expirations:
+                  type: integer
+                  description: Entries found stale after BOOK_CACHE_TTL.
+                  example: 96
+                invalidations:
+                  type: integer
+                  description: Entries dropped because the book was written.
+                  example: 40
+            jobs:
+              type: object
+              description: Background job runners of this process.
+              properties:
+                concurrency:
+                  type: integer
+                  description: Jobs this process runs at once (JOB_CONCURRENCY).
+                  example: 2
+                active:
+                  type: integer
+                  example: 1
+                succeeded:
+                  type: integer
+                  example: 57
+                failed:
+                  type: integer
+                  example: 0
+            summary_cache:
+              type: object
+              description: Content-hash cache of generated summaries, counted by this process.
+              properties:
+                hits:
+                  type: integer
+                  description: Summaries served from the cache.
+                  example: 31
+                misses:
+                  type: integer
+                  description: Summaries that had to be generated.
+                  example: 12
+                coalesced:
+                  type: integer
+                  description: Requests that joined an identical generation already in progress.
+                  example: 4
+                hit_rate:
+                  type: number
+                  format: float
+                  example: 0.72
+            rate_limits:
+              type: object
+              description: Requests this process turned away, and its model call slots.
+              properties:
+                store:
+                  type: string
+                  description: Where the token buckets live (RATE_LIMIT_BACKEND).
+                  example: "memory"
+                rejected:
+                  type: object
+                  description: 429 responses per named limit.
+                  example: {"summary": 3}
+                llm:
+                  type: object
+                  properties:
+                    limit:
+                      type: integer
+                      description: Model calls allowed at once (LLM_MAX_CONCURRENCY).
+                      example: 8
+                    active:
+                      type: integer
+                      example: 2
+                    waiting:
+                      type: integer
+                      description: Calls from jobs and batches queued for a slot.
+                      example: 0
+                    rejected:
+                      type: integer
+                      description: Streamed summaries refused with 503 while every slot was taken.
+                      example: 0
+                auth:
+                  type: object
+                  description: Password and API key hash checks in flight (AUTH_MAX_CONCURRENCY).
+                  example: {"limit": 2, "active": 0, "waiting": 0, "rejected": 0}
+      401:
+        description: Unauthorized access
+    """
+    return jsonify({
+        "db_pool": pool_metrics.snapshot(engine),
+        "db_replicas": replica_router.snapshot(),
+        "book_cache": book_cache.stats(),
+        "jobs": job_runner.snapshot(),
+        "summary_cache": summary_cache_stats.snapshot(),
+        "rate_limits": {**rate_limiter.snapshot(), "llm": llm_slots.snapshot(), "auth": verify_slots.snapshot()},
+    }), 200
@@ -1,15 +1,27 @@
 from flask import Blueprint, request, jsonify, abort
 from app import db
 from app.models import Book, Review
-from app.utils.db_utils import db_session
+from app.schemas import review_schema
+from app.services.review_import import import_reviews
+from app.services.rating_service import add_rating, is_valid_rating, MIN_RATING, MAX_RATING
+from app.utils.cache import book_cache, invalidate_reviews
+from app.utils.conditional import Validators, is_conditional, make_etag, to_version
+from app.utils.db_utils import read_session, write_session
+from app.utils.ingest import iter_records
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit, parse_sort, order_by_keyset, keyset_after
+from app.utils.query_params import parse_int_arg
+from app.utils.rate_limit import rate_limit
 from app.utils.decorators.auth import authenticate
 
 # Define a blueprint for book-related routes
 bp = Blueprint('review_routes', __name__)
 
+# Columns clients may sort reviews by; id doubles as recency
+SORTABLE_FIELDS = ('id', 'rating')
+
 # Route to add review for a particular book
-@authenticate
 @bp.route('/books/<int:book_id>/reviews', methods=['POST'])
+@authenticate
 async def add_review(book_id):
     """
     Add a review to a book
@@ -48,7 +60,7 @@ async def add_review(book_id):
               type: string
               example: "Review added successfully"
       400:
-        description: Missing required field (review_text or rating)
+        description: Missing required field (review_text or rating) or rating outside 1-5
         schema:
           type: object
           properties:
@@ -72,76 +84,263 @@ async def add_review(book_id):
     
     if not data or 'review_text' not in data:
         abort(400, description="Missing required field: review")
+    if 'rating' not in data:
+        abort(400, description="Missing required field: rating")
+    
+    rating = data['rating']
+    if not is_valid_rating(rating):
+        abort(400, description=f"rating must be an integer between {MIN_RATING} and {MAX_RATING}")
     
     new_book_review = Review(
         review_text=data['review_text'],
-        rating=data['rating'],
+        rating=rating,
         book_id=book_id
     )
-    async with db_session() as session:
+    async with write_session() as session:
+        # Update the book's rating aggregates in the same transaction as the insert
+        if not await add_rating(session, book_id, rating):
+            abort(404, description="Book not found")
         session.add(new_book_review)
-        await session.commit()
-    
+
+    # The cached average rating and review pages are now out of date
+    await invalidate_reviews(book_id)
     return jsonify({"message": "Review added successfully"}), 201
 
 
-# Route to get all reviews for a particular book
+# Route to bulk import reviews for many books
+@bp.route('/reviews/bulk', methods=['POST'])
 @authenticate
-@bp.route("/books/<int:book_id>/reviews", methods=['GET'])
-async def get_reviews(book_id):
+@rate_limit('bulk')
+async def add_reviews_bulk():
     """
-    Retrieve all reviews for a specific book
+    Bulk import reviews from a JSON array, NDJSON or CSV body
     ---
     security:
       - BasicAuth: []  # Requires Basic Authentication
+    consumes:
+      - application/json
+      - application/x-ndjson
+      - text/csv
     parameters:
-      - name: book_id
-        in: path
-        type: integer
+      - name: reviews
+        in: body
         required: true
-        description: The ID of the book to retrieve reviews for.
-        example: 1
-    responses:
-      200:
-        description: A list of reviews for the book
+        description: >
+          Reviews as a JSON array, one JSON object per line (NDJSON) or CSV with a
+          header row. NDJSON and CSV are streamed. Book rating aggregates are updated
+          once per batch.
         schema:
           type: array
           items:
             type: object
             properties:
-              id:
+              book_id:
                 type: integer
-                description: The ID of the review.
                 example: 1
               review_text:
                 type: string
-                description: The text of the review.
-                example: "Great book!"
+                example: "This book is fantastic!"
               rating:
                 type: integer
-                description: The rating for the book (1-5).
                 example: 5
-      404:
-        description: Book not found or no reviews available
+    responses:
+      200:
+        description: Import report; invalid rows are skipped and listed in `errors`
         schema:
           type: object
           properties:
-            message:
+            inserted:
+              type: integer
+              example: 99998
+            failed:
+              type: integer
+              example: 2
+            errors:
+              type: array
+              items:
+                type: object
+                properties:
+                  row:
+                    type: integer
+                    description: 1-based position of the record in the upload.
+                    example: 17
+                  error:
+                    type: string
+                    example: "Book not found"
+            errors_truncated:
+              type: boolean
+              description: True when more rows failed than are listed.
+              example: false
+      400:
+        description: Body is not a valid JSON array
+      415:
+        description: Unsupported content type
+      401:
+        description: Unauthorized access
+      500:
+        description: Internal server error
+      429:
+        description: Rate limit exceeded; retry after the number of seconds in the Retry-After header
+    """
+    records = iter_records(request.stream, request.mimetype)
+    report = await import_reviews(records)
+
+    return jsonify(report.to_dict()), 200
+
+
+# Route to get reviews for a particular book, one page at a time
+@bp.route("/books/<int:book_id>/reviews", methods=['GET'])
+@authenticate
+async def get_reviews(book_id):
+    """
+    Retrieve reviews for a specific book, one keyset-paginated page at a time
+    ---
+    security:
+      - BasicAuth: []  # Requires Basic Authentication
+    parameters:
+      - name: book_id
+        in: path
+        type: integer
+        required: true
+        description: The ID of the book to retrieve reviews for.
+        example: 1
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of reviews to return (default 100, max 1000).
+        example: 100
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Opaque cursor taken from the `next_cursor` of the previous page.
+      - name: sort
+        in: query
+        type: string
+        enum: [id, -id, rating, -rating]
+        required: false
+        description: Sort by recency (`-id` is newest first) or rating (`-rating` is best first). Defaults to id.
+        example: "-rating"
+      - name: min_rating
+        in: query
+        type: integer
+        required: false
+        description: Only return reviews rated at least this much (1-5).
+        example: 4
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of the page the client holds; answered with 304 if it is still current.
+      - name: If-Modified-Since
+        in: header
+        type: string
+        required: false
+        description: Checked only without If-None-Match.
+    responses:
+      200:
+        description: A page of reviews for the book, with ETag and Last-Modified headers
+        schema:
+          type: object
+          properties:
+            reviews:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                    description: The ID of the review.
+                    example: 1
+                  review_text:
+                    type: string
+                    description: The text of the review.
+                    example: "Great book!"
+                  rating:
+                    type: integer
+                    description: The rating for the book (1-5).
+                    example: 5
+            next_cursor:
               type: string
-              example: "Book not found or no reviews available"
+              description: Cursor for the next page, null on the last page.
+              example: "WyItcmF0aW5nIiw1LDQyXQ"
+      304:
+        description: The client's copy is current; no body
+      400:
+        description: Invalid limit, cursor, sort or min_rating
       401:
         description: Unauthorized access
       500:
         description: Internal server error
     """
-    async with db_session() as session:
-        reviews = await session.execute(db.select(Review).filter_by(book_id=book_id))
-        reviews_list = reviews.scalars().all()
-        
-        return jsonify([{
-            "id": review.id,
-            "review_text": review.review_text,
-            "rating": review.rating
-        } for review in reviews_list]), 200
+    sort, descending = parse_sort(request.args.get('sort'), SORTABLE_FIELDS)
+    sort_column = getattr(Review, sort)
+    limit = parse_limit(request.args.get('limit'))
+    min_rating = parse_int_arg(request.args, 'min_rating', minimum=MIN_RATING, maximum=MAX_RATING)
+
+    # Every shape is a range scan of ix_reviews_book_id_id or ix_reviews_book_id_rating_id
+    query = review_schema.select().where(Review.book_id == book_id)
+    if min_rating is not None:
+        query = query.where(Review.rating >= min_rating)
+    query = order_by_keyset(query, sort_column, Review.id, descending).limit(limit + 1)
+
+    after = request.args.get('after')
+
+    # Identifies this page among the book's pages, for both the cache key and the ETag
+    variant = f"{request.args.get('sort', 'id')}:{min_rating}:{limit}:{after}"
+
+    # Pages are cached under the book's reviews version, which every new review bumps
+    cache_version = await book_cache.version(f'reviews:{book_id}')
+    cache_key = f"reviews:{book_id}:{cache_version}:{variant}"
+    cached = await book_cache.get(cache_key)
+    if cached is None:
+        if after:
+            cursor = decode_cursor(after)
+            if len(cursor) != 3 or cursor[0] != request.args.get('sort', 'id'):
+                abort(400, description="Cursor does not match the requested sort")
+            query = keyset_after(query, sort_column, Review.id, cursor[1], cursor[2], descending)
+
+        async with read_session() as session:
+            # Read before the page, so a review landing in between only makes the ETag older than the body
+            reviews_updated_at = await session.scalar(
+                db.select(Book.reviews_updated_at).filter_by(id=book_id)
+            )
+            version = to_version(reviews_updated_at) if reviews_updated_at is not None else None
+            if version is not None and is_conditional():
+                validators = _reviews_validators(book_id, version, variant)
+                if validators.not_modified():
+                    return validators.not_modified_response()
+
+            reviews = await session.execute(query)
+            reviews_list = reviews.all()
+
+        next_cursor = None
+        if len(reviews_list) > limit:
+            reviews_list = reviews_list[:limit]
+            last = reviews_list[-1]
+            next_cursor = encode_cursor(request.args.get('sort', 'id'), getattr(last, sort), last.id)
+
+        cached = {
+            "page": {
+                "reviews": review_schema.dump_many(reviews_list),
+                "next_cursor": next_cursor
+            },
+            "version": version,
+        }
+        if book_cache.settled(cache_version):
+            await book_cache.set(cache_key, cached)
+
+    # Unknown books have no version to validate against
+    if cached["version"] is None:
+        return jsonify(cached["page"]), 200
+
+    validators = _reviews_validators(book_id, cached["version"], variant)
+    if validators.not_modified():
+        return validators.not_modified_response()
+
+    return validators.apply(jsonify(cached["page"])), 200
 
 
+def _reviews_validators(book_id, version, variant):
+    return Validators(make_etag('reviews', book_id, version, variant), version)
@@ -0,0 +1,46 @@
+from app.models import db, Book, Review
+from app.utils.fields import parse_fields
+
+
+class Schema:
+    """
+    Output shape of a model: the columns clients may see, in order, and how rows become dicts.
+
+    Queries built with `select` return plain Row tuples whose columns line up with
+    the requested fields, so `dump_many` zips each row against one precomputed tuple
+    of names instead of hydrating ORM objects and reading them attribute by attribute.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+
+    def parse_fields(self, raw, always=('id',)):
+        """Validate a `fields` query parameter against this shape; see `app.utils.fields.parse_fields`."""
+        return parse_fields(raw, self.fields, always=always)
+
+    def columns(self, fields=None):
+        return [getattr(self.model, name) for name in (fields or self.fields)]
+
+    def select(self, fields=None, *extra):
+        """Column-only select of `fields` (default: all of them) followed by any `extra` columns."""
+        return db.select(*self.columns(fields), *extra)
+
+    def names(self, fields=None, extra=()):
+        """Output keys of rows from `select(fields, *extra)`; `extra` names the extra columns."""
+        return tuple(fields or self.fields) + tuple(extra)
+
+    def dump(self, row, fields=None, extra=()):
+        return dict(zip(self.names(fields, extra), row))
+
+    def dump_many(self, rows, fields=None, extra=()):
+        names = self.names(fields, extra)
+        return [dict(zip(names, row)) for row in rows]
+
+    def project(self, record, fields):
+        """Narrow a serialized record holding every field (e.g. a cached one) to `fields`."""
+        return {name: record[name] for name in fields}
+
+
+book_schema = Schema(Book, ('id', 'title', 'author', 'genre', 'year_published', 'summary'))
+review_schema = Schema(Review, ('id', 'review_text', 'rating'))
@@ -0,0 +1,185 @@
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+from collections import namedtuple
+from sqlalchemy import select, update, func
+from app import config
+from app.models import ApiKey, User
+from app.utils.cache import LRUCache
+from app.utils.db_utils import read_session, write_session
+from app.utils.rate_limit import ConcurrencyLimit
+
+# Who a request was authenticated as; `via` is 'password' or 'api_key'
+Principal = namedtuple('Principal', ['user_id', 'username', 'via'])
+
+# API keys read bms_<prefix>_<secret>; the prefix is stored in the clear to find the key's row
+API_KEY_PREFIX = 'bms'
+
+# scrypt block size and parallelism; the cost (N) comes from AUTH_SCRYPT_N and is stored per hash
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MAXMEM = 256 * 1024 * 1024
+
+# Successful verifications, so the deliberately slow hash is paid once per credential per
+# AUTH_CACHE_TTL rather than on every request. Keys are HMACs under a per-process secret,
+# so the cache never holds anything that could be checked against a password offline.
+credential_cache = LRUCache(
+    max_entries=config.AUTH_CACHE_MAX_ENTRIES,
+    ttl=config.AUTH_CACHE_TTL,
+    max_bytes=config.AUTH_CACHE_MAX_ENTRIES * 256,
+)
+_CACHE_SECRET = secrets.token_bytes(32)
+
+# Caps the hashes checked at once, so a flood of bad credentials queues here instead of
+# taking every CPU and the default executor shared with uploads and batch loading
+verify_slots = ConcurrencyLimit(config.AUTH_MAX_CONCURRENCY)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_secret(secret, n=None):
+    """Salted scrypt hash of a password or key secret, as 'scrypt$N$r$p$salt$digest'."""
+    n = n or config.AUTH_SCRYPT_N
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(secret.encode(), salt=salt, n=n, r=SCRYPT_R, p=SCRYPT_P, maxmem=SCRYPT_MAXMEM, dklen=32)
+    return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def check_secret(secret, encoded):
+    """Whether `secret` matches a `hash_secret` hash; the digests are compared in constant time."""
+    try:
+        scheme, n, r, p, salt, expected = encoded.split('$')
+        n, r, p, salt, expected = int(n), int(r), int(p), _unb64(salt), _unb64(expected)
+    except ValueError:
+        return False
+    if scheme != 'scrypt':
+        return False
+    digest = hashlib.scrypt(secret.encode(), salt=salt, n=n, r=r, p=p, maxmem=SCRYPT_MAXMEM, dklen=len(expected))
+    return hmac.compare_digest(digest, expected)
+
+
+@functools.cache
+def _dummy_hash():
+    # Checked when the user or key does not exist, so unknown names take as long as wrong secrets
+    return hash_secret(secrets.token_urlsafe())
+
+
+def _cache_key(scheme, *parts):
+    return hmac.new(_CACHE_SECRET, '\0'.join((scheme, *parts)).encode(), hashlib.sha256).hexdigest()
+
+
+async def _verify(secret, encoded):
+    # scrypt takes tens of milliseconds of CPU; keep it off the shared event loop
+    async with verify_slots:
+        return await asyncio.to_thread(check_secret, secret, encoded or _dummy_hash())
+
+
+async def authenticate_basic(username, password, admit=None):
+    """
+    The Principal for a username and password, or None when they do not match a user.
+    `admit` is awaited before a credential that is not cached gets looked up and hashed;
+    it may abort, e.g. to throttle guessing.
+    """
+    key = _cache_key('basic', username, password)
+    principal = credential_cache.get(key)
+    if principal is not None:
+        return principal
+    if admit is not None:
+        await admit()
+
+    async with read_session() as session:
+        user = (await session.execute(
+            select(User.id, User.username, User.password_hash).where(User.username == username)
+        )).first()
+    verified = await _verify(password, user.password_hash if user else None)
+    if user is None or not verified:
+        return None
+
+    principal = Principal(user.id, user.username, 'password')
+    credential_cache.set(key, principal, size=1)
+    return principal
+
+
+async def authenticate_api_key(api_key, admit=None):
+    """The Principal owning an unrevoked API key, or None; `admit` as for `authenticate_basic`."""
+    key = _cache_key('api_key', api_key)
+    principal = credential_cache.get(key)
+    if principal is not None:
+        return principal
+
+    scheme, _, rest = api_key.partition('_')
+    prefix, _, secret = rest.partition('_')
+    if scheme != API_KEY_PREFIX or not prefix or not secret:
+        return None
+    if admit is not None:
+        await admit()
+
+    async with read_session() as session:
+        row = (await session.execute(
+            select(ApiKey.key_hash, User.id, User.username)
+            .join(User, User.id == ApiKey.user_id)
+            .where(ApiKey.prefix == prefix, ApiKey.revoked_at.is_(None))
+        )).first()
+    verified = await _verify(secret, row.key_hash if row else None)
+    if row is None or not verified:
+        return None
+
+    principal = Principal(row.id, row.username, 'api_key')
+    credential_cache.set(key, principal, size=1)
+    return principal
+
+
+async def create_user(username, password):
+    """Store a new user with a hashed password; returns its id."""
+    password_hash = await asyncio.to_thread(hash_secret, password)
+    async with write_session() as session:
+        user = User(username=username, password_hash=password_hash)
+        session.add(user)
+        await session.flush()
+        return user.id
+
+
+async def set_password(username, password):
+    """Replace a user's password; returns False if there is no such user."""
+    password_hash = await asyncio.to_thread(hash_secret, password)
+    async with write_session() as session:
+        result = await session.execute(
+            update(User).where(User.username == username).values(password_hash=password_hash)
+        )
+    # Sessions verified with the old password must not outlive the change in this process
+    credential_cache.clear()
+    return result.rowcount > 0
+
+
+async def create_api_key(username, name=None):
+    """Issue an API key for a user; the key is returned once and only its hash is stored. None if no such user."""
+    prefix, secret = secrets.token_hex(4), secrets.token_urlsafe(32)
+    key_hash = await asyncio.to_thread(hash_secret, secret)
+    async with write_session() as session:
+        user_id = await session.scalar(select(User.id).where(User.username == username))
+        if user_id is None:
+            return None
+        session.add(ApiKey(user_id=user_id, prefix=prefix, key_hash=key_hash, name=name))
+    return f"{API_KEY_PREFIX}_{prefix}_{secret}"
+
+
+async def revoke_api_key(prefix):
+    """Revoke the key with this prefix; returns False if there is no such live key."""
+    async with write_session() as session:
+        result = await session.execute(
+            update(ApiKey)
+            .where(ApiKey.prefix == prefix, ApiKey.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+    credential_cache.clear()
+    return result.rowcount > 0
@@ -0,0 +1,194 @@
+import asyncio
+import os
+from sqlalchemy import select, update, values, column, Integer, Text
+from tenacity import AsyncRetrying, stop_after_attempt, wait_random_exponential
+from app import config
+from app.models import Book
+from app.services.jobs import job_handler
+from app.services.summary_cache import cached_summarize
+from app.utils.cache import invalidate_book
+from app.utils.db_utils import read_session, write_session
+from app.utils.ingest import MAX_REPORTED_ERRORS
+
+
+class BatchReport:
+    """Accumulates the outcome of a batch summarization; `skipped` counts books already checkpointed."""
+
+    def __init__(self):
+        self.summarized = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, book_id, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"book_id": book_id, "error": error})
+
+    def to_dict(self):
+        return {
+            "summarized": self.summarized,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+class Checkpoint:
+    """
+    Append-only file of the book ids whose summaries have been committed.
+
+    A batch's ids are appended only after its UPDATE commits, so a run restarted with
+    the same file skips exactly the books already written and redoes the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.done = {int(line) for line in f if line.strip()}
+
+    def add(self, book_ids):
+        with open(self.path, 'a') as f:
+            f.writelines(f"{book_id}\n" for book_id in book_ids)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(book_ids)
+
+
+async def select_book_ids(ids=None, genre=None, author=None, missing_only=False):
+    """Ids of the books to summarize, in id order: `ids` if given, narrowed by the filters."""
+    query = select(Book.id).order_by(Book.id)
+    if ids:
+        query = query.where(Book.id.in_(ids))
+    if genre:
+        query = query.where(Book.genre == genre)
+    if author:
+        query = query.where(Book.author == author)
+    if missing_only:
+        query = query.where(Book.summary.is_(None))
+    async with read_session() as session:
+        result = await session.execute(query)
+        return result.scalars().all()
+
+
+def directory_content(path):
+    """Content loader reading a book's text from `<path>/<book_id>.txt`; None when the file is missing."""
+    def load(book_id):
+        try:
+            with open(os.path.join(path, f"{book_id}.txt"), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    return load
+
+
+async def summarize_books(book_ids, load_content, concurrency=None, batch_size=None,
+                          attempts=None, checkpoint=None):
+    """
+    Summarize many books and store the summaries with one UPDATE per `batch_size` books.
+
+    `load_content(book_id)` returns the text to summarize (None fails the book); it may
+    block, so it runs on a thread. At most `concurrency` books are summarized at once, each
+    retried with exponential backoff up to `attempts` times before it is reported as failed.
+    Summaries go through the summary cache, so books redone after a crash cost no model calls.
+    """
+    concurrency = concurrency or config.SUMMARY_BATCH_CONCURRENCY
+    batch_size = batch_size or config.SUMMARY_BATCH_SIZE
+    attempts = attempts or config.SUMMARY_BATCH_ATTEMPTS
+    report = BatchReport()
+    done = checkpoint.done if checkpoint else set()
+
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    pending = []
+    write_lock = asyncio.Lock()
+
+    async def flush():
+        nonlocal pending
+        batch, pending = pending, []
+        if batch:
+            async with write_lock:
+                await _write_batch(batch, report, checkpoint)
+
+    async def worker():
+        while (book_id := await queue.get()) is not None:
+            try:
+                content = await asyncio.to_thread(load_content, book_id)
+                if not content or not content.strip():
+                    report.add_error(book_id, "No content to summarize")
+                    continue
+                summary = await _summarize_with_retry(content, attempts)
+            except Exception as e:
+                report.add_error(book_id, str(e))
+                continue
+            pending.append((book_id, summary))
+            if len(pending) >= batch_size:
+                await flush()
+
+    async def produce():
+        for book_id in book_ids:
+            if book_id in done:
+                report.skipped += 1
+                continue
+            await queue.put(book_id)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    # The producer runs alongside the workers so a failed write stops it instead of
+    # leaving it blocked on a full queue
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    await flush()
+    return report
+
+
+async def _summarize_with_retry(content, attempts):
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(attempts),
+        wait=wait_random_exponential(multiplier=1, max=30),
+        reraise=True,
+    ):
+        with attempt:
+            return await cached_summarize(content)
+
+
+async def _write_batch(batch, report, checkpoint):
+    """Store (book_id, summary) pairs with a single UPDATE ... FROM (VALUES ...)."""
+    summaries = values(
+        column('book_id', Integer),
+        column('summary', Text),
+        name='new_summaries',
+    ).data(sorted(batch))
+    async with write_session() as session:
+        result = await session.execute(
+            update(Book)
+            .where(Book.id == summaries.c.book_id)
+            .values(summary=summaries.c.summary)
+            .returning(Book.id)
+        )
+        updated = set(result.scalars().all())
+
+    book_ids = [book_id for book_id, _ in batch]
+    await invalidate_book(*book_ids)
+    for book_id in book_ids:
+        if book_id in updated:
+            report.summarized += 1
+        else:
+            report.add_error(book_id, "Book not found")
+    if checkpoint is not None:
+        checkpoint.add(book_ids)
+
+
+@job_handler('summarize_books')
+async def summarize_books_job(payload):
+    """Summarize every `{book_id, content}` item of `payload['books']`."""
+    contents = {item['book_id']: item['content'] for item in payload['books']}
+    report = await summarize_books(list(contents), contents.get)
+    return report.to_dict()
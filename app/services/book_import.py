@@ -0,0 +1,79 @@
+import asyncpg
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Book
+from app.utils.db_utils import write_session, copy_records
+from app.utils.ingest import INT4_MAX, INT4_MIN, ImportReport, parse_int4, read_batches
+
+# Rows written per COPY; each batch is committed on its own
+IMPORT_BATCH_SIZE = 5000
+
+BOOK_COLUMNS = ('title', 'author', 'genre', 'year_published', 'summary')
+_STRING_LIMITS = {
+    'title': Book.title.type.length,
+    'author': Book.author.type.length,
+    'genre': Book.genre.type.length,
+}
+
+
+def validate_book(record):
+    """Validate one imported record, returning (row tuple in BOOK_COLUMNS order, None) or (None, error)."""
+    for field in ('title', 'author'):
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            return None, f"Missing required field: {field}"
+
+    for field, limit in _STRING_LIMITS.items():
+        value = record.get(field)
+        if value is not None and (not isinstance(value, str) or len(value) > limit):
+            return None, f"{field} must be a string of at most {limit} characters"
+
+    year_published = record.get('year_published')
+    if year_published is not None:
+        year_published = parse_int4(year_published)
+        if year_published is None:
+            return None, f"year_published must be an integer between {INT4_MIN} and {INT4_MAX}"
+
+    summary = record.get('summary')
+    if summary is not None and not isinstance(summary, str):
+        return None, "summary must be a string"
+
+    return (record['title'], record['author'], record.get('genre'), year_published, summary), None
+
+
+async def copy_books(session, rows):
+    """Write validated book tuples with a single COPY."""
+    await copy_records(session, Book.__tablename__, BOOK_COLUMNS, rows)
+
+
+async def import_books(records, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and insert (row_number, record, error) tuples from `iter_records` in COPY batches.
+
+    Invalid rows are reported and skipped; a batch the database rejects is reported
+    row by row and rolled back on its own, without affecting the other batches.
+    """
+    report = ImportReport()
+
+    async for records_batch in read_batches(records, batch_size):
+        batch, batch_rows = [], []
+        for row_number, record, error in records_batch:
+            if error is None:
+                row, error = validate_book(record)
+            if error is not None:
+                report.add_error(row_number, error)
+                continue
+            batch.append(row)
+            batch_rows.append(row_number)
+        if batch:
+            await _write_batch(batch, batch_rows, report)
+
+    return report
+
+
+async def _write_batch(batch, batch_rows, report):
+    try:
+        async with write_session() as session:
+            await copy_books(session, batch)
+        report.inserted += len(batch)
+    except (SQLAlchemyError, asyncpg.PostgresError) as e:
+        for row_number in batch_rows:
+            report.add_error(row_number, f"Batch rejected by the database: {e.__cause__ or e}")
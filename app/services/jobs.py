@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy import and_, delete, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from app import config
+from app.models import Job
+from app.utils.db_utils import read_session, write_session
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+PENDING = (QUEUED, RUNNING)
+
+# Fields returned by GET /jobs/<id>
+JOB_FIELDS = ('id', 'kind', 'status', 'result', 'error', 'attempts', 'created_at', 'started_at', 'finished_at')
+
+# kind -> async handler(payload) returning a JSON-serializable result
+JOB_HANDLERS = {}
+
+# Predicate of the partial unique index ux_jobs_dedupe_key_pending, spelled exactly as in the
+# index: ON CONFLICT only infers the index when its WHERE provably implies the index's, and a
+# bound-parameter IN (...) stops proving that once PostgreSQL switches to a generic plan
+PENDING_INDEX_WHERE = text("status IN ('queued', 'running')")
+
+# What enqueue() did: `created` is False when an identical pending job was reused
+Enqueued = namedtuple('Enqueued', ['id', 'status', 'created'])
+
+# Seconds between sweeps of finished jobs older than JOB_RETENTION_DAYS
+PURGE_INTERVAL = 60 * 60
+
+
+def job_handler(kind):
+    """Register an async function as the handler of one kind of job."""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+async def enqueue(kind, payload, dedupe_key=None):
+    """
+    Persist a new job and wake this process's runners; returns an `Enqueued`.
+
+    While a job with the same `dedupe_key` is queued or running, no new job is
+    created and that job is returned instead, with created=False.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job kind {kind!r}")
+    # Two tries: the pending job we collided with may finish before we can read its id
+    for _ in range(2):
+        job_id = uuid.uuid4()
+        async with write_session() as session:
+            inserted = await session.execute(
+                insert(Job)
+                .values(id=job_id, kind=kind, payload=payload, dedupe_key=dedupe_key)
+                .on_conflict_do_nothing(index_elements=[Job.dedupe_key], index_where=PENDING_INDEX_WHERE)
+                .returning(Job.id)
+            )
+            if inserted.first() is None:
+                existing = await session.execute(
+                    select(Job.id, Job.status).where(Job.dedupe_key == dedupe_key, Job.status.in_(PENDING))
+                )
+                existing = existing.first()
+                if existing is not None:
+                    return Enqueued(existing.id, existing.status, False)
+                continue
+        job_runner.wake()
+        return Enqueued(job_id, QUEUED, True)
+    raise RuntimeError(f"Could not enqueue {kind} job {dedupe_key!r}")
+
+
+async def get_job(job_id):
+    """Status row of a job, or None if it does not exist (or was purged)."""
+    async with read_session() as session:
+        job = await session.execute(select(*(getattr(Job, name) for name in JOB_FIELDS)).where(Job.id == job_id))
+        return job.first()
+
+
+async def claim_job(session):
+    """
+    Mark the oldest runnable job as running and return it, or None.
+
+    SKIP LOCKED lets the runners of every process claim concurrently without
+    blocking on each other. Runners refresh `started_at` while a job runs, so
+    jobs left running past JOB_TIMEOUT belonged to a runner that died and are
+    claimed again.
+    """
+    abandoned = func.now() - timedelta(seconds=config.JOB_TIMEOUT)
+    candidate = (
+        select(Job.id)
+        .where(or_(Job.status == QUEUED, and_(Job.status == RUNNING, Job.started_at < abandoned)))
+        .order_by(Job.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    claimed = await session.execute(
+        update(Job)
+        .where(Job.id == candidate)
+        .values(status=RUNNING, started_at=func.now(), attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts)
+    )
+    return claimed.first()
+
+
+async def touch_job(job_id, attempt):
+    """Heartbeat of a running job: push `started_at` forward so it is not taken for abandoned."""
+    async with write_session() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == attempt, Job.status == RUNNING)
+            .values(started_at=func.now())
+        )
+
+
+async def finish_job(job_id, attempt, status, result=None, error=None):
+    """
+    Record the outcome of one attempt. Nothing is written once the job has been
+    claimed again, so a runner that lost its claim cannot overwrite the newer attempt.
+    """
+    async with write_session() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == attempt)
+            .values(status=status, result=result, error=error, finished_at=func.now())
+        )
+
+
+async def purge_finished_jobs():
+    cutoff = func.now() - timedelta(days=config.JOB_RETENTION_DAYS)
+    async with write_session() as session:
+        purged = await session.execute(
+            delete(Job).where(Job.status.in_((SUCCEEDED, FAILED)), Job.finished_at < cutoff)
+        )
+    return purged.rowcount
+
+
+class JobRunner:
+    """
+    Bounded pool of coroutines, on the current process's event loop, that run queued jobs.
+
+    At most `concurrency` jobs run at once per process. Jobs live in the `jobs` table,
+    so any process can enqueue and any process's runners can pick the work up;
+    `wake` gets local runners going at once, others notice within `poll_interval`.
+    """
+
+    def __init__(self, concurrency, poll_interval):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._pid = None
+        self._tasks = []
+        self._wakeup = None
+        self._next_purge = 0.0
+        self.active = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the runners on the running event loop, once per process; a no-op with concurrency 0."""
+        if not self.concurrency or (self._pid == os.getpid() and self._tasks):
+            return
+        self._pid = os.getpid()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(), name=f'job-runner-{n}') for n in range(self.concurrency)]
+
+    def wake(self):
+        self.start()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def serve(self):
+        """Run until cancelled; used by `flask run-jobs` and the ASGI entry point."""
+        self.start()
+        await asyncio.gather(*self._tasks)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                if await self.run_once():
+                    continue
+                await self._maybe_purge()
+            except Exception:
+                # Database unavailable and the like; back off and try again
+                logger.exception("Job runner iteration failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self):
+        """Claim and run one job; returns False when there was nothing to run."""
+        async with write_session() as session:
+            job = await claim_job(session)
+        if job is None:
+            return False
+
+        handler = JOB_HANDLERS.get(job.kind)
+        if job.attempts > config.JOB_MAX_ATTEMPTS:
+            await self._fail(job, f"Abandoned after {job.attempts - 1} attempts")
+        elif handler is None:
+            await self._fail(job, f"No handler registered for job kind {job.kind!r}")
+        else:
+            self.active += 1
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                result = await handler(job.payload)
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                await self._fail(job, str(e))
+            else:
+                await finish_job(job.id, job.attempts, SUCCEEDED, result=result)
+                self.succeeded += 1
+            finally:
+                heartbeat.cancel()
+                self.active -= 1
+        return True
+
+    async def _heartbeat(self, job):
+        # Long jobs (batch summaries) outlive JOB_TIMEOUT; keep them from being claimed twice
+        while True:
+            await asyncio.sleep(config.JOB_TIMEOUT / 3)
+            try:
+                await touch_job(job.id, job.attempts)
+            except Exception:
+                logger.exception("Heartbeat of job %s failed", job.id)
+
+    async def _fail(self, job, error):
+        await finish_job(job.id, job.attempts, FAILED, error=error)
+        self.failed += 1
+
+    async def _maybe_purge(self):
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL
+        purged = await purge_finished_jobs()
+        if purged:
+            logger.info("Purged %d finished job(s)", purged)
+
+    def snapshot(self):
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+job_runner = JobRunner(config.JOB_CONCURRENCY, config.JOB_POLL_INTERVAL)
@@ -1,21 +1,33 @@
-import requests  # or any other method to call your model
-import json
-import ollama
+from app import config
+from app.services.llm_backend import create_backend
+from app.utils.rate_limit import ConcurrencyLimit
 
-def generate_summary(content: str) -> str:
+# Backend every summary is generated with, chosen by LLM_BACKEND/LLM_MODEL
+backend = create_backend()
+
+# Caps the model calls this process makes at once, whether from requests, jobs or batches
+llm_slots = ConcurrencyLimit(config.LLM_MAX_CONCURRENCY)
+
+# Model used for every summary; part of the summary cache key
+MODEL = backend.model
+
+SUMMARY_PROMPT = """
+    Write a summary of the following content:
+    {content}
+"""
+
+async def generate_summary(content: str, prompt: str = SUMMARY_PROMPT, timeout: float = None) -> str:
     """
-    Interact with the Llama3 model to generate a summary of the provided content.
-    This is a placeholder function; implement the actual model call here.
+    Ask the configured model for a summary of the provided content.
+    `prompt` must contain a `{content}` placeholder; long texts should go through
+    `app.services.summarizer.summarize`, which splits them to fit the model's context.
     """
-    try:
-        summary_prompt = f"""
-            Write a summary of the following content:
-            {content}
-        """
-        # Example API call to the Llama3 model
-        response = ollama.generate(model='llama3.1', prompt=summary_prompt)
+    async with llm_slots:
+        return await backend.generate(prompt.format(content=content), timeout)
+
 
-        # Assuming the model returns a JSON response with the summary
-        return response.get("response", "No summary generated.")
-    except Exception as e:
-        raise Exception(f"An error occurred while generating summary: {e}")
\ No newline at end of file
+async def stream_summary(content: str, prompt: str = SUMMARY_PROMPT, timeout: float = None):
+    """Like `generate_summary`, but yield the summary's text fragments as the model produces them."""
+    async with llm_slots:
+        async for fragment in backend.stream(prompt.format(content=content), timeout):
+            yield fragment
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+import httpx
+import orjson
+from app import config
+
+
+class LLMError(Exception):
+    """A model call failed: the backend was unreachable, timed out or returned an error."""
+
+
+class LLMBackend(ABC):
+    """
+    A text generation backend. `model` identifies what produces the text; it is part of
+    the summary cache key, so switching backend or model never serves the other's summaries.
+    """
+
+    model = None
+
+    @abstractmethod
+    async def generate(self, prompt, timeout=None):
+        """The full completion of `prompt`."""
+
+    @abstractmethod
+    def stream(self, prompt, timeout=None):
+        """Async generator of the completion's text fragments as they are produced."""
+
+    async def aclose(self):
+        pass
+
+
+class OllamaBackend(LLMBackend):
+    """
+    Ollama's HTTP API through one pooled httpx client, so calls reuse open connections.
+
+    `timeout` bounds each call; for streams it bounds the wait for every next fragment.
+    """
+
+    def __init__(self, base_url, model, timeout, connect_timeout, max_connections, transport=None):
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client = None
+        self._loop = None
+
+    def _get_client(self):
+        # httpx clients are tied to the event loop that opened their connections; the app uses
+        # one long-lived loop per process, CLI commands a fresh one per asyncio.run
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+            self._loop = loop
+        return self._client
+
+    def _timeout(self, timeout):
+        return httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout)
+
+    async def generate(self, prompt, timeout=None):
+        try:
+            response = await self._get_client().post(
+                '/api/generate',
+                json={"model": self.model, "prompt": prompt, "stream": False},
+                timeout=self._timeout(timeout),
+            )
+            response.raise_for_status()
+            return response.json()["response"]
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            raise LLMError(f"{self.model} request failed: {e}") from e
+
+    async def stream(self, prompt, timeout=None):
+        try:
+            async with self._get_client().stream(
+                'POST',
+                '/api/generate',
+                json={"model": self.model, "prompt": prompt, "stream": True},
+                timeout=self._timeout(timeout),
+            ) as response:
+                response.raise_for_status()
+                # One JSON object per line, the last with "done": true
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    part = orjson.loads(line)
+                    if part.get("error"):
+                        raise LLMError(f"{self.model} request failed: {part['error']}")
+                    if part.get("response"):
+                        yield part["response"]
+                    if part.get("done"):
+                        return
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(f"{self.model} request failed: {e}") from e
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic stand-in for a model server, for load tests and local development.
+
+    The completion is built from the prompt's own words, so equal prompts always get
+    equal summaries. Each call waits `latency_ms` before its first fragment and
+    `token_latency_ms` between fragments, roughly like a model generating tokens.
+    """
+
+    model = 'fake'
+
+    def __init__(self, latency_ms=0, token_latency_ms=0, words=40):
+        self.latency_ms = latency_ms
+        self.token_latency_ms = token_latency_ms
+        self.words = words
+
+    def _completion(self, prompt):
+        words = prompt.split()
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        return [f"[{digest}]"] + words[-self.words:]
+
+    async def generate(self, prompt, timeout=None):
+        fragments = self._completion(prompt)
+        await asyncio.sleep((self.latency_ms + self.token_latency_ms * (len(fragments) - 1)) / 1000)
+        return ' '.join(fragments)
+
+    async def stream(self, prompt, timeout=None):
+        await asyncio.sleep(self.latency_ms / 1000)
+        for index, fragment in enumerate(self._completion(prompt)):
+            if index:
+                await asyncio.sleep(self.token_latency_ms / 1000)
+                fragment = ' ' + fragment
+            yield fragment
+
+
+def create_backend():
+    """The backend selected by LLM_BACKEND."""
+    if config.LLM_BACKEND == 'fake':
+        return FakeBackend(config.FAKE_LLM_LATENCY_MS, config.FAKE_LLM_TOKEN_LATENCY_MS)
+    if config.LLM_BACKEND == 'ollama':
+        return OllamaBackend(
+            config.LLM_URL,
+            config.LLM_MODEL,
+            config.LLM_TIMEOUT,
+            config.LLM_CONNECT_TIMEOUT,
+            config.LLM_MAX_CONNECTIONS,
+        )
+    raise ValueError(f"Unknown LLM_BACKEND {config.LLM_BACKEND!r}; expected 'ollama' or 'fake'")
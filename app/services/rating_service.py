@@ -0,0 +1,88 @@
+from sqlalchemy import update, select, func, and_, exists, tuple_, values, column, Integer, BigInteger
+from app.models import Book, Review
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+
+def is_valid_rating(rating):
+    return isinstance(rating, int) and not isinstance(rating, bool) and MIN_RATING <= rating <= MAX_RATING
+
+
+def average_rating(review_count, rating_sum):
+    """Average rating from the denormalized aggregates, None for a book without reviews."""
+    if not review_count:
+        return None
+    return rating_sum / review_count
+
+
+async def add_rating(session, book_id, rating):
+    """
+    Fold one new review's rating into the book's aggregates, inside the caller's transaction.
+
+    Returns False when the book does not exist, so callers can 404 before adding the review.
+    """
+    result = await session.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(review_count=Book.review_count + 1, rating_sum=Book.rating_sum + rating)
+    )
+    return result.rowcount > 0
+
+
+async def apply_rating_deltas(session, deltas):
+    """
+    Fold a batch of new ratings into the aggregates with one grouped UPDATE ... FROM (VALUES ...).
+
+    `deltas` maps book_id to (added review count, added rating sum).
+    """
+    if not deltas:
+        return
+    batch = values(
+        column('book_id', Integer),
+        column('review_count', Integer),
+        column('rating_sum', BigInteger),
+        name='rating_deltas',
+    ).data([(book_id, count, total) for book_id, (count, total) in sorted(deltas.items())])
+    await session.execute(
+        update(Book)
+        .where(Book.id == batch.c.book_id)
+        .values(
+            review_count=Book.review_count + batch.c.review_count,
+            rating_sum=Book.rating_sum + batch.c.rating_sum,
+        )
+    )
+
+
+async def reconcile_ratings(session):
+    """
+    Recompute review_count/rating_sum for every book from the reviews table in two set-based
+    UPDATEs, touching only rows whose aggregates have drifted. Returns the number of books fixed.
+    """
+    totals = (
+        select(
+            Review.book_id,
+            func.count().label('review_count'),
+            func.sum(Review.rating).label('rating_sum'),
+        )
+        .group_by(Review.book_id)
+        .subquery()
+    )
+    refreshed = await session.execute(
+        update(Book)
+        .where(
+            Book.id == totals.c.book_id,
+            tuple_(Book.review_count, Book.rating_sum).is_distinct_from(
+                tuple_(totals.c.review_count, totals.c.rating_sum)
+            ),
+        )
+        .values(review_count=totals.c.review_count, rating_sum=totals.c.rating_sum)
+    )
+    cleared = await session.execute(
+        update(Book)
+        .where(
+            and_(Book.review_count != 0, ~exists().where(Review.book_id == Book.id))
+        )
+        .values(review_count=0, rating_sum=0)
+    )
+    return refreshed.rowcount + cleared.rowcount
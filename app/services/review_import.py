@@ -0,0 +1,89 @@
+import asyncpg
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Book, Review
+from app.services.rating_service import apply_rating_deltas, is_valid_rating, MIN_RATING, MAX_RATING
+from app.utils.cache import invalidate_reviews
+from app.utils.db_utils import write_session, copy_records
+from app.utils.ingest import INT4_MAX, INT4_MIN, ImportReport, parse_int4, read_batches
+
+# Reviews written per COPY; each batch and its aggregate update commit together
+IMPORT_BATCH_SIZE = 5000
+
+REVIEW_COLUMNS = ('book_id', 'review_text', 'rating')
+
+
+def validate_review(record):
+    """Validate one imported record, returning (row tuple in REVIEW_COLUMNS order, None) or (None, error)."""
+    book_id = record.get('book_id')
+    if book_id is None or book_id == '':
+        return None, "Missing required field: book_id"
+    book_id = parse_int4(book_id)
+    if book_id is None:
+        return None, f"book_id must be an integer between {INT4_MIN} and {INT4_MAX}"
+
+    review_text = record.get('review_text')
+    if not isinstance(review_text, str) or not review_text.strip():
+        return None, "Missing required field: review_text"
+
+    rating = record.get('rating')
+    if isinstance(rating, str) and rating.strip().isdigit():
+        rating = int(rating)
+    if not is_valid_rating(rating):
+        return None, f"rating must be an integer between {MIN_RATING} and {MAX_RATING}"
+
+    return (book_id, review_text, rating), None
+
+
+async def import_reviews(records, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and insert (row_number, record, error) tuples from `iter_records` in COPY batches,
+    updating the rating aggregates of every touched book with one grouped UPDATE per batch.
+    """
+    report = ImportReport()
+
+    async for records_batch in read_batches(records, batch_size):
+        batch, batch_rows = [], []
+        for row_number, record, error in records_batch:
+            if error is None:
+                row, error = validate_review(record)
+            if error is not None:
+                report.add_error(row_number, error)
+                continue
+            batch.append(row)
+            batch_rows.append(row_number)
+        if batch:
+            await _write_batch(batch, batch_rows, report)
+
+    return report
+
+
+async def _write_batch(batch, batch_rows, report):
+    # Row numbers that have not been reported yet, in case the database rejects the batch
+    pending = batch_rows
+    try:
+        async with write_session() as session:
+            existing = await session.execute(
+                select(Book.id).where(Book.id.in_({row[0] for row in batch}))
+            )
+            existing = set(existing.scalars().all())
+
+            rows, pending, deltas = [], [], {}
+            for row, row_number in zip(batch, batch_rows):
+                book_id, _, rating = row
+                if book_id not in existing:
+                    report.add_error(row_number, "Book not found")
+                    continue
+                rows.append(row)
+                pending.append(row_number)
+                count, total = deltas.get(book_id, (0, 0))
+                deltas[book_id] = (count + 1, total + rating)
+
+            if rows:
+                await copy_records(session, Review.__tablename__, REVIEW_COLUMNS, rows)
+                await apply_rating_deltas(session, deltas)
+        await invalidate_reviews(*deltas)
+        report.inserted += len(rows)
+    except (SQLAlchemyError, asyncpg.PostgresError) as e:
+        for row_number in pending:
+            report.add_error(row_number, f"Batch rejected by the database: {e.__cause__ or e}")
@@ -0,0 +1,140 @@
+import asyncio
+import re
+from app import config
+from app.services import llama_service
+from app.services.llama_service import generate_summary
+
+# Rough size of a token in English prose; good enough to stay clear of the context limit
+CHARS_PER_TOKEN = 4
+
+# Reduce rounds before giving up on shrinking the partial summaries further
+MAX_REDUCE_ROUNDS = 5
+
+CHUNK_PROMPT = """
+    The following is one section of a longer book. Summarize it, keeping the
+    people, events and themes a summary of the whole book would need:
+    {content}
+"""
+
+COMBINE_PROMPT = """
+    The following are summaries of consecutive sections of one book, in order.
+    Write a single summary of the whole book from them:
+    {content}
+"""
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def split_into_chunks(text, max_tokens):
+    """
+    Split text into chunks of at most `max_tokens` (estimated), packing whole paragraphs.
+
+    A paragraph too long for one chunk is split between sentences, and a sentence
+    too long for one chunk between words, so any input yields bounded chunks.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current, size = [], [], 0
+    for piece in _pieces(text, max_chars):
+        # +2 for the blank line that joins pieces inside a chunk
+        if current and size + len(piece) + 2 > max_chars:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def _pieces(text, max_chars):
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if len(sentence) <= max_chars:
+                yield sentence
+            else:
+                yield from _split_words(sentence, max_chars)
+
+
+def _split_words(text, max_chars):
+    piece = ''
+    for word in text.split():
+        # A single word longer than a chunk (e.g. a URL or base64 blob) is cut outright
+        while len(word) > max_chars:
+            if piece:
+                yield piece
+                piece = ''
+            yield word[:max_chars]
+            word = word[max_chars:]
+        if piece and len(piece) + 1 + len(word) > max_chars:
+            yield piece
+            piece = word
+        else:
+            piece = f'{piece} {word}' if piece else word
+    if piece:
+        yield piece
+
+
+async def summarize(content, chunk_tokens=None, parallelism=None):
+    """
+    Summarize content of any length with map-reduce.
+
+    Content that fits in one chunk is summarized with a single call. Otherwise every
+    chunk is summarized concurrently (at most `parallelism` model calls at a time),
+    then the partial summaries are combined, regrouping them into chunks again for as
+    long as they do not fit in one prompt.
+    """
+    semaphore = asyncio.Semaphore(parallelism or config.SUMMARY_PARALLELISM)
+    text, prompt = await _reduce(content, chunk_tokens or config.SUMMARY_CHUNK_TOKENS, semaphore)
+    return await _generate(text, prompt, semaphore)
+
+
+async def stream_summary(content, chunk_tokens=None, parallelism=None):
+    """
+    Async generator of the summary's text fragments, as `summarize` would produce it.
+
+    Long content is still reduced chunk by chunk first; only the final call, the one
+    that writes the summary, is streamed from the model.
+    """
+    semaphore = asyncio.Semaphore(parallelism or config.SUMMARY_PARALLELISM)
+    text, prompt = await _reduce(content, chunk_tokens or config.SUMMARY_CHUNK_TOKENS, semaphore)
+
+    fragments = llama_service.stream_summary(text, prompt) if prompt else llama_service.stream_summary(text)
+    async for fragment in fragments:
+        yield fragment
+
+
+async def _reduce(content, chunk_tokens, semaphore):
+    """The text and prompt of the final model call summarizing `content` (prompt None: SUMMARY_PROMPT)."""
+    chunks = split_into_chunks(content, chunk_tokens)
+    if len(chunks) <= 1:
+        return content, None
+
+    summaries = await _map(chunks, CHUNK_PROMPT, semaphore)
+    for _ in range(MAX_REDUCE_ROUNDS):
+        groups = split_into_chunks('\n\n'.join(summaries), chunk_tokens)
+        if len(groups) == 1 or len(groups) >= len(summaries):
+            break
+        summaries = await _map(groups, COMBINE_PROMPT, semaphore)
+    return '\n\n'.join(summaries), COMBINE_PROMPT
+
+
+async def _map(chunks, prompt, semaphore):
+    return await asyncio.gather(*(_generate(chunk, prompt, semaphore) for chunk in chunks))
+
+
+async def _generate(content, prompt, semaphore):
+    async with semaphore:
+        if prompt is None:
+            return await generate_summary(content)
+        return await generate_summary(content, prompt)
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import re
+import unicodedata
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app import config
+from app.models import SummaryCache
+from app.services import llama_service, summarizer
+from app.utils.db_utils import read_session, write_session
+
+_SPACES = re.compile(r'[ \t\f\v]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def normalize_content(content):
+    """Canonical form of submitted content: NFC, unified line endings, collapsed spacing and blank lines."""
+    content = unicodedata.normalize('NFC', content).replace('\r\n', '\n').replace('\r', '\n')
+    lines = (_SPACES.sub(' ', line).strip() for line in content.split('\n'))
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def summary_key(content):
+    """
+    Hash identifying the summary `content` would get: it covers the model, every prompt
+    template and the chunk size, so changing any of them stops old summaries matching.
+    """
+    parts = (
+        llama_service.MODEL,
+        llama_service.SUMMARY_PROMPT,
+        summarizer.CHUNK_PROMPT,
+        summarizer.COMBINE_PROMPT,
+        str(config.SUMMARY_CHUNK_TOKENS),
+        normalize_content(content),
+    )
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+class SummaryCacheStats:
+    """Per-process counters: hits and coalesced requests were served without a new generation."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def snapshot(self):
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / requests if requests else 0.0,
+        }
+
+
+summary_cache_stats = SummaryCacheStats()
+
+# Generations in progress in this process, by key
+_inflight = {}
+
+
+async def find_summary(key):
+    """Cached summary for `key`, or None; counts a hit when found."""
+    async with read_session() as session:
+        summary = await session.scalar(select(SummaryCache.summary).where(SummaryCache.content_hash == key))
+    if summary is not None:
+        summary_cache_stats.hits += 1
+    return summary
+
+
+async def store_summary(key, summary):
+    async with write_session() as session:
+        await session.execute(
+            insert(SummaryCache)
+            .values(content_hash=key, model=llama_service.MODEL, summary=summary)
+            .on_conflict_do_nothing(index_elements=[SummaryCache.content_hash])
+        )
+
+
+async def cached_summarize(content):
+    """
+    `summarizer.summarize` through the cache.
+
+    Identical content submitted while a generation for it is already running in
+    this process waits for that generation instead of starting another one.
+    """
+    key = summary_key(content)
+    summary = await find_summary(key)
+    if summary is not None:
+        return summary
+
+    task = _inflight.get(key)
+    if task is not None:
+        summary_cache_stats.coalesced += 1
+    else:
+        summary_cache_stats.misses += 1
+        task = asyncio.ensure_future(_generate(key, content))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller going away does not cancel the generation for the others
+    return await asyncio.shield(task)
+
+
+async def _generate(key, content):
+    summary = await summarizer.summarize(content)
+    await store_summary(key, summary)
+    return summary
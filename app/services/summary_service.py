@@ -0,0 +1,27 @@
+from app import db
+from app.models import Book
+from app.services.jobs import job_handler
+from app.services.summary_cache import cached_summarize
+from app.utils.cache import invalidate_book
+from app.utils.db_utils import write_session
+
+
+async def save_summary(book_id, summary):
+    """Store `summary` on the book; returns False if the book does not exist."""
+    async with write_session() as session:
+        updated = await session.execute(db.update(Book).filter_by(id=book_id).values(summary=summary))
+    if not updated.rowcount:
+        return False
+    await invalidate_book(book_id)
+    return True
+
+
+@job_handler('generate_summary')
+async def generate_summary_job(payload):
+    """Summarize `payload['content']` and store it as the summary of `payload['book_id']`."""
+    book_id = payload['book_id']
+    summary = await cached_summarize(payload['content'])
+
+    if not await save_summary(book_id, summary):
+        raise LookupError(f"Book {book_id} no longer exists")
+    return {"summary": summary}
@@ -0,0 +1,202 @@
+import asyncio
+import base64
+import threading
+import time
+import unittest
+from collections import namedtuple
+from unittest.mock import patch, MagicMock, AsyncMock
+from app import config, create_app
+from app.services import auth_service
+from app.services.auth_service import Principal, authenticate_api_key, authenticate_basic, check_secret, hash_secret
+from app.utils.decorators.auth import authenticate_request, blocked_clients
+from app.utils.rate_limit import MemoryStore, parse_rate, rate_limiter
+
+UserRow = namedtuple('UserRow', ['id', 'username', 'password_hash'])
+KeyRow = namedtuple('KeyRow', ['key_hash', 'id', 'username'])
+
+# Cheap hashes keep the tests fast; production hashes use AUTH_SCRYPT_N
+TEST_COST = 2 ** 10
+
+
+def basic(username, password):
+    return {'Authorization': 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()}
+
+
+class PasswordHashTestCase(unittest.TestCase):
+    def test_hash_roundtrip(self):
+        """Test that a hash verifies its secret only, and is salted."""
+        encoded = hash_secret("s3cret", n=TEST_COST)
+
+        self.assertTrue(encoded.startswith(f"scrypt${TEST_COST}$"))
+        self.assertTrue(check_secret("s3cret", encoded))
+        self.assertFalse(check_secret("s3cret!", encoded))
+        self.assertNotEqual(encoded, hash_secret("s3cret", n=TEST_COST))
+        self.assertFalse(check_secret("s3cret", "not-a-hash"))
+
+
+class CredentialVerificationTestCase(unittest.TestCase):
+    def setUp(self):
+        auth_service.credential_cache.clear()
+
+    def _mock_row(self, mock_db_session, row):
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = row
+        return mock_session
+
+    @patch('app.services.auth_service.read_session')
+    def test_password_verified_once(self, mock_db_session):
+        """Test that a verified password is served from the cache and a wrong one is never cached."""
+        mock_session = self._mock_row(mock_db_session, UserRow(7, 'alice', hash_secret('s3cret', n=TEST_COST)))
+
+        async def run():
+            return (
+                await authenticate_basic('alice', 's3cret'),
+                await authenticate_basic('alice', 's3cret'),
+                await authenticate_basic('alice', 'wrong'),
+            )
+
+        first, second, wrong = asyncio.run(run())
+        self.assertEqual(first, Principal(7, 'alice', 'password'))
+        self.assertEqual(second, first)
+        self.assertIsNone(wrong)
+        # The second call was answered from the cache, the wrong password checked again
+        self.assertEqual(mock_session.execute.await_count, 2)
+
+    @patch('app.services.auth_service.check_secret', wraps=check_secret)
+    @patch('app.services.auth_service.read_session')
+    def test_unknown_user_still_hashes(self, mock_db_session, mock_check_secret):
+        """Test that an unknown username costs a hash check like a wrong password would."""
+        self._mock_row(mock_db_session, None)
+
+        self.assertIsNone(asyncio.run(authenticate_basic('nobody', 'guess')))
+        mock_check_secret.assert_called_once()
+
+    @patch('app.services.auth_service.check_secret')
+    @patch('app.services.auth_service.read_session')
+    def test_concurrent_hashes_capped(self, mock_db_session, mock_check_secret):
+        """Test that no more than AUTH_MAX_CONCURRENCY hashes are checked at once."""
+        self._mock_row(mock_db_session, None)
+        lock, running, peak = threading.Lock(), [0], [0]
+
+        def slow_check(secret, encoded):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return False
+
+        mock_check_secret.side_effect = slow_check
+
+        async def run():
+            await asyncio.gather(*(authenticate_basic(f'user{n}', 'guess') for n in range(6)))
+
+        asyncio.run(run())
+        self.assertEqual(mock_check_secret.call_count, 6)
+        self.assertEqual(peak[0], auth_service.verify_slots.limit)
+
+    @patch('app.services.auth_service.read_session')
+    def test_api_key(self, mock_db_session):
+        """Test that a key is found by its prefix and verified against its secret's hash."""
+        self._mock_row(mock_db_session, KeyRow(hash_secret('secret-part', n=TEST_COST), 7, 'alice'))
+
+        async def run():
+            return await authenticate_api_key('bms_ab12cd34_secret-part'), await authenticate_api_key('bms_ab12cd34_other')
+
+        self.assertEqual(asyncio.run(run()), (Principal(7, 'alice', 'api_key'), None))
+
+    @patch('app.services.auth_service.read_session')
+    def test_malformed_api_key(self, mock_db_session):
+        """Test that a key not in bms_<prefix>_<secret> form is rejected without a lookup."""
+        self.assertIsNone(asyncio.run(authenticate_api_key('not-a-key')))
+        mock_db_session.assert_not_called()
+
+
+class AuthenticateDecoratorTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client with the real credential check."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+        real_check = patch('app.utils.decorators.auth.authenticate_request', authenticate_request)
+        real_check.start()
+        self.addCleanup(real_check.stop)
+        # Fresh sign-in budgets for every test
+        store = patch.object(rate_limiter, 'store', MemoryStore())
+        store.start()
+        self.addCleanup(store.stop)
+        blocked_clients.clear()
+        auth_service.credential_cache.clear()
+
+    def _mock_rows(self, mock_db_session, row):
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = row
+
+    def test_every_route_requires_credentials(self):
+        """Test that every API route answers 401 without credentials, i.e. the decorator wraps the registered view."""
+        blueprints = ('book_routes', 'review_routes', 'generate_summary', 'job_routes', 'metrics_routes')
+        rules = [rule for rule in self.app.url_map.iter_rules() if rule.endpoint.split('.')[0] in blueprints]
+        self.assertGreater(len(rules), 10)
+
+        for rule in rules:
+            url = rule.build({arg: 1 for arg in rule.arguments}, append_unknown=False)[1]
+            method = sorted(rule.methods - {'HEAD', 'OPTIONS'})[0]
+            response = self.client.open(url, method=method, json={})
+            self.assertEqual(response.status_code, 401, f"{method} {url}")
+            self.assertIn('Basic', response.headers['WWW-Authenticate'])
+
+    @patch('app.utils.decorators.auth.authenticate_basic', new_callable=AsyncMock)
+    def test_basic_credentials(self, mock_authenticate_basic):
+        """Test that Basic credentials are checked and a wrong password gets 401."""
+        mock_authenticate_basic.side_effect = lambda username, password, admit: (
+            Principal(7, username, 'password') if password == 's3cret' else None
+        )
+
+        self.assertEqual(self.client.get('/metrics', headers=basic('alice', 's3cret')).status_code, 200)
+        self.assertEqual(self.client.get('/metrics', headers=basic('alice', 'wrong')).status_code, 401)
+
+    @patch('app.utils.decorators.auth.authenticate_api_key', new_callable=AsyncMock)
+    def test_api_key_headers(self, mock_authenticate_api_key):
+        """Test that API keys are accepted in X-API-Key and as a Bearer token."""
+        mock_authenticate_api_key.return_value = Principal(7, 'alice', 'api_key')
+
+        self.assertEqual(self.client.get('/metrics', headers={'X-API-Key': 'bms_a_b'}).status_code, 200)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer bms_a_c'}).status_code, 200)
+        self.assertEqual([call.args[0] for call in mock_authenticate_api_key.await_args_list], ['bms_a_b', 'bms_a_c'])
+
+    @patch('app.services.auth_service.check_secret', return_value=False)
+    @patch('app.services.auth_service.read_session')
+    def test_failed_attempts_throttled_before_hashing(self, mock_db_session, mock_check_secret):
+        """Test that an address whose failures exceed RATE_LIMIT_AUTH gets 429 without another lookup or hash."""
+        self._mock_rows(mock_db_session, None)
+        limit = parse_rate(config.RATE_LIMIT_AUTH).limit
+
+        # The bucket allows `limit` failures; the one after empties it and locks the address out
+        for n in range(limit + 1):
+            self.assertEqual(self.client.get('/metrics', headers=basic('alice', f'guess{n}')).status_code, 401)
+        response = self.client.get('/metrics', headers=basic('alice', 'one-more'))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+        self.assertEqual(mock_check_secret.call_count, limit + 1)
+        self.assertEqual(mock_db_session.call_count, limit + 1)
+        # Another address still gets its own budget
+        other = self.client.get('/metrics', headers=basic('alice', 'guess'), environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        self.assertEqual(other.status_code, 401)
+
+    @patch('app.services.auth_service.check_secret', return_value=True)
+    @patch('app.services.auth_service.read_session')
+    def test_valid_users_behind_one_address_not_throttled(self, mock_db_session, mock_check_secret):
+        """Test that many distinct valid users signing in from one proxy address never use up its budget."""
+        self._mock_rows(mock_db_session, UserRow(7, 'user', 'hash'))
+        users = parse_rate(config.RATE_LIMIT_AUTH).limit * 3
+
+        for n in range(users):
+            response = self.client.get('/metrics', headers=basic(f'user{n}', 's3cret'))
+            self.assertEqual(response.status_code, 200, f"user{n}")
+        self.assertEqual(mock_check_secret.call_count, users)
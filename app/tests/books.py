@@ -1,11 +1,18 @@
+import asyncio
+import importlib
 import unittest
+from collections import namedtuple
+from datetime import datetime, timezone
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from flask import Flask, json
 from app import create_app
 from app.models import Book
 from app.routes.book_routes import bp
+from app.utils.cache import book_cache
 from app.utils.db_utils import db_session
+from app.utils.pagination import encode_cursor, decode_cursor
 
 class AddBookTestCase(unittest.TestCase):
     def setUp(self):
@@ -77,7 +84,7 @@ class AddBookTestCase(unittest.TestCase):
         ]
         
         # Mock the database response
-        mock_session.execute.return_value.scalars.return_value.all.return_value = mock_books
+        mock_session.execute.return_value.all.return_value = mock_books
 
         # Make the GET request to fetch all books
         response = await client.get('/books')
@@ -85,9 +92,10 @@ class AddBookTestCase(unittest.TestCase):
         # Assert status code and check response content
         assert response.status_code == 200
         json_data = response.get_json()
-        assert len(json_data) == 2
-        assert json_data[0]["title"] == "Book 1"
-        assert json_data[1]["title"] == "Book 2"
+        assert len(json_data["books"]) == 2
+        assert json_data["books"][0]["title"] == "Book 1"
+        assert json_data["books"][1]["title"] == "Book 2"
+        assert json_data["next_cursor"] is None
 
         # Ensure the session's execute method was called once
         mock_session.execute.assert_called_once()
@@ -262,4 +270,375 @@ class AddBookTestCase(unittest.TestCase):
 
         # Ensure delete and commit were not called
         mock_session.delete.assert_not_called()
-        mock_session.commit.assert_not_called()
\ No newline at end of file
+        mock_session.commit.assert_not_called()
+
+
+BookRow = namedtuple('BookRow', ['id', 'title', 'author'])
+
+
+class BookPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def _mock_session(self, mock_db_session, books):
+        mock_session = AsyncMock()
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.all.return_value = books
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        return mock_session
+
+    def test_cursor_round_trip(self):
+        """Test that a cursor decodes back to the values it was built from."""
+        self.assertEqual(decode_cursor(encode_cursor(42)), [42])
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_books_returns_next_cursor(self, mock_db_session):
+        """Test that a full page carries a cursor pointing at its last book."""
+        books = [BookRow(i, f"Book {i}", "Author") for i in range(1, 4)]
+        self._mock_session(mock_db_session, books)
+
+        response = self.client.get('/books?limit=2')
+
+        self.assertEqual(response.status_code, 200)
+        json_data = response.get_json()
+        self.assertEqual([book["id"] for book in json_data["books"]], [1, 2])
+        self.assertEqual(decode_cursor(json_data["next_cursor"]), ["id", 2, 2])
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_books_filter_and_sort(self, mock_db_session):
+        """Test that filters and sort become WHERE/ORDER BY clauses and the cursor follows the sort."""
+        books = [BookRow(i, f"Book {i}", "Author") for i in range(1, 3)]
+        mock_session = self._mock_session(mock_db_session, books)
+
+        response = self.client.get('/books?author=Author&year_min=1900&year_max=1950&sort=-title&limit=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode_cursor(response.get_json()["next_cursor"]), ["-title", "Book 1", 1])
+        sql = str(mock_session.execute.call_args.args[0])
+        self.assertIn("books.author = :author_1", sql)
+        self.assertIn("books.year_published >= :year_published_1", sql)
+        self.assertIn("books.year_published <= :year_published_2", sql)
+        self.assertIn("ORDER BY books.title DESC, books.id DESC", sql)
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_books_cursor_from_other_sort(self, mock_db_session):
+        """Test that a cursor issued for one sort is rejected for another."""
+        self._mock_session(mock_db_session, [])
+
+        response = self.client.get('/books?sort=title&after=' + encode_cursor("id", 2, 2))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_books_invalid_sort(self):
+        """Test that sorting by an unindexed column is rejected."""
+        response = self.client.get('/books?sort=summary')
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_books_sparse_fields(self, mock_db_session):
+        """Test that `fields` narrows the select to the requested columns plus id."""
+        mock_session = self._mock_session(mock_db_session, [BookRow(1, "Book 1", "Author")])
+
+        response = self.client.get('/books?fields=title,author')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["books"], [{"id": 1, "title": "Book 1", "author": "Author"}])
+        query = mock_session.execute.call_args.args[0]
+        self.assertEqual([column.name for column in query.selected_columns], ["id", "title", "author"])
+
+    def test_get_books_unknown_field(self):
+        """Test that requesting an unknown column is rejected."""
+        response = self.client.get('/books?fields=title,isbn')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown fields: isbn', response.get_data(as_text=True))
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_books_rejects_bad_cursor(self, mock_db_session):
+        """Test that a malformed cursor is rejected before hitting the database."""
+        mock_session = self._mock_session(mock_db_session, [])
+
+        response = self.client.get('/books?after=not-a-cursor')
+
+        self.assertEqual(response.status_code, 400)
+        mock_session.execute.assert_not_called()
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_books_stream_ndjson(self, mock_db_session):
+        """Test streaming every book as NDJSON."""
+        books = [BookRow(i, f"Book {i}", "Author") for i in range(1, 4)]
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+
+        async def partitions():
+            yield books[:2]
+            yield books[2:]
+
+        result = MagicMock()
+        result.partitions.return_value = partitions()
+        mock_session.stream.return_value = result
+
+        response = self.client.get('/books?stream=ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [1, 2, 3])
+        # The cursor needs the transactional (READ ONLY) bind, not the autocommit one
+        mock_db_session.assert_called_once_with(snapshot=True)
+
+
+class BookSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def test_search_requires_query(self):
+        """Test that an empty search is rejected."""
+        response = self.client.get('/books/search?q=')
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.routes.book_routes.read_session')
+    def test_search_fulltext(self, mock_db_session):
+        """Test that full-text matches are returned ranked, without the fuzzy fallback."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        SearchRow = namedtuple('SearchRow', ['id', 'title', 'rank'])
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.all.return_value = [SearchRow(1, "Book 1", 0.5)]
+
+        response = self.client.get('/books/search?q=gatsby&fields=title')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"match": "fulltext", "books": [{"id": 1, "title": "Book 1", "rank": 0.5}]})
+        mock_session.execute.assert_called_once()
+        self.assertIn("books.search_vector @@ websearch_to_tsquery", str(mock_session.execute.call_args.args[0]))
+
+    @patch('app.routes.book_routes.read_session')
+    def test_search_falls_back_to_fuzzy_author(self, mock_db_session):
+        """Test that a query without full-text matches falls back to trigram author matching."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        SearchRow = namedtuple('SearchRow', ['id', 'author', 'rank'])
+        empty, fuzzy = MagicMock(), MagicMock()
+        empty.all.return_value = []
+        fuzzy.all.return_value = [SearchRow(1, "F. Scott Fitzgerald", 0.4)]
+        mock_session.execute.side_effect = [empty, fuzzy]
+
+        response = self.client.get('/books/search?q=fitzgerld&fields=author')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["match"], "fuzzy_author")
+        self.assertIn("books.author % ", str(mock_session.execute.call_args.args[0]))
+
+
+class BookSummaryTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+        book_cache.clear()
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_book_summary_uses_aggregates(self, mock_db_session):
+        """Test that the average rating is read from the aggregates with a single query."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        SummaryRow = namedtuple('SummaryRow', ['summary', 'review_count', 'rating_sum'])
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = SummaryRow("Summary", 4, 18)
+
+        response = self.client.get('/books/1/summary')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"summary": "Summary", "avg_rating": 4.5})
+        mock_session.execute.assert_called_once()
+
+
+FullBookRow = namedtuple('FullBookRow', ['id', 'title', 'author', 'genre', 'year_published', 'summary', 'updated_at'])
+UPDATED_AT = datetime(2024, 9, 2, 10, 0, 0, 250000, tzinfo=timezone.utc)
+
+
+class BookCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+        book_cache.clear()
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_book_served_from_cache(self, mock_db_session):
+        """Test that a second read, with any field selection, does not query the database."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = FullBookRow(1, "Dune", "Herbert", "SF", 1965, None, UPDATED_AT)
+
+        first = self.client.get('/books/1')
+        second = self.client.get('/books/1?fields=title')
+
+        self.assertEqual(first.get_json()["author"], "Herbert")
+        self.assertEqual(second.get_json(), {"id": 1, "title": "Dune"})
+        mock_session.execute.assert_called_once()
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_book_conditional(self, mock_db_session):
+        """Test that a matching ETag gets a 304 from the version lookup alone, without fetching the row."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = FullBookRow(1, "Dune", "Herbert", "SF", 1965, None, UPDATED_AT)
+        mock_session.scalar.return_value = UPDATED_AT
+
+        first = self.client.get('/books/1')
+        etag = first.headers['ETag']
+        self.assertEqual(first.headers['Last-Modified'], 'Mon, 02 Sep 2024 10:00:00 GMT')
+
+        book_cache.clear()
+        response = self.client.get('/books/1', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        mock_session.execute.assert_called_once()
+        # Another projection is another representation
+        self.assertEqual(self.client.get('/books/1?fields=title', headers={'If-None-Match': etag}).status_code, 200)
+
+    @patch('app.routes.book_routes.read_session')
+    def test_get_book_if_modified_since(self, mock_db_session):
+        """Test that If-Modified-Since is honoured from the cached version."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = FullBookRow(1, "Dune", "Herbert", "SF", 1965, None, UPDATED_AT)
+
+        self.client.get('/books/1')
+        current = self.client.get('/books/1', headers={'If-Modified-Since': 'Mon, 02 Sep 2024 10:00:00 GMT'})
+        stale = self.client.get('/books/1', headers={'If-Modified-Since': 'Sun, 01 Sep 2024 10:00:00 GMT'})
+
+        self.assertEqual(current.status_code, 304)
+        self.assertEqual(stale.status_code, 200)
+        mock_session.execute.assert_called_once()
+
+    @patch('app.routes.book_routes.read_session')
+    def test_missing_book_not_cached(self, mock_db_session):
+        """Test that a 404 is not remembered."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = None
+
+        self.assertEqual(self.client.get('/books/7').status_code, 404)
+        self.assertEqual(self.client.get('/books/7').status_code, 404)
+        self.assertEqual(mock_session.execute.call_count, 2)
+
+    @patch('app.routes.book_routes.write_session')
+    def test_update_invalidates_cache(self, mock_db_session):
+        """Test that updating a book drops its cached reads."""
+        asyncio.run(book_cache.set('book:1', {"id": 1, "title": "Old"}))
+        asyncio.run(book_cache.set('summary:1', {"summary": None, "avg_rating": None}))
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.scalars.return_value.first.return_value = MagicMock()
+
+        response = self.client.put('/books/1', json={"title": "New"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(asyncio.run(book_cache.get('book:1')))
+        self.assertIsNone(asyncio.run(book_cache.get('summary:1')))
+
+
+class BulkImportTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    @patch('app.services.book_import.copy_books', new_callable=AsyncMock)
+    @patch('app.services.book_import.write_session')
+    def test_bulk_ndjson_reports_bad_rows(self, mock_db_session, mock_copy_books):
+        """Test that valid NDJSON rows are copied and invalid ones are reported by row number."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        body = "\n".join([
+            json.dumps({"title": "Book 1", "author": "Author 1", "year_published": 2001}),
+            "{not json",
+            json.dumps({"title": "Book 3"}),
+            json.dumps({"title": "Book 4", "author": "Author 4"}),
+        ])
+
+        response = self.client.post('/books/bulk', data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual(report["failed"], 2)
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 3])
+        rows = mock_copy_books.call_args.args[1]
+        self.assertEqual(rows, [("Book 1", "Author 1", None, 2001, None), ("Book 4", "Author 4", None, None, None)])
+
+    @patch('app.services.book_import.copy_books', new_callable=AsyncMock)
+    @patch('app.services.book_import.write_session')
+    def test_bulk_csv(self, mock_db_session, mock_copy_books):
+        """Test importing CSV, where empty cells become NULLs."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        body = "title,author,genre,year_published\nBook 1,Author 1,,1999\n"
+
+        response = self.client.post('/books/bulk', data=body, content_type='text/csv')
+
+        self.assertEqual(response.get_json()["inserted"], 1)
+        self.assertEqual(mock_copy_books.call_args.args[1], [("Book 1", "Author 1", None, 1999, None)])
+
+    @patch('app.services.book_import.copy_books', new_callable=AsyncMock)
+    @patch('app.services.book_import.write_session')
+    def test_bulk_chunked_upload_over_asgi(self, mock_db_session, mock_copy_books):
+        """Test that a chunked upload without Content-Length reaches the import through the ASGI app."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        with patch('app.utils.event_loop.worker_loop.submit', lambda coro: coro.close()):
+            asgi = importlib.import_module('asgi')
+
+        async def body():
+            for n in range(1, 4):
+                yield (json.dumps({"title": f"Book {n}", "author": "Author"}) + "\n").encode()
+
+        async def upload():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url='http://test') as client:
+                return await client.post('/books/bulk', content=body(), headers={'Content-Type': 'application/x-ndjson'})
+
+        response = asyncio.run(upload())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["inserted"], 3)
+        self.assertEqual(len(mock_copy_books.call_args.args[1]), 3)
+
+    @patch('app.services.book_import.copy_books', new_callable=AsyncMock)
+    @patch('app.services.book_import.write_session')
+    def test_bulk_rejects_out_of_range_years(self, mock_db_session, mock_copy_books):
+        """Test that booleans and years outside INTEGER fail their own row instead of the whole COPY batch."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        body = "\n".join(json.dumps({"title": f"Book {n}", "author": "Author", "year_published": year})
+                         for n, year in enumerate([1999, True, 2 ** 31, -2 ** 31 - 1, "1e400"], start=1))
+
+        response = self.client.post('/books/bulk', data=body, content_type='application/x-ndjson')
+
+        report = response.get_json()
+        self.assertEqual(report["inserted"], 1)
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 3, 4, 5])
+        self.assertIn("year_published must be an integer", report["errors"][0]["error"])
+        self.assertEqual(mock_copy_books.call_args.args[1], [("Book 1", "Author", None, 1999, None)])
+
+    def test_bulk_unsupported_content_type(self):
+        """Test that bodies other than JSON, NDJSON or CSV are rejected."""
+        response = self.client.post('/books/bulk', data="<books/>", content_type='application/xml')
+
+        self.assertEqual(response.status_code, 415)
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from app.utils.cache import LRUCache, SQLiteBackend, TieredCache, create_cache, estimate_size
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        """Test that reading an entry protects it from the next eviction."""
+        cache = LRUCache(max_entries=2, ttl=60, max_bytes=1024)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_memory_budget(self):
+        """Test that entries are evicted to keep the estimated size under max_bytes."""
+        value = {"summary": "x" * 100}
+        cache = LRUCache(max_entries=100, ttl=60, max_bytes=estimate_size(value) * 2)
+        for key in range(3):
+            cache.set(key, value)
+
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertLessEqual(stats["bytes"], stats["max_bytes"])
+        self.assertIsNone(cache.get(0))
+
+    def test_oversized_value_not_cached(self):
+        """Test that a value larger than the whole budget is skipped."""
+        cache = LRUCache(max_entries=10, ttl=60, max_bytes=8)
+        cache.set('a', "x" * 100)
+
+        self.assertIsNone(cache.get('a'))
+
+    @patch('app.utils.cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        """Test that entries older than the TTL count as misses."""
+        cache = LRUCache(max_entries=10, ttl=5, max_bytes=1024)
+        mock_monotonic.return_value = 100.0
+        cache.set('a', 1)
+        mock_monotonic.return_value = 106.0
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    @patch('app.utils.cache.time.monotonic')
+    def test_invalidate_holds_key_down(self, mock_monotonic):
+        """Test that a read finishing just after a write cannot put the old value back."""
+        cache = LRUCache(max_entries=10, ttl=60, max_bytes=1024, hold_down=2)
+        mock_monotonic.return_value = 100.0
+        cache.set('a', "old")
+        cache.invalidate('a')
+        cache.set('a', "old")
+        self.assertIsNone(cache.get('a'))
+
+        mock_monotonic.return_value = 103.0
+        cache.set('a', "new")
+        self.assertEqual(cache.get('a'), "new")
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+
+class SharedCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        """Two workers sharing one SQLite file, as two processes on a host would."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, 'cache.sqlite3')
+        self.workers = [
+            TieredCache(LRUCache(max_entries=100, ttl=60, max_bytes=4096, hold_down=1),
+                        SQLiteBackend(path, sync_interval=0), ttl=60, hold_down=1)
+            for _ in range(2)
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_value_shared_between_workers(self):
+        """Test that one worker's cached read is a hit in the other."""
+        first, second = self.workers
+
+        async def run():
+            await first.set('book:1', {"id": 1, "title": "Dune"})
+            return await second.get('book:1')
+
+        self.assertEqual(asyncio.run(run()), {"id": 1, "title": "Dune"})
+        self.assertEqual(second.stats()["shared_hits"], 1)
+
+    def test_invalidation_reaches_other_workers(self):
+        """Test that an invalidation drops the other worker's local copy and blocks re-caching."""
+        first, second = self.workers
+
+        async def run():
+            await first.get('book:1')
+            await second.get('book:1')
+            await first.set('book:1', {"title": "Old"})
+            self.assertEqual(await second.get('book:1'), {"title": "Old"})
+
+            await first.invalidate('book:1')
+            await second.set('book:1', {"title": "Old"})
+            return await second.get('book:1'), await first.get('book:1')
+
+        self.assertEqual(asyncio.run(run()), (None, None))
+        self.assertEqual(second.stats()["remote_invalidations"], 1)
+
+    def test_versions_shared_between_workers(self):
+        """Test that a version bump in one worker moves the other to the new version."""
+        first, second = self.workers
+
+        async def run():
+            version = await first.version('reviews:1')
+            self.assertEqual(await second.version('reviews:1'), version)
+
+            await second.bump_version('reviews:1')
+
+            self.assertNotEqual(await first.version('reviews:1'), version)
+            self.assertEqual(await first.version('reviews:1'), await second.version('reviews:1'))
+
+        asyncio.run(run())
+
+    def test_slow_backend_does_not_block_the_loop(self):
+        """Test that other coroutines keep running while a shared-tier call waits on a lock."""
+        first, _ = self.workers
+        real_get = first.shared.get
+
+        def locked_get(key):
+            time.sleep(0.2)
+            return real_get(key)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await first.get('book:1')
+            task.cancel()
+            return ticks
+
+        with patch.object(first.shared, 'get', locked_get):
+            self.assertGreater(asyncio.run(run()), 5)
+
+    def test_local_cache_with_several_workers_warns(self):
+        """Test that a per-worker cache behind several workers is reported at startup, and one worker is not."""
+        with patch('app.utils.cache.config.CACHE_BACKEND', 'local'), \
+                patch('app.utils.cache.config.WEB_CONCURRENCY', 4), \
+                self.assertLogs('app.utils.cache', level='WARNING') as logs:
+            self.assertIsNone(create_cache().shared)
+        self.assertIn("WEB_CONCURRENCY=4", logs.output[0])
+
+        with patch('app.utils.cache.config.CACHE_BACKEND', 'local'), \
+                patch('app.utils.cache.config.WEB_CONCURRENCY', 1), \
+                patch('app.utils.cache.logger') as mock_logger:
+            create_cache()
+        mock_logger.warning.assert_not_called()
@@ -0,0 +1,109 @@
+import gzip
+import unittest
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch, MagicMock, AsyncMock
+from flask import jsonify
+from app import create_app
+from app.utils.cache import book_cache
+
+BookRow = namedtuple('BookRow', ['id', 'title', 'author'])
+FullBookRow = namedtuple('FullBookRow', ['id', 'title', 'author', 'genre', 'year_published', 'summary', 'updated_at'])
+
+
+class JSONProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test app."""
+        self.app = create_app()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def test_matches_default_encoder(self):
+        """Test that values outside plain JSON encode as they did with Flask's stdlib provider."""
+        with self.app.test_request_context():
+            response = jsonify({"price": Decimal("9.50"), "at": datetime(2024, 9, 2, tzinfo=timezone.utc), 1: "a"})
+
+        self.assertEqual(response.get_json(), {"price": "9.50", "at": "Mon, 02 Sep 2024 00:00:00 GMT", "1": "a"})
+        self.assertTrue(response.get_data().endswith(b'\n'))
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+        book_cache.clear()
+
+    def _mock_books(self, mock_db_session, count):
+        mock_session = AsyncMock()
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.all.return_value = [BookRow(i, f"Book {i}", "Author") for i in range(1, count + 1)]
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        return mock_session
+
+    @patch('app.routes.book_routes.read_session')
+    def test_large_page_gzipped(self, mock_db_session):
+        """Test that a page above the size threshold is gzipped for clients that accept it."""
+        self._mock_books(mock_db_session, 200)
+
+        response = self.client.get('/books?limit=100', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        body = gzip.decompress(response.get_data())
+        self.assertLess(len(response.get_data()), len(body) / 5)
+        self.assertIn(b'"title":"Book 100"', body)
+
+    @patch('app.routes.book_routes.read_session')
+    def test_small_or_unaccepted_not_compressed(self, mock_db_session):
+        """Test that small bodies, and clients without Accept-Encoding, get identity responses."""
+        self._mock_books(mock_db_session, 200)
+
+        small = self.client.get('/books?limit=1', headers={'Accept-Encoding': 'gzip'})
+        identity = self.client.get('/books?limit=100')
+
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(len(identity.get_json()["books"]), 100)
+
+    @patch('app.routes.book_routes.read_session')
+    def test_stream_compressed(self, mock_db_session):
+        """Test that streamed NDJSON is compressed chunk by chunk."""
+        books = [BookRow(i, f"Book {i}", "Author") for i in range(1, 4)]
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+
+        async def partitions():
+            yield books[:2]
+            yield books[2:]
+
+        result = MagicMock()
+        result.partitions.return_value = partitions()
+        mock_session.stream.return_value = result
+
+        response = self.client.get('/books?stream=ndjson', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.get_data()).count(b'\n'), 3)
+
+    @patch('app.utils.compression.config.COMPRESS_MIN_SIZE', 0)
+    @patch('app.routes.book_routes.read_session')
+    def test_etag_per_coding(self, mock_db_session):
+        """Test that compressed bodies get their own strong ETag, which still revalidates."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = FullBookRow(
+            1, "Dune", "Herbert", "SF", 1965, None, datetime(2024, 9, 2, tzinfo=timezone.utc)
+        )
+
+        plain = self.client.get('/books/1')
+        compressed = self.client.get('/books/1', headers={'Accept-Encoding': 'gzip'})
+        etag = compressed.headers['ETag']
+        self.assertEqual(etag, plain.headers['ETag'][:-1] + '-gzip"')
+
+        response = self.client.get('/books/1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
@@ -0,0 +1,18 @@
+import os
+
+# The tests run in one process; keep the cache in it rather than in a shared SQLite file
+os.environ.setdefault('CACHE_BACKEND', 'local')
+
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.services.auth_service import Principal
+
+# The user every test request is made as
+TEST_PRINCIPAL = Principal(1, 'admin', 'password')
+
+
+@pytest.fixture(autouse=True)
+def signed_in():
+    """Authenticate every request as TEST_PRINCIPAL without a user table; auth tests patch the real check back in."""
+    with patch('app.utils.decorators.auth.authenticate_request', new_callable=AsyncMock, return_value=TEST_PRINCIPAL) as mock:
+        yield mock
@@ -0,0 +1,139 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.exceptions import NotFound
+from app import create_app
+from app.utils import db_utils
+from app.utils.db_utils import read_session, write_session
+from app.utils.replica_router import ReplicaRouter, LAST_WRITE_COOKIE
+
+
+class SessionLifecycleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opened = []
+        self.failing_binds = set()
+        self.busy_binds = set()
+
+        async def fake_connect(bind, metrics):
+            if bind in self.failing_binds:
+                raise OSError("connection refused")
+            if bind in self.busy_binds:
+                raise PoolTimeoutError("QueuePool limit reached")
+            session = AsyncMock()
+            session.in_transaction = MagicMock(return_value=True)
+            self.opened.append((bind, session))
+            return session
+
+        patcher = patch.object(db_utils, '_connect', fake_connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _use_replicas(self, count):
+        engines = [create_async_engine(f'postgresql+asyncpg://reader@replica{i}/books') for i in range(count)]
+        router = ReplicaRouter(engines, cooldown=30)
+        patcher = patch.object(db_utils, 'replica_router', router)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return router
+
+    def _read(self, snapshot=False):
+        async def run():
+            async with read_session(snapshot=snapshot) as session:
+                return session
+        return asyncio.run(run())
+
+    def test_read_session_never_commits(self):
+        """Test that reads use the autocommit engine and skip COMMIT."""
+        session = self._read()
+
+        self.assertIs(self.opened[0][0], db_utils.autocommit_engine)
+        session.commit.assert_not_called()
+        session.close.assert_called_once()
+
+    def test_snapshot_read_uses_read_only_transaction(self):
+        """Test that snapshot reads bind to the READ ONLY engine."""
+        self._read(snapshot=True)
+
+        self.assertIs(self.opened[0][0], db_utils.snapshot_engine)
+
+    def test_write_session_commits_once(self):
+        """Test that a clean write commits exactly once and nested scopes reuse the session."""
+        async def run():
+            async with write_session() as outer:
+                async with write_session() as inner_write:
+                    async with read_session() as inner_read:
+                        return outer, inner_write, inner_read
+
+        outer, inner_write, inner_read = asyncio.run(run())
+
+        self.assertEqual(len(self.opened), 1)
+        self.assertIs(outer, inner_write)
+        self.assertIs(outer, inner_read)
+        outer.commit.assert_called_once()
+
+    def test_write_session_rolls_back_on_abort(self):
+        """Test that an abort inside a write rolls back instead of committing."""
+        async def run():
+            async with write_session():
+                raise NotFound()
+
+        with self.assertRaises(NotFound):
+            asyncio.run(run())
+
+        session = self.opened[0][1]
+        session.commit.assert_not_called()
+        session.rollback.assert_called_once()
+
+    def test_reads_round_robin_across_replicas(self):
+        """Test that consecutive reads alternate between replicas."""
+        router = self._use_replicas(2)
+
+        self._read()
+        self._read()
+
+        self.assertEqual([bind for bind, _ in self.opened], [router.replicas[0].autocommit, router.replicas[1].autocommit])
+
+    def test_failed_replica_is_skipped(self):
+        """Test that a replica that fails to connect is failed over and then skipped until its cooldown ends."""
+        router = self._use_replicas(2)
+        self.failing_binds.add(router.replicas[0].autocommit)
+
+        self._read()
+        self._read()
+
+        self.assertEqual([bind for bind, _ in self.opened], [router.replicas[1].autocommit] * 2)
+        self.assertFalse(router.replicas[0].healthy)
+        self.assertEqual(router.replicas[0].failures, 1)
+
+    def test_busy_replica_stays_in_rotation(self):
+        """Test that a pool timeout fails the read over without taking the replica out of rotation."""
+        router = self._use_replicas(2)
+        self.busy_binds.add(router.replicas[0].autocommit)
+
+        self._read()
+
+        self.assertEqual([bind for bind, _ in self.opened], [router.replicas[1].autocommit])
+        self.assertTrue(router.replicas[0].healthy)
+        self.assertEqual(router.replicas[0].failures, 0)
+
+    def test_no_healthy_replica_falls_back_to_primary(self):
+        """Test that reads go to the primary when every replica is down."""
+        router = self._use_replicas(1)
+        self.failing_binds.add(router.replicas[0].autocommit)
+
+        self._read()
+
+        self.assertIs(self.opened[0][0], db_utils.autocommit_engine)
+
+    def test_read_your_writes_pins_to_primary(self):
+        """Test that a client that just wrote reads from the primary."""
+        self._use_replicas(1)
+        app = create_app()
+
+        with app.test_request_context('/books/1', headers={'Cookie': f'{LAST_WRITE_COOKIE}={time.time()}'}):
+            self._read()
+
+        self.assertIs(self.opened[0][0], db_utils.autocommit_engine)
@@ -0,0 +1,35 @@
+import asyncio
+import unittest
+from flask import request
+from app import create_app
+from app.utils.event_loop import worker_loop
+
+
+class WorkerLoopTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def test_views_share_one_loop(self):
+        """Test that every async view runs on the same long-lived loop with its request context."""
+        @self.app.route('/_loop')
+        async def loop_view():
+            return {"loop": id(asyncio.get_running_loop()), "q": request.args.get('q')}
+
+        first = self.client.get('/_loop?q=1').get_json()
+        second = self.client.get('/_loop?q=2').get_json()
+
+        self.assertEqual(first["loop"], second["loop"])
+        self.assertEqual(first["loop"], id(worker_loop.loop))
+        self.assertEqual([first["q"], second["q"]], ["1", "2"])
+
+    def test_run_propagates_exceptions(self):
+        """Test that exceptions raised on the worker loop surface in the calling thread."""
+        async def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            worker_loop.run(fail())
+
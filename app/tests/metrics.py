@@ -0,0 +1,19 @@
+import unittest
+from app import config, create_app
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def test_metrics_reports_pool(self):
+        """Test that /metrics exposes the configured pool and its counters."""
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        db_pool = response.get_json()["db_pool"]
+        self.assertEqual(db_pool["size"], config.DB_POOL_SIZE)
+        self.assertIn("wait_seconds_max", db_pool)
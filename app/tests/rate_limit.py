@@ -0,0 +1,115 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+from app import config, create_app
+from app.services.auth_service import Principal
+from app.services.llama_service import llm_slots
+from app.utils.rate_limit import ConcurrencyLimit, MemoryStore, Rate, enforce, parse_rate, rate_limiter
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def test_parse_rate(self):
+        """Test that rates are read as requests per period, and empty ones mean unlimited."""
+        self.assertEqual(parse_rate("10/minute"), Rate(10, 60))
+        self.assertEqual(parse_rate("5/seconds"), Rate(5, 1))
+        self.assertIsNone(parse_rate(""))
+        with self.assertRaises(ValueError):
+            parse_rate("10/fortnight")
+
+    @patch('app.utils.rate_limit.time.monotonic')
+    def test_bucket_refills(self, mock_monotonic):
+        """Test that a burst drains the bucket and tokens come back at the configured rate."""
+        store, rate = MemoryStore(), Rate(2, 60)
+        mock_monotonic.return_value = 1000.0
+
+        self.assertEqual(store.take('k', rate), 0)
+        self.assertEqual(store.take('k', rate), 0)
+        self.assertAlmostEqual(store.take('k', rate), 30.0)
+
+        mock_monotonic.return_value = 1030.0
+        self.assertEqual(store.take('k', rate), 0)
+        self.assertGreater(store.take('k', rate), 0)
+        self.assertEqual(store.take('other', rate), 0)
+
+    def test_concurrency_limit(self):
+        """Test that no more than `limit` calls run at once and the rest wait their turn."""
+        limit, peak = ConcurrencyLimit(2), [0]
+
+        async def call():
+            async with limit:
+                peak[0] = max(peak[0], limit.active)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(5)))
+
+        asyncio.run(run())
+        self.assertEqual(peak[0], 2)
+        self.assertEqual((limit.active, limit.waiting), (0, 0))
+
+    def test_blocking_store_runs_off_the_loop(self):
+        """Test that a slow networked store (Redis) delays only its own request, not the event loop."""
+        class SlowStore(MemoryStore):
+            blocking = True
+
+            def take(self, key, rate):
+                time.sleep(0.2)
+                return super().take(key, rate)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await enforce('summary', 'addr:10.0.0.1')
+            task.cancel()
+            return ticks
+
+        with patch.object(rate_limiter, 'store', SlowStore()):
+            self.assertGreater(asyncio.run(run()), 5)
+
+
+class RateLimitRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client with empty buckets."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+        store = patch.object(rate_limiter, 'store', MemoryStore())
+        store.start()
+        self.addCleanup(store.stop)
+
+    def test_client_limit(self):
+        """Test that a client over its limit gets 429 with Retry-After while other clients are served."""
+        limit = parse_rate(config.RATE_LIMIT_SUMMARY).limit
+
+        with patch('app.utils.decorators.auth.authenticate_request', new_callable=AsyncMock,
+                   return_value=Principal(2, 'alice', 'api_key')):
+            for _ in range(limit):
+                self.assertEqual(self.client.post('/books/generate-summaries', json={}).status_code, 400)
+            response = self.client.post('/books/generate-summaries', json={})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+        self.assertEqual(self.client.post('/books/generate-summaries', json={}).status_code, 400)
+
+    @patch('app.routes.generate_summary.find_summary', new_callable=AsyncMock, return_value=None)
+    @patch('app.routes.generate_summary.read_session')
+    def test_stream_refused_when_llm_busy(self, mock_db_session, mock_find_summary):
+        """Test that a streamed summary is refused with 503 while every model slot is taken."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = (1,)
+
+        with patch.object(llm_slots, 'active', llm_slots.limit):
+            response = self.client.post('/books/1/generate-summary/stream', json={'content': 'Book content'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], str(config.LLM_BUSY_RETRY_AFTER))
@@ -1,11 +1,19 @@
+import asyncio
+import os
+import tempfile
 import unittest
+from collections import namedtuple
+from datetime import datetime, timezone
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from flask import Flask, json
+from sqlalchemy.dialects import postgresql
 from app import create_app
 from app.models import Review
 from app.routes.review_routes import bp
+from app.utils.cache import book_cache, invalidate_reviews
 from app.utils.db_utils import db_session
+from app.utils.pagination import decode_cursor
 
 class AddBookTestCase(unittest.TestCase):
     def setUp(self):
@@ -85,7 +93,7 @@ class AddBookTestCase(unittest.TestCase):
         ]
 
         # Mock the database response
-        mock_session.execute.return_value.scalars.return_value.all.return_value = mock_reviews
+        mock_session.execute.return_value.all.return_value = mock_reviews
 
         # Make the GET request to fetch all reviews for book ID 1
         response = await client.get('/books/1/reviews')
@@ -93,9 +101,9 @@ class AddBookTestCase(unittest.TestCase):
         # Assert status code and response content
         assert response.status_code == 200
         json_data = response.get_json()
-        assert len(json_data) == 2
-        assert json_data[0]["review_text"] == "Great book!"
-        assert json_data[1]["review_text"] == "Not bad"
+        assert len(json_data["reviews"]) == 2
+        assert json_data["reviews"][0]["review_text"] == "Great book!"
+        assert json_data["reviews"][1]["review_text"] == "Not bad"
 
         # Ensure execute was called once
         mock_session.execute.assert_called_once()
@@ -111,7 +119,7 @@ class AddBookTestCase(unittest.TestCase):
         mock_db_session.return_value.__aenter__.return_value = mock_session
 
         # Mock no reviews found
-        mock_session.execute.return_value.scalars.return_value.all.return_value = []
+        mock_session.execute.return_value.all.return_value = []
 
         # Make the GET request to fetch reviews for a book with no reviews
         response = await client.get('/books/1/reviews')
@@ -119,7 +127,210 @@ class AddBookTestCase(unittest.TestCase):
         # Assert status code and response content
         assert response.status_code == 200
         json_data = response.get_json()
-        assert len(json_data) == 0  # No reviews found
+        assert len(json_data["reviews"]) == 0  # No reviews found
 
         # Ensure execute was called once
-        mock_session.execute.assert_called_once()
\ No newline at end of file
+        mock_session.execute.assert_called_once()
+
+
+class ReviewAggregatesTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def _mock_session(self, mock_db_session, rowcount):
+        mock_session = AsyncMock()
+        mock_session.add = MagicMock()
+        mock_session.execute.return_value = MagicMock(rowcount=rowcount)
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        return mock_session
+
+    @patch('app.routes.review_routes.write_session')
+    def test_add_review_updates_aggregates(self, mock_db_session):
+        """Test that adding a review bumps the book's rating aggregates in the same transaction."""
+        mock_session = self._mock_session(mock_db_session, rowcount=1)
+        asyncio.run(book_cache.set('summary:1', {"summary": None, "avg_rating": None}))
+
+        response = self.client.post('/books/1/reviews', data=json.dumps({'review_text': 'Great', 'rating': 4}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        update = str(mock_session.execute.call_args.args[0])
+        self.assertIn("review_count=(books.review_count + :review_count_1)", update)
+        self.assertIn("rating_sum=(books.rating_sum + :rating_sum_1)", update)
+        mock_session.add.assert_called_once()
+        self.assertIsNone(asyncio.run(book_cache.get('summary:1')))
+
+    @patch('app.routes.review_routes.write_session')
+    def test_add_review_book_not_found(self, mock_db_session):
+        """Test that a review for a missing book is rejected without being added."""
+        mock_session = self._mock_session(mock_db_session, rowcount=0)
+
+        response = self.client.post('/books/999/reviews', data=json.dumps({'review_text': 'Great', 'rating': 4}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 404)
+        mock_session.add.assert_not_called()
+
+    @patch('app.routes.review_routes.write_session')
+    def test_add_review_rating_out_of_range(self, mock_db_session):
+        """Test that a rating outside 1-5 is rejected."""
+        mock_session = self._mock_session(mock_db_session, rowcount=1)
+
+        response = self.client.post('/books/1/reviews', data=json.dumps({'review_text': 'Great', 'rating': 9}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        mock_session.execute.assert_not_called()
+
+
+ReviewRow = namedtuple('ReviewRow', ['id', 'review_text', 'rating'])
+REVIEWS_UPDATED_AT = datetime(2024, 9, 2, 10, 0, tzinfo=timezone.utc)
+
+
+class ReviewPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+        book_cache.clear()
+
+    @patch.object(book_cache, 'settled', return_value=True)
+    @patch('app.routes.review_routes.read_session')
+    def test_review_pages_cached_until_new_review(self, mock_db_session, mock_settled):
+        """Test that a page is served from cache until the book's reviews version is bumped."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.all.return_value = [ReviewRow(7, "Great", 5)]
+        mock_session.scalar.return_value = REVIEWS_UPDATED_AT
+
+        self.client.get('/books/1/reviews')
+        cached = self.client.get('/books/1/reviews')
+        self.assertEqual(cached.get_json()["reviews"], [{"id": 7, "review_text": "Great", "rating": 5}])
+        mock_session.execute.assert_called_once()
+
+        asyncio.run(invalidate_reviews(1))
+        self.client.get('/books/1/reviews')
+        self.assertEqual(mock_session.execute.call_count, 2)
+
+    @patch('app.routes.review_routes.read_session')
+    def test_get_reviews_paginates_by_rating(self, mock_db_session):
+        """Test that reviews are filtered, sorted by rating and paged with a cursor."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.all.return_value = [ReviewRow(7, "Great", 5), ReviewRow(3, "Good", 4)]
+        mock_session.scalar.return_value = REVIEWS_UPDATED_AT
+
+        response = self.client.get('/books/1/reviews?sort=-rating&min_rating=4&limit=1')
+
+        self.assertEqual(response.status_code, 200)
+        json_data = response.get_json()
+        self.assertEqual(json_data["reviews"], [{"id": 7, "review_text": "Great", "rating": 5}])
+        self.assertEqual(decode_cursor(json_data["next_cursor"]), ["-rating", 5, 7])
+        sql = str(mock_session.execute.call_args.args[0])
+        self.assertIn("reviews.book_id = :book_id_1 AND reviews.rating >= :rating_1", sql)
+        self.assertIn("ORDER BY reviews.rating DESC, reviews.id DESC", sql)
+
+    @patch('app.routes.review_routes.read_session')
+    def test_get_reviews_conditional(self, mock_db_session):
+        """Test that an unchanged reviews version gets a 304 without running the page query."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.all.return_value = [ReviewRow(7, "Great", 5)]
+        mock_session.scalar.return_value = REVIEWS_UPDATED_AT
+
+        etag = self.client.get('/books/1/reviews').headers['ETag']
+        response = self.client.get('/books/1/reviews', headers={'If-None-Match': etag})
+        other_page = self.client.get('/books/1/reviews?sort=-rating', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(other_page.status_code, 200)
+        self.assertEqual(mock_session.execute.call_count, 2)
+
+        mock_session.scalar.return_value = datetime(2024, 9, 3, tzinfo=timezone.utc)
+        self.assertEqual(self.client.get('/books/1/reviews', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_get_reviews_invalid_min_rating(self):
+        """Test that min_rating outside 1-5 is rejected."""
+        response = self.client.get('/books/1/reviews?min_rating=6')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkReviewImportTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def _mock_session(self, mock_db_session, existing_book_ids):
+        mock_session = AsyncMock()
+        existing = MagicMock()
+        existing.scalars.return_value.all.return_value = existing_book_ids
+        mock_session.execute.side_effect = [existing, MagicMock()]
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        return mock_session
+
+    @patch('app.services.review_import.copy_records', new_callable=AsyncMock)
+    @patch('app.services.review_import.write_session')
+    def test_bulk_reviews_grouped_aggregates(self, mock_db_session, mock_copy_records):
+        """Test that a batch is copied and aggregates are updated with one grouped UPDATE."""
+        mock_session = self._mock_session(mock_db_session, [1, 2])
+        body = "\n".join(json.dumps(review) for review in [
+            {"book_id": 1, "review_text": "Great", "rating": 5},
+            {"book_id": 1, "review_text": "Good", "rating": 4},
+            {"book_id": 2, "review_text": "Meh", "rating": 2},
+            {"book_id": 3, "review_text": "Lost", "rating": 3},
+            {"book_id": 2, "review_text": "Bad", "rating": 0},
+        ])
+
+        response = self.client.post('/reviews/bulk', data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report["inserted"], 3)
+        self.assertEqual(sorted((e["row"], e["error"]) for e in report["errors"]), [
+            (4, "Book not found"),
+            (5, "rating must be an integer between 1 and 5"),
+        ])
+        self.assertEqual(len(mock_copy_records.call_args.args[3]), 3)
+        update = mock_session.execute.call_args_list[1].args[0]
+        self.assertIn("FROM (VALUES", str(update.compile(dialect=postgresql.dialect())))
+
+    @patch('app.services.review_import.copy_records', new_callable=AsyncMock)
+    @patch('app.services.review_import.write_session')
+    def test_bulk_reviews_reject_bad_book_ids(self, mock_db_session, mock_copy_records):
+        """Test that booleans and ids outside INTEGER fail their own row before the book lookup."""
+        mock_session = self._mock_session(mock_db_session, [1])
+        body = "\n".join(json.dumps({"book_id": book_id, "review_text": "Fine", "rating": 3})
+                         for book_id in [1, True, 2 ** 31, None])
+
+        response = self.client.post('/reviews/bulk', data=body, content_type='application/x-ndjson')
+
+        report = response.get_json()
+        self.assertEqual(report["inserted"], 1)
+        self.assertEqual([(e["row"], e["error"]) for e in report["errors"]], [
+            (2, "book_id must be an integer between -2147483648 and 2147483647"),
+            (3, "book_id must be an integer between -2147483648 and 2147483647"),
+            (4, "Missing required field: book_id"),
+        ])
+        lookup = mock_session.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect())
+        self.assertEqual(lookup.construct_params()["id_1"], [1])
+
+    @patch('app.services.review_import.copy_records', new_callable=AsyncMock)
+    @patch('app.services.review_import.write_session')
+    def test_import_reviews_command(self, mock_db_session, mock_copy_records):
+        """Test the import-reviews CLI command with a CSV file."""
+        self._mock_session(mock_db_session, [1])
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("book_id,review_text,rating\n1,Great,5\n")
+
+        result = self.app.test_cli_runner().invoke(args=['import-reviews', f.name])
+        os.unlink(f.name)
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Inserted 1 review(s), 0 failed", result.output)
@@ -0,0 +1,34 @@
+import unittest
+from sqlalchemy.engine.result import result_tuple
+from werkzeug.exceptions import BadRequest
+from app.schemas import book_schema, review_schema
+
+
+class SchemaTestCase(unittest.TestCase):
+    def test_select_and_dump_line_up(self):
+        """Test that rows of a projected select serialize under the selected names, extras last."""
+        fields = book_schema.parse_fields('author,title')
+        query = book_schema.select(fields)
+        row = result_tuple(['id', 'title', 'author', 'rank'])([1, "Dune", "Herbert", 0.5])
+
+        self.assertEqual(fields, ('id', 'title', 'author'))
+        self.assertEqual([column.name for column in query.selected_columns], ['id', 'title', 'author'])
+        self.assertEqual(
+            book_schema.dump(row, fields, extra=('rank',)),
+            {"id": 1, "title": "Dune", "author": "Herbert", "rank": 0.5},
+        )
+
+    def test_dump_many_defaults_to_every_field(self):
+        """Test that review rows serialize with every field when none are selected."""
+        make_row = result_tuple(list(review_schema.fields))
+        rows = [make_row([1, "Great", 5]), make_row([2, "Fine", 3])]
+
+        self.assertEqual(review_schema.dump_many(rows), [
+            {"id": 1, "review_text": "Great", "rating": 5},
+            {"id": 2, "review_text": "Fine", "rating": 3},
+        ])
+
+    def test_unknown_field_rejected(self):
+        """Test that an unknown field is a 400."""
+        with self.assertRaises(BadRequest):
+            book_schema.parse_fields('title,isbn')
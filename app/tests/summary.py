@@ -1,10 +1,25 @@
+import asyncio
+import os
+import tempfile
 import unittest
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+import httpx
 import pytest
+from sqlalchemy.dialects import postgresql
+from tenacity import wait_none
 from unittest.mock import patch, MagicMock, AsyncMock
 from flask import Flask, json
 from app import create_app
 from app.models import Book
 from app.routes.book_routes import bp
+from app.services.batch_summary import Checkpoint, summarize_books
+from app.services.llm_backend import FakeBackend, LLMBackend, LLMError, OllamaBackend
+from app.services.jobs import JOB_HANDLERS, Enqueued, JobRunner, enqueue
+from app.services.summary_cache import cached_summarize, normalize_content, summary_cache_stats, summary_key
+from app.services.summarizer import CHARS_PER_TOKEN, CHUNK_PROMPT, COMBINE_PROMPT, split_into_chunks, stream_summary, summarize
+from app.services.summary_service import generate_summary_job
 from app.utils.db_utils import db_session
 
 class AddSummaryTestCase(unittest.TestCase):
@@ -118,4 +133,467 @@ class AddSummaryTestCase(unittest.TestCase):
         assert "External service error" in response.get_data(as_text=True)
 
         # Ensure commit was not called due to failure
-        mock_session.commit.assert_not_called()
\ No newline at end of file
+        mock_session.commit.assert_not_called()
+
+JobRow = namedtuple('JobRow', ['id', 'kind', 'payload', 'attempts'])
+JOB_ID = uuid.UUID('6f1c2a0e-4b5d-4f0e-9a7c-3b2d1e0f9a8b')
+
+
+class SummaryJobTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the test client."""
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app.testing = True  # Set Flask to testing mode
+
+    def _mock_book(self, mock_db_session):
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.first.return_value = (1,)
+
+    @patch('app.routes.generate_summary.find_summary', new_callable=AsyncMock, return_value=None)
+    @patch('app.routes.generate_summary.enqueue', new_callable=AsyncMock)
+    @patch('app.routes.generate_summary.read_session')
+    def test_generate_summary_queues_job(self, mock_db_session, mock_enqueue, mock_find_summary):
+        """Test that the request returns 202 with the job to poll, without calling the model."""
+        self._mock_book(mock_db_session)
+        mock_enqueue.return_value = Enqueued(JOB_ID, 'queued', True)
+
+        response = self.client.post('/books/1/generate-summary', json={'content': 'Book content'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json(), {"job_id": JOB_ID.hex, "status": "queued"})
+        self.assertEqual(response.headers['Location'], f'/jobs/{JOB_ID.hex}')
+        key = summary_key('Book content')
+        mock_find_summary.assert_awaited_once_with(key)
+        mock_enqueue.assert_awaited_once_with(
+            'generate_summary', {"book_id": 1, "content": 'Book content'}, dedupe_key=f"generate_summary:1:{key}"
+        )
+
+    @patch('app.routes.generate_summary.save_summary', new_callable=AsyncMock, return_value=True)
+    @patch('app.routes.generate_summary.find_summary', new_callable=AsyncMock, return_value="Cached")
+    @patch('app.routes.generate_summary.enqueue', new_callable=AsyncMock)
+    @patch('app.routes.generate_summary.read_session')
+    def test_generate_summary_cached(self, mock_db_session, mock_enqueue, mock_find_summary, mock_save_summary):
+        """Test that content summarized before is answered at once and saved to the book."""
+        self._mock_book(mock_db_session)
+
+        response = self.client.post('/books/1/generate-summary', json={'content': 'Book content'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"summary": "Cached"})
+        mock_save_summary.assert_awaited_once_with(1, "Cached")
+        mock_enqueue.assert_not_called()
+
+    @patch('app.routes.generate_summary.save_summary', new_callable=AsyncMock, return_value=True)
+    @patch('app.routes.generate_summary.store_summary', new_callable=AsyncMock)
+    @patch('app.routes.generate_summary.stream_summary')
+    @patch('app.routes.generate_summary.find_summary', new_callable=AsyncMock, return_value=None)
+    @patch('app.routes.generate_summary.read_session')
+    def test_stream_summary(self, mock_db_session, mock_find_summary, mock_stream_summary, mock_store_summary, mock_save_summary):
+        """Test that tokens are sent as events as they arrive and the full summary is saved at the end."""
+        self._mock_book(mock_db_session)
+
+        async def fragments(content):
+            for fragment in ("A brief", " overview."):
+                yield fragment
+
+        mock_stream_summary.side_effect = fragments
+
+        response = self.client.post(
+            '/books/1/generate-summary/stream', json={'content': 'Book content'}, headers={'Accept-Encoding': 'gzip'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_data(as_text=True), (
+            ': summarizing\n\n'
+            'event: token\ndata: {"text":"A brief"}\n\n'
+            'event: token\ndata: {"text":" overview."}\n\n'
+            'event: done\ndata: {"summary":"A brief overview."}\n\n'
+        ))
+        mock_store_summary.assert_awaited_once_with(summary_key('Book content'), "A brief overview.")
+        mock_save_summary.assert_awaited_once_with(1, "A brief overview.")
+
+    @patch('app.routes.generate_summary.save_summary', new_callable=AsyncMock)
+    @patch('app.routes.generate_summary.stream_summary')
+    @patch('app.routes.generate_summary.find_summary', new_callable=AsyncMock, return_value=None)
+    @patch('app.routes.generate_summary.read_session')
+    def test_stream_summary_error(self, mock_db_session, mock_find_summary, mock_stream_summary, mock_save_summary):
+        """Test that a model failure mid-stream ends with an error event and saves nothing."""
+        self._mock_book(mock_db_session)
+
+        async def fragments(content):
+            yield "A brief"
+            raise Exception("model unavailable")
+
+        mock_stream_summary.side_effect = fragments
+
+        response = self.client.post('/books/1/generate-summary/stream', json={'content': 'Book content'})
+
+        self.assertTrue(response.get_data(as_text=True).endswith('event: error\ndata: {"message":"model unavailable"}\n\n'))
+        mock_save_summary.assert_not_called()
+
+    @patch('app.routes.generate_summary.enqueue', new_callable=AsyncMock)
+    def test_generate_summaries_queues_batch(self, mock_enqueue):
+        """Test that a batch is queued as one job holding every book's content."""
+        mock_enqueue.return_value = Enqueued(JOB_ID, 'queued', True)
+        books = [{"book_id": 1, "content": "First"}, {"book_id": 2, "content": "Second"}]
+
+        response = self.client.post('/books/generate-summaries', json={"books": books})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Location'], f'/jobs/{JOB_ID.hex}')
+        mock_enqueue.assert_awaited_once_with('summarize_books', {"books": books})
+
+    @patch('app.routes.generate_summary.enqueue', new_callable=AsyncMock)
+    def test_generate_summaries_invalid(self, mock_enqueue):
+        """Test that a batch with a missing id or content is rejected before anything is queued."""
+        for body in ({}, {"books": []}, {"books": [{"content": "Text"}]}, {"books": [{"book_id": 1, "content": " "}]}):
+            response = self.client.post('/books/generate-summaries', json=body)
+            self.assertEqual(response.status_code, 400, body)
+        mock_enqueue.assert_not_called()
+
+    @patch('app.routes.job_routes.load_job', new_callable=AsyncMock)
+    def test_get_job(self, mock_load_job):
+        """Test that a job's status and result are returned, and unknown ids are 404s."""
+        finished = datetime(2024, 9, 2, 10, 0, tzinfo=timezone.utc)
+        mock_load_job.return_value = (JOB_ID, 'generate_summary', 'succeeded', {"summary": "Short"}, None, 1,
+                                      finished, finished, finished)
+
+        response = self.client.get(f'/jobs/{JOB_ID.hex}')
+
+        self.assertEqual(response.status_code, 200)
+        job = response.get_json()
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"], {"summary": "Short"})
+        self.assertEqual(job["finished_at"], "2024-09-02T10:00:00+00:00")
+        mock_load_job.assert_awaited_once_with(JOB_ID)
+
+        self.assertEqual(self.client.get('/jobs/not-a-job').status_code, 404)
+        mock_load_job.return_value = None
+        self.assertEqual(self.client.get(f'/jobs/{JOB_ID.hex}').status_code, 404)
+
+
+class JobRunnerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.runner = JobRunner(concurrency=1, poll_interval=1)
+
+    @patch('app.services.jobs.finish_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.claim_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.write_session')
+    def test_run_once_records_result(self, mock_db_session, mock_claim_job, mock_finish_job):
+        """Test that a claimed job runs its handler and stores the result."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        mock_claim_job.return_value = JobRow(JOB_ID, 'generate_summary', {"book_id": 1, "content": "x"}, 1)
+
+        with patch.dict(JOB_HANDLERS, {'generate_summary': AsyncMock(return_value={"summary": "Short"})}):
+            self.assertTrue(asyncio.run(self.runner.run_once()))
+
+        mock_finish_job.assert_awaited_once_with(JOB_ID, 1, 'succeeded', result={"summary": "Short"})
+        self.assertEqual(self.runner.snapshot()["succeeded"], 1)
+
+    @patch('app.services.jobs.finish_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.claim_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.write_session')
+    def test_run_once_records_failure(self, mock_db_session, mock_claim_job, mock_finish_job):
+        """Test that a handler error marks the job failed, and an empty queue reports no work."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        mock_claim_job.return_value = JobRow(JOB_ID, 'generate_summary', {"book_id": 1, "content": "x"}, 1)
+
+        with patch.dict(JOB_HANDLERS, {'generate_summary': AsyncMock(side_effect=RuntimeError("model offline"))}):
+            self.assertTrue(asyncio.run(self.runner.run_once()))
+
+        mock_finish_job.assert_awaited_once_with(JOB_ID, 1, 'failed', error="model offline")
+        mock_claim_job.return_value = None
+        self.assertFalse(asyncio.run(self.runner.run_once()))
+
+    @patch('app.services.jobs.job_runner')
+    @patch('app.services.jobs.write_session')
+    def test_enqueue_conflict_matches_pending_index(self, mock_db_session, mock_job_runner):
+        """Test that ON CONFLICT repeats the partial index's predicate literally, not as bound parameters."""
+        mock_session = AsyncMock()
+        mock_session.execute.return_value = MagicMock(first=MagicMock(return_value=(JOB_ID,)))
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+
+        with patch.dict(JOB_HANDLERS, {'generate_summary': AsyncMock()}):
+            enqueued = asyncio.run(enqueue('generate_summary', {"book_id": 1}, dedupe_key='summary:1'))
+
+        self.assertTrue(enqueued.created)
+        statement = mock_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        self.assertIn("ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING", str(statement))
+
+    @patch('app.services.jobs.config.JOB_TIMEOUT', 0.03)
+    @patch('app.services.jobs.touch_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.finish_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.claim_job', new_callable=AsyncMock)
+    @patch('app.services.jobs.write_session')
+    def test_run_once_heartbeats_long_jobs(self, mock_db_session, mock_claim_job, mock_finish_job, mock_touch_job):
+        """Test that a job running past JOB_TIMEOUT keeps its claim fresh, and the heartbeat stops with it."""
+        mock_db_session.return_value.__aenter__.return_value = AsyncMock()
+        mock_claim_job.return_value = JobRow(JOB_ID, 'summarize_books', {}, 2)
+
+        async def slow_handler(payload):
+            await asyncio.sleep(0.1)
+            return {}
+
+        async def run():
+            await self.runner.run_once()
+            beats = mock_touch_job.await_count
+            await asyncio.sleep(0.05)
+            return beats
+
+        with patch.dict(JOB_HANDLERS, {'summarize_books': slow_handler}):
+            beats = asyncio.run(run())
+
+        self.assertGreaterEqual(beats, 2)
+        self.assertEqual(mock_touch_job.await_count, beats)
+        mock_touch_job.assert_awaited_with(JOB_ID, 2)
+        mock_finish_job.assert_awaited_once_with(JOB_ID, 2, 'succeeded', result={})
+
+    @patch('app.services.summary_cache.store_summary', new_callable=AsyncMock)
+    @patch('app.services.summary_cache.find_summary', new_callable=AsyncMock, return_value=None)
+    @patch('app.services.summarizer.generate_summary', new_callable=AsyncMock, return_value="Short")
+    @patch('app.services.summary_service.write_session')
+    def test_summary_job_stores_summary(self, mock_db_session, mock_generate_summary, mock_find_summary, mock_store_summary):
+        """Test that the summary job writes the generated summary to the book."""
+        mock_session = AsyncMock()
+        mock_session.execute.return_value = MagicMock(rowcount=1)
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+
+        result = asyncio.run(generate_summary_job({"book_id": 1, "content": "Book content"}))
+
+        self.assertEqual(result, {"summary": "Short"})
+        mock_generate_summary.assert_called_once_with("Book content")
+        self.assertIn("SET summary=", str(mock_session.execute.call_args.args[0]))
+        mock_store_summary.assert_awaited_once_with(summary_key("Book content"), "Short")
+
+
+class SummarizerTestCase(unittest.TestCase):
+    def test_chunks_respect_size(self):
+        """Test that paragraphs are packed whole and oversized ones split, never exceeding the budget."""
+        text = "Short paragraph.\n\nAnother one.\n\n" + "A long sentence that keeps going. " * 50 + "\n\n" + "x" * 100
+        chunks = split_into_chunks(text, max_tokens=10)
+
+        self.assertEqual(chunks[0], "Short paragraph.\n\nAnother one.")
+        self.assertTrue(all(len(chunk) <= 10 * CHARS_PER_TOKEN for chunk in chunks))
+        self.assertEqual(''.join(chunks).count('x'), 100)
+
+    @patch('app.services.summarizer.generate_summary', new_callable=AsyncMock)
+    def test_short_content_single_call(self, mock_generate_summary):
+        """Test that content fitting in one chunk is summarized with the plain prompt in one call."""
+        mock_generate_summary.return_value = "Summary"
+
+        self.assertEqual(asyncio.run(summarize("A short book.", chunk_tokens=100)), "Summary")
+        mock_generate_summary.assert_awaited_once_with("A short book.")
+
+    @patch('app.services.summarizer.generate_summary', new_callable=AsyncMock)
+    def test_map_reduce_bounded(self, mock_generate_summary):
+        """Test that chunks are summarized in parallel up to the limit, then combined."""
+        active, peak = [0], [0]
+
+        async def fake_generate(content, prompt=None):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+            return "combined" if prompt == COMBINE_PROMPT else "part"
+
+        mock_generate_summary.side_effect = fake_generate
+        content = "\n\n".join(f"Paragraph {n} " + "word " * 30 for n in range(8))
+
+        summary = asyncio.run(summarize(content, chunk_tokens=50, parallelism=3))
+
+        self.assertEqual(summary, "combined")
+        prompts = [call.args[1] for call in mock_generate_summary.call_args_list]
+        self.assertEqual(prompts.count(CHUNK_PROMPT), 8)
+        self.assertEqual(prompts[-1], COMBINE_PROMPT)
+        self.assertEqual(peak[0], 3)
+
+    @patch('app.services.summarizer.llama_service.stream_summary')
+    @patch('app.services.summarizer.generate_summary', new_callable=AsyncMock, return_value="Partial")
+    def test_stream_only_final_call(self, mock_generate_summary, mock_stream_summary):
+        """Test that long content is reduced first and only the final combine call is streamed."""
+        async def fragments(content, prompt):
+            for fragment in ("Whole", " book"):
+                yield fragment
+
+        mock_stream_summary.side_effect = fragments
+        paragraph = "x" * (40 * CHARS_PER_TOKEN)
+        content = "\n\n".join([paragraph] * 4)
+
+        async def run():
+            return [fragment async for fragment in stream_summary(content, chunk_tokens=50)]
+
+        self.assertEqual(asyncio.run(run()), ["Whole", " book"])
+        self.assertEqual(mock_generate_summary.call_count, 4)
+        self.assertEqual(mock_stream_summary.call_args.args[1], COMBINE_PROMPT)
+
+
+class SummaryCacheTestCase(unittest.TestCase):
+    def test_key_ignores_formatting(self):
+        """Test that whitespace and line-ending differences map to the same key, other text does not."""
+        self.assertEqual(normalize_content("  One\r\n\r\n\r\nTwo  \t words "), "One\n\nTwo words")
+        self.assertEqual(summary_key("One\n\nTwo"), summary_key("One \r\n\r\n\r\n Two\n"))
+        self.assertNotEqual(summary_key("One\n\nTwo"), summary_key("One\n\nThree"))
+
+    @patch('app.services.summary_cache.store_summary', new_callable=AsyncMock)
+    @patch('app.services.summary_cache.find_summary', new_callable=AsyncMock, return_value=None)
+    @patch('app.services.summary_cache.summarizer.summarize', new_callable=AsyncMock)
+    def test_concurrent_identical_requests_coalesce(self, mock_summarize, mock_find_summary, mock_store_summary):
+        """Test that identical content summarized concurrently runs the model once."""
+        async def slow_summary(content):
+            await asyncio.sleep(0.01)
+            return "Summary"
+
+        mock_summarize.side_effect = slow_summary
+        coalesced = summary_cache_stats.coalesced
+
+        async def run():
+            return await asyncio.gather(*(cached_summarize("Same content") for _ in range(3)))
+
+        self.assertEqual(asyncio.run(run()), ["Summary"] * 3)
+        mock_summarize.assert_awaited_once()
+        mock_store_summary.assert_awaited_once()
+        self.assertEqual(summary_cache_stats.coalesced - coalesced, 2)
+
+
+class BatchSummaryTestCase(unittest.TestCase):
+    def _mock_updates(self, mock_db_session, book_ids):
+        """Make every UPDATE report `book_ids` as existing."""
+        mock_session = AsyncMock()
+        mock_db_session.return_value.__aenter__.return_value = mock_session
+        mock_session.execute.return_value = MagicMock()
+        mock_session.execute.return_value.scalars.return_value.all.return_value = list(book_ids)
+        return mock_session
+
+    @patch('app.services.batch_summary.invalidate_book')
+    @patch('app.services.batch_summary.write_session')
+    @patch('app.services.batch_summary.cached_summarize', new_callable=AsyncMock)
+    def test_summaries_written_in_batches(self, mock_summarize, mock_db_session, mock_invalidate_book):
+        """Test that books are summarized and stored batch_size per UPDATE, and checkpointed."""
+        mock_summarize.side_effect = lambda content: f"Summary of {content}"
+        contents = {book_id: f"book {book_id}" for book_id in range(1, 6)}
+        mock_session = self._mock_updates(mock_db_session, contents)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = Checkpoint(os.path.join(directory, 'done'))
+            report = asyncio.run(summarize_books(
+                list(contents), contents.get, concurrency=2, batch_size=2, checkpoint=checkpoint,
+            ))
+            resumed = Checkpoint(checkpoint.path)
+
+        self.assertEqual(report.summarized, 5)
+        self.assertEqual(report.failed, 0)
+        self.assertEqual(mock_session.execute.await_count, 3)
+        self.assertIn("FROM (VALUES", str(mock_session.execute.call_args.args[0]))
+        self.assertEqual(resumed.done, set(contents))
+
+    @patch('app.services.batch_summary.invalidate_book')
+    @patch('app.services.batch_summary.write_session')
+    @patch('app.services.batch_summary.cached_summarize', new_callable=AsyncMock)
+    def test_checkpointed_books_skipped(self, mock_summarize, mock_db_session, mock_invalidate_book):
+        """Test that a resumed run only summarizes the books the checkpoint has not recorded."""
+        mock_summarize.return_value = "Summary"
+        contents = {1: "one", 2: "two", 3: "three"}
+        self._mock_updates(mock_db_session, contents)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = Checkpoint(os.path.join(directory, 'done'))
+            checkpoint.add([1, 2])
+            report = asyncio.run(summarize_books(list(contents), contents.get, checkpoint=checkpoint))
+
+        self.assertEqual((report.summarized, report.skipped), (1, 2))
+        mock_summarize.assert_awaited_once_with("three")
+
+    @patch('app.services.batch_summary.wait_random_exponential', return_value=wait_none())
+    @patch('app.services.batch_summary.invalidate_book')
+    @patch('app.services.batch_summary.write_session')
+    @patch('app.services.batch_summary.cached_summarize', new_callable=AsyncMock)
+    def test_failures_retried_then_reported(self, mock_summarize, mock_db_session, mock_invalidate_book, mock_wait):
+        """Test that model errors are retried and a book that keeps failing is reported without stopping the batch."""
+        def flaky(content):
+            if content == "bad" or mock_summarize.await_count == 1:
+                raise Exception("model unavailable")
+            return "Summary"
+
+        mock_summarize.side_effect = flaky
+        contents = {1: "good", 2: "bad", 3: None}
+        self._mock_updates(mock_db_session, contents)
+
+        report = asyncio.run(summarize_books(list(contents), contents.get, concurrency=1, attempts=3))
+
+        self.assertEqual(report.summarized, 1)
+        self.assertEqual(report.errors, [
+            {"book_id": 2, "error": "model unavailable"},
+            {"book_id": 3, "error": "No content to summarize"},
+        ])
+        # book 1: one failure then success; book 2: every attempt
+        self.assertEqual(mock_summarize.await_count, 5)
+
+
+class LLMBackendTestCase(unittest.TestCase):
+    def _ollama(self, handler):
+        return OllamaBackend('http://llm', 'llama3.1', 10, 1, 4, transport=httpx.MockTransport(handler))
+
+    def test_ollama_generate(self):
+        """Test that calls go to the configured model and reuse one client."""
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, json={"response": "A summary", "done": True})
+
+        backend = self._ollama(handler)
+
+        async def run():
+            first = await backend.generate("Summarize this")
+            client = backend._get_client()
+            second = await backend.generate("Summarize that", timeout=30)
+            self.assertIs(backend._get_client(), client)
+            await backend.aclose()
+            return first, second
+
+        self.assertEqual(asyncio.run(run()), ("A summary", "A summary"))
+        self.assertEqual(requests[0], {"model": "llama3.1", "prompt": "Summarize this", "stream": False})
+
+    def test_ollama_stream(self):
+        """Test that the NDJSON stream is yielded fragment by fragment."""
+        body = b'{"response":"A","done":false}\n{"response":" summary","done":false}\n{"response":"","done":true}\n'
+        backend = self._ollama(lambda request: httpx.Response(200, content=body))
+
+        async def run():
+            return [fragment async for fragment in backend.stream("Summarize this")]
+
+        self.assertEqual(asyncio.run(run()), ["A", " summary"])
+
+    def test_ollama_error(self):
+        """Test that server errors surface as LLMError."""
+        backend = self._ollama(lambda request: httpx.Response(500, json={"error": "model not loaded"}))
+
+        with self.assertRaises(LLMError):
+            asyncio.run(backend.generate("Summarize this"))
+
+    def test_fake_backend_deterministic(self):
+        """Test that the fake backend answers equal prompts equally, streamed or not."""
+        backend = FakeBackend(words=5)
+
+        async def run():
+            streamed = ''.join([fragment async for fragment in backend.stream("one two three four five six")])
+            return await backend.generate("one two three four five six"), streamed
+
+        summary, streamed = asyncio.run(run())
+        self.assertEqual(summary, streamed)
+        self.assertTrue(summary.endswith("two three four five six"))
+        self.assertNotEqual(summary, asyncio.run(backend.generate("other prompt")))
+
+    def test_incomplete_backend_rejected(self):
+        """Test that a backend missing `stream` fails when it is created, not mid-request."""
+        class GenerateOnly(LLMBackend):
+            async def generate(self, prompt, timeout=None):
+                return prompt
+
+        with self.assertRaises(TypeError):
+            GenerateOnly()
@@ -0,0 +1,438 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import orjson
+from app import config
+
+try:
+    import redis
+except ImportError:  # Only needed for CACHE_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Stored in the shared tier in place of an invalidated value while its key is held down
+TOMBSTONE = b''
+
+# Version keys outlive the entries built on them; an expired version only orphans those entries
+VERSION_TTL = 24 * 60 * 60
+
+
+def estimate_size(value):
+    """Approximate memory cost of a cached JSON-like value, by its serialized length."""
+    return len(orjson.dumps(value, default=str))
+
+
+class LRUCache:
+    """
+    Bounded in-process cache: least-recently-used eviction, per-entry TTL and a memory budget.
+
+    `invalidate` also holds the key down for `hold_down` seconds, during which `set`
+    is ignored. That stops a read which started before a write (or ran against a
+    lagging replica) from putting the old value back right after the invalidation.
+    """
+
+    def __init__(self, max_entries, ttl, max_bytes, hold_down=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hold_down = hold_down
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._held = {}  # key -> monotonic time until which set() is ignored
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=None):
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            held_until = self._held.get(key)
+            if held_until is not None:
+                if held_until > now:
+                    return
+                del self._held[key]
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            if self.hold_down:
+                if len(self._held) > self.max_entries:
+                    self._held = {key: until for key, until in self._held.items() if until > now}
+                for key in keys:
+                    self._held[key] = now + self.hold_down
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._held.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class SQLiteBackend:
+    """
+    Shared tier for the workers of one host, in a SQLite database file (WAL mode).
+
+    Invalidations are appended to a log table that every worker polls at most once
+    per `sync_interval` seconds. Also used as the stand-in for Redis in tests.
+    """
+
+    name = 'sqlite'
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path, sync_interval=0.2, log_retention=60):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.log_retention = log_retention
+        self._local = threading.local()
+        self._last_id = None
+        self._next_poll = 0.0
+        self._next_cleanup = 0.0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidations "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        # sqlite3 connections must not cross threads or forks
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, data, ttl):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, data, time.time() + ttl),
+        )
+
+    def add(self, key, data, ttl):
+        """Store the value unless the key already holds a live entry or tombstone."""
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache_entries.expires_at <= ?",
+            (key, data, now + ttl, now),
+        )
+
+    def invalidate(self, keys, hold_down):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, TOMBSTONE, now + hold_down) for key in keys],
+            )
+            conn.executemany(
+                "INSERT INTO cache_invalidations (key, created_at) VALUES (?, ?)",
+                [(key, now) for key in keys],
+            )
+
+    def poll(self):
+        """Return the keys other workers (or this one) invalidated since the last poll."""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return []
+        self._next_poll = now + self.sync_interval
+        conn = self._conn()
+        if self._last_id is None:
+            self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidations").fetchone()[0]
+            return []
+        rows = conn.execute(
+            "SELECT id, key FROM cache_invalidations WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.log_retention
+            wall = time.time()
+            with conn:
+                conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (wall,))
+                conn.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (wall - self.log_retention,))
+        return [key for _, key in rows]
+
+
+class RedisBackend:
+    """Shared tier in Redis; invalidations are broadcast on a pub/sub channel."""
+
+    name = 'redis'
+    channel = 'bms:cache:invalidations'
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = None
+        self._pid = None
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, data, ttl):
+        self._client.set(key, data, ex=ttl)
+
+    def add(self, key, data, ttl):
+        """Store the value unless the key already holds a live entry or tombstone."""
+        self._client.set(key, data, ex=ttl, nx=True)
+
+    def invalidate(self, keys, hold_down):
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, TOMBSTONE, px=max(int(hold_down * 1000), 1))
+        pipe.publish(self.channel, orjson.dumps(list(keys)))
+        pipe.execute()
+
+    def poll(self):
+        """Drain the invalidations broadcast since the last poll; never blocks."""
+        if self._pubsub is None or self._pid != os.getpid():
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(self.channel)
+            self._pid = os.getpid()
+        keys = []
+        while (message := self._pubsub.get_message()) is not None:
+            keys.extend(orjson.loads(message['data']))
+        return keys
+
+
+class TieredCache:
+    """
+    Per-worker LRU in front of an optional shared backend.
+
+    Reads try the local tier, then the shared one. Invalidations drop the local
+    copy, leave a tombstone in the shared tier for `hold_down` seconds and are
+    broadcast so the other workers drop their local copies too. Backend errors
+    degrade to cache misses; they never fail the request.
+
+    The shared backends block (sqlite3 lock waits, redis round trips), so their
+    calls run on threads and the methods that may reach them are coroutines;
+    a slow backend then delays only the requests waiting on it, not the event loop.
+    """
+
+    def __init__(self, local, shared=None, ttl=300, hold_down=0):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.hold_down = hold_down
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+        self.remote_invalidations = 0
+        # Held by the one request draining the invalidation feed; the others skip it
+        self._sync_lock = threading.Lock()
+
+    async def _call_shared(self, method, *args, default=None):
+        try:
+            return await asyncio.to_thread(getattr(self.shared, method), *args)
+        except self.shared.errors as e:
+            self.shared_errors += 1
+            logger.warning("Shared cache %s failed: %s", method, e)
+            return default
+
+    async def _sync(self):
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            keys = await self._call_shared('poll', default=[])
+        finally:
+            self._sync_lock.release()
+        if keys:
+            self.remote_invalidations += len(keys)
+            self.local.invalidate(*keys)
+
+    async def get(self, key):
+        """Return the cached value, or None on a miss."""
+        if self.shared is None:
+            return self.local.get(key)
+        await self._sync()
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        data = await self._call_shared('get', key)
+        if not data:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        value = orjson.loads(data)
+        self.local.set(key, value, size=len(data))
+        return value
+
+    async def set(self, key, value):
+        data = orjson.dumps(value, default=str)
+        self.local.set(key, value, size=len(data))
+        if self.shared is not None:
+            await self._call_shared('add', key, data, self.ttl)
+
+    async def invalidate(self, *keys):
+        if not keys:
+            return
+        self.local.invalidate(*keys)
+        if self.shared is not None:
+            await self._call_shared('invalidate', keys, self.hold_down)
+
+    async def version(self, name):
+        """
+        Current version token of a group of entries (e.g. one book's review pages).
+
+        Tokens are creation timestamps in nanoseconds, so a missing or expired
+        version is replaced by a newer one and never resurrects old entries.
+        """
+        if self.shared is None:
+            token = self.local.get(name)
+            if token is None:
+                token = time.time_ns()
+                self.local.set(name, token)
+            return token
+        data = await self._call_shared('get', name)
+        if not data:
+            await self._call_shared('add', name, orjson.dumps(time.time_ns()), VERSION_TTL)
+            data = await self._call_shared('get', name)
+        # Without the shared tier nothing can be cached safely under this version
+        return orjson.loads(data) if data else time.time_ns()
+
+    async def bump_version(self, *names):
+        """Move each group to a new version, orphaning every entry built on the old one."""
+        for name in names:
+            token = time.time_ns()
+            if self.shared is None:
+                self.local.set(name, token)
+            else:
+                await self._call_shared('set', name, orjson.dumps(token), VERSION_TTL)
+
+    def settled(self, token):
+        """Whether entries built on this version may be cached, i.e. it is older than the hold-down."""
+        return time.time_ns() - token >= self.hold_down * 1_000_000_000
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        stats = self.local.stats()
+        stats["backend"] = self.shared.name if self.shared is not None else 'local'
+        if self.shared is not None:
+            stats.update({
+                "shared_hits": self.shared_hits,
+                "shared_misses": self.shared_misses,
+                "shared_errors": self.shared_errors,
+                "remote_invalidations": self.remote_invalidations,
+            })
+        return stats
+
+
+def create_cache():
+    """Build the cache described by the CACHE_* and BOOK_CACHE_* settings."""
+    hold_down = max(config.READ_YOUR_WRITES_SECONDS, 1)
+    if config.CACHE_BACKEND == 'local':
+        if config.WEB_CONCURRENCY > 1:
+            logger.warning(
+                "CACHE_BACKEND=local with WEB_CONCURRENCY=%d: workers do not see each other's writes and may "
+                "serve stale books and ETags for up to BOOK_CACHE_TTL=%ds; use CACHE_BACKEND=sqlite or redis",
+                config.WEB_CONCURRENCY, config.BOOK_CACHE_TTL,
+            )
+        shared, local_ttl = None, config.BOOK_CACHE_TTL
+    elif config.CACHE_BACKEND == 'sqlite':
+        shared = SQLiteBackend(config.CACHE_URL or 'book_cache.sqlite3', config.CACHE_SYNC_INTERVAL_MS / 1000)
+        local_ttl = min(config.BOOK_CACHE_TTL, config.CACHE_LOCAL_TTL)
+    elif config.CACHE_BACKEND == 'redis':
+        shared = RedisBackend(config.CACHE_URL or 'redis://localhost:6379/0')
+        local_ttl = min(config.BOOK_CACHE_TTL, config.CACHE_LOCAL_TTL)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {config.CACHE_BACKEND!r}")
+
+    local = LRUCache(
+        max_entries=config.BOOK_CACHE_MAX_ENTRIES,
+        ttl=local_ttl,
+        max_bytes=config.BOOK_CACHE_MAX_BYTES,
+        hold_down=hold_down,
+    )
+    return TieredCache(local, shared, ttl=config.BOOK_CACHE_TTL, hold_down=hold_down)
+
+
+# Single-book, summary and review-page reads
+book_cache = create_cache()
+
+
+async def invalidate_reviews(*book_ids):
+    """Drop the cached ratings and review pages of the given books; call after the write has committed."""
+    await book_cache.invalidate(*(f'summary:{book_id}' for book_id in book_ids))
+    await book_cache.bump_version(*(f'reviews:{book_id}' for book_id in book_ids))
+
+
+async def invalidate_book(*book_ids):
+    """Drop the cached rows and summaries of the given books; call after the write has committed."""
+    await book_cache.invalidate(*(key for book_id in book_ids for key in (f'book:{book_id}', f'summary:{book_id}')))
@@ -0,0 +1,133 @@
+import zlib
+from flask import request
+from app import config
+
+try:
+    import brotli
+except ImportError:  # Optional: br is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd is only offered when installed
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+# Streams whose events must reach the client as they are sent; a compressor would hold them back
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits=31 writes the gzip container rather than raw zlib
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+def available_encodings():
+    """Content codings this process can produce, in order of preference."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+ENCODINGS = available_encodings()
+
+
+def _compressor(encoding):
+    if encoding == 'zstd':
+        return _Zstd(config.COMPRESS_ZSTD_LEVEL)
+    if encoding == 'br':
+        return _Brotli(config.COMPRESS_BROTLI_QUALITY)
+    return _Gzip(config.COMPRESS_GZIP_LEVEL)
+
+
+def negotiate_encoding():
+    """Best coding both sides support according to Accept-Encoding, or None for identity."""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Let the wrapped stream release its database cursor if the client goes away
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    """
+    after_request hook: compress JSON and NDJSON bodies with the client's preferred coding.
+
+    Buffered bodies below COMPRESS_MIN_SIZE are sent as they are, since the framing
+    costs more than it saves. Streamed bodies are compressed chunk by chunk.
+    """
+    if config.COMPRESS_MIN_SIZE < 0:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 304) or request.method == 'HEAD':
+        return response
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+    if not response.mimetype.startswith(COMPRESSIBLE_TYPES) or response.mimetype in UNCOMPRESSED_TYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    streamed = response.is_streamed
+    if not streamed and response.content_length is not None and response.content_length < config.COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    compressor = _compressor(encoding)
+    if streamed:
+        response.response = _compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compressor.compress(response.get_data()) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    # A strong validator names one exact byte sequence, so each coding gets its own
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+    return response
@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime, timezone
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+from app.utils.compression import ENCODINGS
+
+
+def to_version(timestamp):
+    """Microseconds since the epoch, the form version timestamps take in ETags and cache entries."""
+    return int(timestamp.timestamp() * 1_000_000)
+
+
+def make_etag(*parts):
+    """Strong validator for a representation, built from its version and anything else that shapes it."""
+    return hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=16).hexdigest()
+
+
+class Validators:
+    """ETag and Last-Modified of one representation, checked against the request's conditional headers."""
+
+    def __init__(self, etag, version):
+        self.etag = etag
+        # HTTP dates have one second resolution
+        self.last_modified = datetime.fromtimestamp(version // 1_000_000, tz=timezone.utc)
+
+    def _matched_etag(self):
+        """The tag in If-None-Match naming this representation, in any content coding, or None."""
+        # compress_response suffixes the ETag of compressed bodies with their coding
+        for etag in (self.etag, *(f'{self.etag}-{encoding}' for encoding in ENCODINGS)):
+            if request.if_none_match.contains_weak(etag):
+                return etag
+        return None
+
+    def not_modified(self):
+        """Whether If-None-Match (or, without it, If-Modified-Since) says the client's copy is current."""
+        if request.if_none_match:
+            return self._matched_etag() is not None
+        return not is_resource_modified(request.environ, last_modified=self.last_modified)
+
+    def apply(self, response):
+        response.set_etag(self.etag)
+        response.last_modified = self.last_modified
+        return response
+
+    def not_modified_response(self):
+        response = self.apply(Response(status=304))
+        # Echo the tag the client holds, so it matches the coding of its cached body
+        if request.if_none_match:
+            response.set_etag(self._matched_etag() or self.etag)
+        return response
+
+
+def is_conditional():
+    """Whether the request carries validators worth checking before doing any real work."""
+    return bool(request.if_none_match) or request.if_modified_since is not None
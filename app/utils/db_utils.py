@@ -1,18 +1,116 @@
-from app import db
-from sqlalchemy.exc import SQLAlchemyError
+import time
+from contextvars import ContextVar
+from app import async_session, engine, pool_metrics
+from app.utils.replica_router import replica_router, wants_primary
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from contextlib import asynccontextmanager
 
-# Asynchronous context manager for database sessions
+# Reads that need no transaction run in autocommit mode: no BEGIN/COMMIT round trips
+autocommit_engine = engine.execution_options(isolation_level='AUTOCOMMIT')
+# Multi-statement reads that need one consistent snapshot: a single BEGIN READ ONLY
+snapshot_engine = engine.execution_options(postgresql_readonly=True)
+
+# Errors that take a replica out of rotation when it cannot hand out a connection. Pool
+# timeouts are caught first: a busy replica is skipped for that read but stays in rotation.
+REPLICA_FAILURES = (SQLAlchemyError, OSError)
+
+# (session, writable) of the innermost session context of the current request/task, reused by nested scopes
+_current_session = ContextVar('_current_session', default=None)
+
+
+async def _connect(bind, metrics):
+    """Create a session on `bind` and check out its connection up front, measuring the wait on the pool."""
+    session = async_session(bind=bind)
+    started = time.perf_counter()
+    try:
+        await session.connection()
+    except BaseException as e:
+        if isinstance(e, PoolTimeoutError):
+            metrics.timeouts += 1
+        await session.close()
+        raise
+    metrics.record_wait(started)
+    return session
+
+
+async def _connect_for_read(snapshot):
+    """Connect to the next healthy replica, failing over to the primary."""
+    if not wants_primary():
+        for replica in replica_router.candidates():
+            try:
+                return await _connect(replica.bind(snapshot), replica.metrics)
+            except PoolTimeoutError:
+                continue
+            except REPLICA_FAILURES:
+                replica_router.mark_failed(replica)
+    return await _connect(snapshot_engine if snapshot else autocommit_engine, pool_metrics)
+
+
 @asynccontextmanager
-async def db_session():
-    """Provides a transactional scope for database operations."""
-    async with db.session() as session:
-        try:
-            yield session
+async def read_session(snapshot=False):
+    """
+    Provides a session for read-only work; it never commits.
+
+    Sessions go to a read replica when any are configured, falling back to the
+    primary when none is healthy or the client wrote recently (read-your-writes).
+    Statements run in autocommit mode by default, so a single-query read costs one
+    round trip. Pass `snapshot=True` to run every statement in one READ ONLY
+    transaction instead. Inside an active session of the same request that session
+    is reused, so a read nested in a write sees the write's uncommitted changes.
+    """
+    current = _current_session.get()
+    if current is not None:
+        yield current[0]
+        return
+
+    session = await _connect_for_read(snapshot)
+    _current_session.set((session, False))
+    try:
+        yield session
+    finally:
+        _current_session.set(None)
+        await session.close()
+
+
+@asynccontextmanager
+async def write_session():
+    """
+    Provides a transactional scope for database writes, always on the primary.
+
+    The transaction is committed exactly once when the block exits cleanly and is
+    rolled back on any exception (including `abort`). Callers do not commit themselves.
+    """
+    current = _current_session.get()
+    if current is not None and current[1]:
+        yield current[0]
+        return
+
+    session = await _connect(engine, pool_metrics)
+    _current_session.set((session, True))
+    try:
+        yield session
+        if session.in_transaction():
             await session.commit()
-        except SQLAlchemyError as e:
-            await session.rollback()
-            print(f"Error: {e}")
-            raise
-        finally:
-            await session.close()
\ No newline at end of file
+    except SQLAlchemyError as e:
+        await session.rollback()
+        print(f"Error: {e}")
+        raise
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        _current_session.set(current)
+        await session.close()
+
+
+# Kept for callers that predate the read/write split; every db_session is a write session
+db_session = write_session
+
+
+async def copy_records(session, table_name, columns, records):
+    """Write `records` (tuples in `columns` order) with a single COPY through the session's asyncpg connection."""
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table_name, records=records, columns=columns
+    )
@@ -1,18 +1,82 @@
+import math
+import time
 from functools import wraps
-from flask import request, abort
+from inspect import iscoroutinefunction
+from flask import request, abort, g
+from werkzeug.datastructures import WWWAuthenticate
+from app.services.auth_service import authenticate_api_key, authenticate_basic
+from app.utils.cache import LRUCache
+from app.utils.event_loop import worker_loop
+from app.utils.rate_limit import PERIODS, consume
+
+REALM = "Book Management System"
+
+# Addresses whose failed attempts emptied their RATE_LIMIT_AUTH bucket -> monotonic time they may retry.
+# Checked before a credential is hashed; only failures take tokens, so any number of valid users
+# behind one proxy or NAT are never throttled for signing in.
+blocked_clients = LRUCache(max_entries=100_000, ttl=max(PERIODS.values()), max_bytes=100_000)
+
+
+class _Attempt:
+    """The hash check one request makes, throttled per client address by its failures."""
+
+    def __init__(self):
+        self.client = f'addr:{request.remote_addr}'
+        self.verified = False
+
+    async def admit(self):
+        # Refuse before hashing while the address is locked out
+        blocked_until = blocked_clients.get(self.client)
+        if blocked_until is not None and blocked_until > time.monotonic():
+            abort(429, description="Too many failed sign-in attempts; retry later.",
+                  retry_after=math.ceil(blocked_until - time.monotonic()))
+        self.verified = True
+
+    async def failed(self):
+        if not self.verified:
+            return  # Nothing was hashed: no credentials, or a malformed key
+        retry_after = await consume('auth', self.client)
+        if retry_after:
+            blocked_clients.set(self.client, time.monotonic() + retry_after, size=1)
+
+
+async def authenticate_request():
+    """
+    The Principal the current request authenticates as, from an `X-API-Key` header,
+    `Authorization: Bearer <api key>` or HTTP Basic credentials; aborts with 401 otherwise.
+    """
+    auth = request.authorization
+    api_key = request.headers.get('X-API-Key')
+    if api_key is None and auth is not None and auth.type == 'bearer':
+        api_key = auth.token
+
+    principal, attempt = None, _Attempt()
+    if api_key:
+        principal = await authenticate_api_key(api_key, admit=attempt.admit)
+    elif auth is not None and auth.type == 'basic':
+        principal = await authenticate_basic(auth.username or '', auth.password or '', admit=attempt.admit)
+
+    if principal is None:
+        await attempt.failed()
+        # If authentication fails, respond with 401 Unauthorized
+        abort(401, description="Authentication is required.",
+              www_authenticate=WWWAuthenticate('basic', {'realm': REALM}))
+    return principal
 
-# Sample credentials
-USERNAME = "admin"
-PASSWORD = "admin" 
 
 def authenticate(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        # Check for the Authorization header
-        auth = request.authorization
-
-        if not auth or auth.username != USERNAME or auth.password != PASSWORD:
-            # If authentication fails, respond with 401 Unauthorized
-            abort(401, description="Authentication is required.")
-        return f(*args, **kwargs)
-    return decorated
\ No newline at end of file
+    """
+    Require a valid user or API key for a view; the caller is available as `g.principal`.
+    Place it below `@bp.route`, so it wraps the view that is registered.
+    """
+    if iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            g.principal = await authenticate_request()
+            return await f(*args, **kwargs)
+    else:
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            g.principal = worker_loop.run(authenticate_request())
+            return f(*args, **kwargs)
+    return decorated
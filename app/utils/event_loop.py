@@ -0,0 +1,67 @@
+import asyncio
+import atexit
+import contextvars
+import os
+import threading
+
+
+class WorkerLoop:
+    """
+    One long-lived asyncio event loop per worker process, running on a daemon thread.
+
+    Every async view and background coroutine of the process is scheduled on this
+    loop, so asyncpg connections (which are bound to the loop that opened them)
+    stay pooled across requests instead of being torn down with a per-request loop.
+    The loop is (re)created lazily per process id, so it survives pre-forking servers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    @property
+    def loop(self):
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name='worker-loop', daemon=True)
+        thread.start()
+        self._loop, self._pid = loop, os.getpid()
+
+    def run(self, coro):
+        """Run `coro` on the worker loop from a synchronous thread and wait for its result."""
+        if self._in_loop_thread():
+            raise RuntimeError("WorkerLoop.run() called from the worker loop itself; await the coroutine instead")
+        # Tasks snapshot the current context when created, so creating the task inside a
+        # copy of the caller's context carries Flask's request/app context onto the loop.
+        context = contextvars.copy_context()
+        future = asyncio.run_coroutine_threadsafe(_run_in_context(context, coro), self.loop)
+        return future.result()
+
+    def submit(self, coro):
+        """Schedule `coro` on the worker loop without waiting; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _in_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def stop(self):
+        if self._loop is not None and self._pid == os.getpid():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+async def _run_in_context(context, coro):
+    return await context.run(asyncio.ensure_future, coro)
+
+
+worker_loop = WorkerLoop()
+atexit.register(worker_loop.stop)
@@ -0,0 +1,19 @@
+from flask import abort
+
+
+def parse_fields(raw, allowed, always=('id',)):
+    """
+    Parse a comma separated `fields` query parameter into an ordered tuple of column names.
+
+    Fields listed in `always` are included even when not requested, so keyset
+    cursors can still be built from the returned rows.
+    """
+    if not raw:
+        return tuple(allowed)
+
+    requested = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+
+    return tuple(name for name in allowed if name in always or name in requested)
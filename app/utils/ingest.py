@@ -0,0 +1,120 @@
+import asyncio
+import csv
+import io
+from itertools import islice
+import orjson
+from flask import abort
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+CSV_TYPES = ('text/csv',)
+JSON_TYPES = ('application/json',)
+
+# Cap on the per-row errors echoed back, so a bad file can't blow up the response
+MAX_REPORTED_ERRORS = 1000
+
+# Range of a PostgreSQL INTEGER column; one value outside it makes the database reject a whole COPY batch
+INT4_MIN, INT4_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def parse_int4(value):
+    """`value` as an int that fits an INTEGER column, or None when it is not one (booleans included)."""
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value if INT4_MIN <= value <= INT4_MAX else None
+
+
+def iter_records(stream, mimetype):
+    """
+    Yield (row_number, record, error) for every record of a JSON array, NDJSON or CSV body.
+
+    NDJSON and CSV are read line by line from `stream`, so arbitrarily large uploads
+    are never held in memory. A record that cannot be parsed is yielded with
+    `record=None` and a message in `error` instead of aborting the upload.
+    """
+    if mimetype in NDJSON_TYPES:
+        return _iter_ndjson(stream)
+    if mimetype in CSV_TYPES:
+        return _iter_csv(stream)
+    if mimetype in JSON_TYPES:
+        return _iter_json_array(stream)
+    abort(415, description="Body must be a JSON array, NDJSON or CSV")
+
+
+async def read_batches(records, batch_size):
+    """
+    Pull lists of up to `batch_size` records from a blocking `iter_records` iterator.
+
+    Reading the upload blocks on the client's socket, so each batch is read on a
+    thread to keep the shared event loop free for other requests.
+    """
+    records = iter(records)
+    while True:
+        batch = await asyncio.to_thread(list, islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _iter_ndjson(stream):
+    row_number = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        row_number += 1
+        try:
+            record = orjson.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def _iter_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    for row_number, row in enumerate(reader, start=1):
+        # Empty CSV cells mean "no value", like a missing JSON key
+        yield row_number, {key: value for key, value in row.items() if key and value != ''}, None
+
+
+def _iter_json_array(stream):
+    try:
+        records = orjson.loads(stream.read())
+    except ValueError as e:
+        abort(400, description=f"Invalid JSON: {e}")
+    if not isinstance(records, list):
+        abort(400, description="Body must be a JSON array")
+    for row_number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            yield row_number, None, "Each element must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+class ImportReport:
+    """Accumulates the outcome of a bulk import."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": error})
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
@@ -0,0 +1,43 @@
+import orjson
+from flask.json.provider import JSONProvider, _default
+
+# Dates keep Flask's HTTP-date format, so switching encoders does not change any response
+_BASE_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider backed by orjson, used by `jsonify` and `request.get_json`.
+
+    `response` writes orjson's bytes straight into the response instead of going
+    through a str, and keys are emitted in dict order unless `sort_keys` is set.
+    """
+
+    sort_keys = False
+    compact = None
+    mimetype = 'application/json'
+
+    def _options(self, indent=False):
+        options = _BASE_OPTIONS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options(indent=bool(kwargs.get('indent')))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def dumps_bytes(obj):
+    """Encode one value the way responses do, for handlers that build their own bodies (e.g. streams)."""
+    return orjson.dumps(obj, default=_default, option=_BASE_OPTIONS)
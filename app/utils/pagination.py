@@ -0,0 +1,85 @@
+import base64
+import json
+from flask import abort
+from sqlalchemy import and_, or_, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(*values):
+    """Encode the keyset values of the last row of a page into an opaque cursor."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by `encode_cursor`, aborting with 400 if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        abort(400, description="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        abort(400, description="Invalid cursor")
+    return values
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse the `limit` query parameter, clamping it to `maximum`."""
+    if raw is None:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        abort(400, description="limit must be an integer")
+    if limit < 1:
+        abort(400, description="limit must be a positive integer")
+    return min(limit, maximum)
+
+
+def parse_sort(raw, sortable, default='id'):
+    """Parse `sort=<field>` / `sort=-<field>` into the column name and whether it is descending."""
+    raw = raw or default
+    name = raw[1:] if raw.startswith('-') else raw
+    if name not in sortable:
+        abort(400, description=f"sort must be one of: {', '.join(sortable)} (prefix with - for descending)")
+    return name, raw.startswith('-')
+
+
+def order_by_keyset(query, column, tiebreak, descending=False):
+    """
+    Order `query` by `column` with `tiebreak` as a unique secondary key.
+
+    NULLs keep PostgreSQL's default placement (sorted as the largest value), so
+    both directions are a plain forward or backward scan of a (column, tiebreak) index.
+    """
+    if column is tiebreak:
+        return query.order_by(column.desc() if descending else column.asc())
+    if descending:
+        return query.order_by(column.desc(), tiebreak.desc())
+    return query.order_by(column.asc(), tiebreak.asc())
+
+
+def keyset_after(query, column, tiebreak, last_value, last_tiebreak, descending=False):
+    """
+    Restrict `query` to the rows that follow (`last_value`, `last_tiebreak`) in the
+    ordering produced by `order_by_keyset`, so each page is a single index range scan.
+    """
+    def after(left, right):
+        return left < right if descending else left > right
+
+    if column is tiebreak:
+        return query.where(after(column, last_tiebreak))
+
+    if last_value is None:
+        # Inside the block of NULLs: last when ascending, first when descending
+        condition = and_(column.is_(None), after(tiebreak, last_tiebreak))
+        if descending:
+            condition = or_(condition, column.is_not(None))
+        return query.where(condition)
+
+    condition = after(tuple_(column, tiebreak), tuple_(last_value, last_tiebreak))
+    if column.nullable and not descending:
+        condition = or_(condition, column.is_(None))
+    return query.where(condition)
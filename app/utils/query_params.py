@@ -0,0 +1,15 @@
+from flask import abort
+
+
+def parse_int_arg(args, name, minimum=None, maximum=None):
+    """Parse an optional integer query parameter, aborting with 400 if it is malformed or out of range."""
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400, description=f"{name} must be an integer")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        abort(400, description=f"{name} must be between {minimum} and {maximum}")
+    return value
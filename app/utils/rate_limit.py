@@ -0,0 +1,269 @@
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from functools import wraps
+from inspect import iscoroutinefunction
+from flask import abort, g, request
+from app import config
+from app.utils.event_loop import worker_loop
+
+try:
+    import redis
+except ImportError:  # Only needed for RATE_LIMIT_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+# `limit` requests per `period` seconds, with bursts of up to `limit` requests
+Rate = namedtuple('Rate', ['limit', 'period'])
+
+# Named limits shared by the routes they guard: (per client, per route across all clients)
+LIMITS = {
+    'summary': (config.RATE_LIMIT_SUMMARY, config.RATE_LIMIT_SUMMARY_TOTAL),
+    'books': (config.RATE_LIMIT_BOOKS, config.RATE_LIMIT_BOOKS_TOTAL),
+    'bulk': (config.RATE_LIMIT_BULK, config.RATE_LIMIT_BULK_TOTAL),
+    'auth': (config.RATE_LIMIT_AUTH, config.RATE_LIMIT_AUTH_TOTAL),
+}
+
+# Atomic token bucket: refills by elapsed time, takes one token if it can and returns the
+# seconds until one is available otherwise. Redis' clock is used so every worker agrees.
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or limit
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(limit, tokens + (now - updated) * limit / period)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) * period / limit
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(period * 1000))
+return tostring(retry_after)
+"""
+
+
+def parse_rate(text):
+    """Parse "<requests>/<second|minute|hour>" (e.g. "10/minute"); None when empty, i.e. unlimited."""
+    if not text or not text.strip():
+        return None
+    count, _, unit = text.strip().partition('/')
+    try:
+        limit, period = int(count), PERIODS[unit.strip().rstrip('s') or 'second']
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate {text!r}; expected e.g. '10/minute'") from None
+    if limit <= 0:
+        raise ValueError(f"Invalid rate {text!r}; the request count must be positive")
+    return Rate(limit, period)
+
+
+class MemoryStore:
+    """Token buckets of this worker process; each worker enforces the limits on its own."""
+
+    name = 'memory'
+    blocking = False
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate):
+        """Take one token from the bucket at `key`; returns 0 if admitted, else seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate.limit, now))
+            tokens = min(rate.limit, tokens + (now - updated) * rate.limit / rate.period)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) * rate.period / rate.limit
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        # A bucket idle for a full period has refilled, so forgetting it changes nothing;
+        # the longest period is the safe bound without knowing each key's rate
+        horizon = max(PERIODS.values())
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < horizon}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisStore:
+    """Token buckets in Redis, shared by every worker; the limits hold across the deployment."""
+
+    name = 'redis'
+    prefix = 'bms:ratelimit:'
+    # Each take is a network round trip; callers on the event loop run it on a thread
+    blocking = True
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package (pip install redis)")
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, key, rate):
+        try:
+            return float(self._script(keys=[self.prefix + key], args=[rate.limit, rate.period]))
+        except redis.RedisError as e:
+            # Fail open: an unreachable store must not take the API down with it
+            logger.warning("Rate limit store unavailable, admitting request: %s", e)
+            return 0.0
+
+
+class RateLimiter:
+    """Checks requests against the named LIMITS and counts rejections."""
+
+    def __init__(self, store):
+        self.store = store
+        self.rejected = {}
+
+    def check(self, name, client, client_rate, route_rate):
+        """Seconds the client should wait before retrying, or 0 if the request is admitted."""
+        if client_rate is not None:
+            retry_after = self.store.take(f'{name}:client:{client}', client_rate)
+            if retry_after:
+                return self._reject(name, retry_after)
+        if route_rate is not None:
+            retry_after = self.store.take(f'{name}:route', route_rate)
+            if retry_after:
+                return self._reject(name, retry_after)
+        return 0.0
+
+    def _reject(self, name, retry_after):
+        self.rejected[name] = self.rejected.get(name, 0) + 1
+        return retry_after
+
+    def snapshot(self):
+        return {"store": self.store.name, "rejected": dict(self.rejected)}
+
+
+class ConcurrencyLimit:
+    """
+    Caps the calls in flight at once in this process. `async with` waits for a slot;
+    request handlers check `busy` first and turn clients away instead of queueing them.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+        self._loop = None
+
+    @property
+    def busy(self):
+        return self.active + self.waiting >= self.limit
+
+    async def __aenter__(self):
+        # Semaphores belong to one event loop; the app has one per process, CLI commands their own
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self):
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting, "rejected": self.rejected}
+
+
+def create_store():
+    """Build the store described by RATE_LIMIT_BACKEND/RATE_LIMIT_URL."""
+    if config.RATE_LIMIT_BACKEND == 'memory':
+        return MemoryStore()
+    if config.RATE_LIMIT_BACKEND == 'redis':
+        return RedisStore(config.RATE_LIMIT_URL or config.CACHE_URL or 'redis://localhost:6379/0')
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {config.RATE_LIMIT_BACKEND!r}")
+
+
+rate_limiter = RateLimiter(create_store())
+
+
+def client_identity():
+    """The credential a request's per-client buckets are keyed by: its authenticated user, else its address."""
+    principal = g.get('principal')
+    if principal is not None:
+        return f'user:{principal.user_id}'
+    return f'addr:{request.remote_addr}'
+
+
+@functools.cache
+def limit_rates(name):
+    """The parsed (per client, per route) rates of a named limit."""
+    return tuple(parse_rate(rate) for rate in LIMITS[name])
+
+
+async def consume(name, client):
+    """Take a token from `client`'s and the route's buckets of a named limit; 0 if there was one, else seconds until there is."""
+    if not config.RATE_LIMIT_ENABLED:
+        return 0.0
+    if rate_limiter.store.blocking:
+        # A slow Redis must delay only this request, not every request on the worker loop
+        return await asyncio.to_thread(rate_limiter.check, name, client, *limit_rates(name))
+    return rate_limiter.check(name, client, *limit_rates(name))
+
+
+async def enforce(name, client):
+    """Like `consume`, but abort with 429 and Retry-After when either bucket is empty."""
+    retry_after = await consume(name, client)
+    if retry_after:
+        abort(429, description="Too many requests; slow down and retry later.",
+              retry_after=math.ceil(retry_after))
+
+
+def rate_limit(name):
+    """
+    Apply the named token-bucket limits to a view, answering 429 with Retry-After once
+    either the client's or the route's bucket is empty. Place it below `@authenticate`.
+    """
+    limit_rates(name)  # Malformed rates fail at import, not on the first request
+
+    def decorator(f):
+        if iscoroutinefunction(f):
+            @wraps(f)
+            async def decorated(*args, **kwargs):
+                await enforce(name, client_identity())
+                return await f(*args, **kwargs)
+        else:
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                worker_loop.run(enforce(name, client_identity()))
+                return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
+def reject_when_busy(limit, retry_after):
+    """Answer 503 with Retry-After instead of queueing when every slot of `limit` is taken."""
+    if limit.busy:
+        limit.rejected += 1
+        abort(503, description="The service is at capacity; retry later.", retry_after=retry_after)
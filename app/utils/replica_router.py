@@ -0,0 +1,94 @@
+import itertools
+import math
+import time
+from flask import has_request_context, request
+from app import config, replica_engines
+from app.utils.pool_metrics import PoolMetrics
+
+# Cookie set on successful writes so the client's next reads can be pinned to the primary
+LAST_WRITE_COOKIE = 'bms_last_write'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class Replica:
+    """A read replica engine with its read-only binds, pool metrics and health state."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.autocommit = engine.execution_options(isolation_level='AUTOCOMMIT')
+        self.snapshot = engine.execution_options(postgresql_readonly=True)
+        self.metrics = PoolMetrics()
+        self.metrics.attach(engine)
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.unhealthy_until
+
+    def bind(self, snapshot):
+        return self.snapshot if snapshot else self.autocommit
+
+
+class ReplicaRouter:
+    """Round-robins read-only sessions over healthy replicas, skipping failed ones for a cooldown."""
+
+    def __init__(self, engines, cooldown):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.cooldown = cooldown
+        self._counter = itertools.count()
+
+    def candidates(self):
+        """Healthy replicas in round-robin order; empty when reads should go to the primary."""
+        if not self.replicas:
+            return []
+        start = next(self._counter) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.healthy]
+
+    def mark_failed(self, replica):
+        replica.failures += 1
+        replica.unhealthy_until = time.monotonic() + self.cooldown
+
+    def snapshot(self):
+        return [
+            {
+                "host": replica.engine.url.host,
+                "healthy": replica.healthy,
+                "failures": replica.failures,
+                "pool": replica.metrics.snapshot(replica.engine),
+            }
+            for replica in self.replicas
+        ]
+
+
+def wants_primary():
+    """True when the current request comes from a client that wrote within READ_YOUR_WRITES_SECONDS."""
+    if not has_request_context():
+        return False
+    try:
+        last_write = float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return False
+    return time.time() - last_write < config.READ_YOUR_WRITES_SECONDS
+
+
+def remember_write(response):
+    """after_request hook: stamp successful writes so the client reads its own writes from the primary."""
+    if (
+        replica_router.replicas
+        and config.READ_YOUR_WRITES_SECONDS > 0
+        and request.method in WRITE_METHODS
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=math.ceil(config.READ_YOUR_WRITES_SECONDS),
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+replica_router = ReplicaRouter(replica_engines, config.REPLICA_FAILURE_COOLDOWN)
@@ -0,0 +1,20 @@
+from app.utils.event_loop import worker_loop
+
+
+def iterate_async(agen_factory):
+    """
+    Drive an async generator from a synchronous WSGI response iterator.
+
+    Flask iterates streamed bodies after the view has returned, from the server's
+    request thread, so each step is scheduled on the process-wide worker loop where
+    the database connections live.
+    """
+    agen = agen_factory()
+    try:
+        while True:
+            try:
+                yield worker_loop.run(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        worker_loop.run(agen.aclose())
@@ -0,0 +1,50 @@
+"""
+ASGI entry point.
+
+    uvicorn asgi:app --workers 4
+
+Concurrency model, per worker process:
+
+- The ASGI server (uvicorn) owns the sockets and parses HTTP on its own event loop.
+- a2wsgi hands each request to a pool of WSGI_THREADS threads running the Flask app,
+  streaming request and response bodies instead of buffering them.
+- Every async view is scheduled from its request thread onto one long-lived worker
+  event loop (app.utils.event_loop.worker_loop), so the asyncpg connection pool is
+  shared by all requests of the process and up to WSGI_THREADS requests wait on the
+  database concurrently.
+- Model calls go through a pooled async httpx client on the worker loop; blocking
+  work (reading uploads) runs on threads via asyncio.to_thread so it never stalls it.
+- JOB_CONCURRENCY background job runners (summary generation) also live on the
+  worker loop, so slow jobs never occupy a request thread.
+
+Scale out by adding worker processes; each has its own loop and connection pool.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import create_app
+from app.services.jobs import job_runner
+from app.utils.event_loop import worker_loop
+
+# Request threads per worker process: the number of requests that can be in flight at once
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', '32'))
+
+
+def terminate_input(wsgi_app):
+    """
+    Mark wsgi.input as ending with the request body. a2wsgi streams the body but does not
+    set wsgi.input_terminated, so werkzeug would read a chunked upload (no Content-Length)
+    as empty and the bulk imports would silently insert nothing.
+    """
+    def app(environ, start_response):
+        environ['wsgi.input_terminated'] = True
+        return wsgi_app(environ, start_response)
+    return app
+
+
+flask_app = create_app()
+app = WSGIMiddleware(terminate_input(flask_app), workers=WSGI_THREADS)
+
+# Pick up jobs queued before this worker started (or left behind by one that died)
+worker_loop.submit(job_runner.serve())
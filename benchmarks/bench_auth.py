@@ -0,0 +1,84 @@
+"""
+Measure the per-request cost of authentication.
+
+Compares the old plain-text comparison with verifying a scrypt hash on every request
+(a credential cache miss) and with the verified-credential cache, both for the bare
+check and for `authenticate_request` parsing a real Authorization header. Runs against
+DATABASE_URL; a scratch user is created and deleted afterwards.
+
+    python -m benchmarks.bench_auth --runs 2000
+"""
+import argparse
+import asyncio
+import base64
+import secrets
+import statistics
+import time
+
+from sqlalchemy import delete
+
+from app import create_app, engine
+from app.models import User
+from app.services.auth_service import authenticate_basic, create_user, credential_cache
+from app.utils.db_utils import write_session
+from app.utils.decorators.auth import authenticate_request
+
+# Cache misses pay the full hash; a few hundred samples are plenty
+MAX_MISS_RUNS = 200
+
+
+async def measure(request, runs):
+    for _ in range(min(runs, 20)):
+        await request()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await request()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def main(runs):
+    app = create_app()
+    username, password = f"bench-auth-{secrets.token_hex(4)}", secrets.token_urlsafe(16)
+    await create_user(username, password)
+    header = 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+    async def plain_compare():
+        # The old check: hard-coded credentials compared with !=
+        assert not (username != username or password != password)
+
+    async def uncached():
+        credential_cache.clear()
+        assert await authenticate_basic(username, password)
+
+    async def cached():
+        assert await authenticate_basic(username, password)
+
+    async def cached_request():
+        with app.test_request_context('/books', headers={'Authorization': header}):
+            await authenticate_request()
+
+    cases = {
+        'plain != (old, insecure)': (plain_compare, runs),
+        'scrypt verify (cache miss)': (uncached, min(runs, MAX_MISS_RUNS)),
+        'cached credential': (cached, runs),
+        'authenticate_request, cached': (cached_request, runs),
+    }
+    print(f"{'case':<32}{'runs':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    try:
+        for name, (request, case_runs) in cases.items():
+            p50, p99 = await measure(request, case_runs)
+            print(f"{name:<32}{case_runs:>8}{p50:>10.3f}{p99:>10.3f}")
+    finally:
+        async with write_session() as session:
+            await session.execute(delete(User).where(User.username == username))
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
@@ -0,0 +1,108 @@
+"""
+Benchmark the filtered/sorted GET /books queries with and without the `books` indexes.
+
+Loads ROWS synthetic books into a scratch copy of the `books` table in its own
+schema (the real table is never touched), times every query shape served by
+`get_books` first without indexes and then with the indexes declared on the
+`Book` model, and prints p50/p99 latencies.
+
+    python -m benchmarks.bench_book_filters --rows 1000000 --runs 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import MetaData, text
+
+from app import engine
+from app.models import Book
+from app.utils.pagination import order_by_keyset, keyset_after
+
+SCHEMA = 'bench'
+PAGE_SIZE = 100
+
+
+def build_queries(table):
+    c = table.c
+
+    def page(query, column, descending=False):
+        return order_by_keyset(query, column, c.id, descending).limit(PAGE_SIZE + 1)
+
+    base = table.select()
+    return {
+        'author =': page(base.where(c.author == 'Author 4242'), c.id),
+        'genre = and year range': page(
+            base.where(c.genre == 'Genre 7', c.year_published.between(1950, 1960)), c.id
+        ),
+        'year range': page(base.where(c.year_published.between(1990, 1991)), c.id),
+        'sort title': page(base, c.title),
+        'sort -year_published, deep page': keyset_after(
+            page(base, c.year_published, descending=True), c.year_published, c.id, 1900, 500000, True
+        ),
+    }
+
+
+async def load(conn, table, rows):
+    await conn.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+    await conn.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+    await conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    await conn.run_sync(lambda sync_conn: table.create(sync_conn))
+    for index in table.indexes:
+        await conn.execute(text(f'DROP INDEX {SCHEMA}.{index.name}'))
+    await conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.books (title, author, genre, year_published, summary)
+        SELECT 'Title ' || md5(g::text),
+               'Author ' || (g % 10000),
+               'Genre ' || (g % 40),
+               1800 + (g % 225),
+               repeat('summary ', 20)
+        FROM generate_series(1, :rows) AS g
+    """), {'rows': rows})
+    await conn.execute(text(f'ANALYZE {SCHEMA}.books'))
+
+
+async def time_queries(conn, queries, runs):
+    results = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            await conn.execute(query)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        results[name] = (statistics.median(samples), samples[int(len(samples) * 0.99) - 1])
+    return results
+
+
+async def main(rows, runs):
+    table = Book.__table__.to_metadata(MetaData(), schema=SCHEMA)
+    queries = build_queries(table)
+
+    async with engine.begin() as conn:
+        await load(conn, table, rows)
+    async with engine.connect() as conn:
+        without = await time_queries(conn, queries, runs)
+    async with engine.begin() as conn:
+        for index in table.indexes:
+            await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn))
+        await conn.execute(text(f'ANALYZE {SCHEMA}.books'))
+    async with engine.connect() as conn:
+        with_indexes = await time_queries(conn, queries, runs)
+    async with engine.begin() as conn:
+        await conn.execute(text(f'DROP SCHEMA {SCHEMA} CASCADE'))
+    await engine.dispose()
+
+    print(f"{rows} rows, {runs} runs per query (ms)")
+    print(f"{'query':<34}{'p50 no idx':>12}{'p99 no idx':>12}{'p50 idx':>12}{'p99 idx':>12}")
+    for name in queries:
+        print(f"{name:<34}{without[name][0]:>12.2f}{without[name][1]:>12.2f}"
+              f"{with_indexes[name][0]:>12.2f}{with_indexes[name][1]:>12.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.runs))
@@ -0,0 +1,89 @@
+"""
+Compare the ways a page of books can be turned into response dicts.
+
+Builds ROWS synthetic rows in memory (no database needed) and times, per strategy,
+serializing all of them: hydrating `Book` objects and reading their attributes (the
+original route code), `Row._asdict()`, a per-route dict comprehension over the
+selected fields, and `book_schema.dump_many`. Rows are the same `Row` objects a
+column-only select returns, so only the serialization step differs.
+
+    python -m benchmarks.bench_serializers --rows 100000 --runs 5
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy.engine.result import result_tuple
+
+from app.models import Book
+from app.schemas import book_schema
+
+SPARSE_FIELDS = ('id', 'title', 'author')
+
+
+def make_rows(count, fields):
+    make_row = result_tuple(list(fields))
+    full = {
+        'id': 0,
+        'title': 'Title',
+        'author': 'Author',
+        'genre': 'Genre',
+        'year_published': 1999,
+        'summary': 'A summary long enough to look like a real one. ' * 4,
+    }
+    return [make_row([i if name == 'id' else full[name] for name in fields]) for i in range(count)]
+
+
+def orm_objects(rows, fields):
+    # Transient instances: a lower bound on identity-map hydration, which also tracks state
+    books = [Book(**row._mapping) for row in rows]
+    return [{name: getattr(book, name) for name in fields} for book in books]
+
+
+def asdict(rows, fields):
+    return [row._asdict() for row in rows]
+
+
+def comprehension(rows, fields):
+    return [{name: getattr(row, name) for name in fields} for row in rows]
+
+
+def schema(rows, fields):
+    return book_schema.dump_many(rows, fields)
+
+
+def measure(strategy, rows, fields, runs):
+    strategy(rows[:1000], fields)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        strategy(rows, fields)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main(row_count, runs):
+    strategies = {
+        'ORM objects + attributes': orm_objects,
+        'Row._asdict()': asdict,
+        'dict comprehension': comprehension,
+        'book_schema.dump_many': schema,
+    }
+    for fields in (book_schema.fields, SPARSE_FIELDS):
+        rows = make_rows(row_count, fields)
+        expected = schema(rows, fields)
+        print(f"{row_count} rows, fields={','.join(fields)} (ms)")
+        print(f"{'strategy':<28}{'median':>10}{'max':>10}")
+        for name, strategy in strategies.items():
+            assert strategy(rows[:10], fields) == expected[:10], name
+            median, worst = measure(strategy, rows, fields, runs)
+            print(f"{name:<28}{median:>10.1f}{worst:>10.1f}")
+        print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.runs)
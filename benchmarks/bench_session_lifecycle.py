@@ -0,0 +1,103 @@
+"""
+Compare per-request database latency of the old and new session lifecycles.
+
+"legacy" reproduces the previous db_session: every request opens a transaction and
+commits, and write routes commit a second time themselves. The new read_session
+runs reads in autocommit mode (or one READ ONLY transaction for snapshot reads)
+and write_session commits once. Runs against DATABASE_URL; writes only touch a
+scratch table that is dropped afterwards.
+
+    python -m benchmarks.bench_session_lifecycle --runs 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+from app import async_session, engine
+from app.utils.db_utils import read_session, write_session
+
+READ = text("SELECT 1")
+WRITE = text("UPDATE bench_session_counter SET n = n + 1")
+
+
+@asynccontextmanager
+async def legacy_session():
+    async with async_session() as session:
+        try:
+            yield session
+            await session.commit()
+        finally:
+            await session.close()
+
+
+async def legacy_read():
+    async with legacy_session() as session:
+        await session.execute(READ)
+
+
+async def new_read():
+    async with read_session() as session:
+        await session.execute(READ)
+
+
+async def snapshot_read():
+    async with read_session(snapshot=True) as session:
+        await session.execute(READ)
+
+
+async def legacy_write():
+    async with legacy_session() as session:
+        await session.execute(WRITE)
+        await session.commit()
+
+
+async def new_write():
+    async with write_session() as session:
+        await session.execute(WRITE)
+
+
+async def measure(request, runs):
+    for _ in range(min(runs, 50)):
+        await request()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await request()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def main(runs):
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS bench_session_counter (n BIGINT NOT NULL)"))
+        await conn.execute(text("INSERT INTO bench_session_counter SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM bench_session_counter)"))
+
+    cases = {
+        'read  legacy (BEGIN/SELECT/COMMIT)': legacy_read,
+        'read  read_session (autocommit)': new_read,
+        'read  read_session(snapshot=True)': snapshot_read,
+        'write legacy (double commit)': legacy_write,
+        'write write_session': new_write,
+    }
+    print(f"{runs} requests per case (ms)")
+    print(f"{'case':<38}{'p50':>10}{'p99':>10}")
+    try:
+        for name, request in cases.items():
+            p50, p99 = await measure(request, runs)
+            print(f"{name:<38}{p50:>10.3f}{p99:>10.3f}")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE bench_session_counter"))
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
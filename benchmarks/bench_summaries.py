@@ -0,0 +1,71 @@
+"""
+Load-test summary generation against the fake LLM backend, without a GPU or model server.
+
+Runs --requests summaries, --concurrency at a time, through the same map-reduce code
+the API and jobs use, with the fake backend simulating the model's latency. Reports
+throughput and latency of whole summaries, and the time to the first streamed fragment.
+No database is touched: the summary cache is bypassed.
+
+    python -m benchmarks.bench_summaries --requests 200 --concurrency 16 --latency-ms 300 --token-latency-ms 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services import llama_service, summarizer
+from app.services.llm_backend import FakeBackend
+
+PARAGRAPH = "The committee met again to weigh the evidence, and each member argued for a different reading. "
+
+
+async def measure(request, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def run_one():
+        async with semaphore:
+            start = time.perf_counter()
+            await request()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return requests / elapsed, statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def main(args):
+    llama_service.backend = FakeBackend(args.latency_ms, args.token_latency_ms)
+    # Paragraphs of ~25 tokens, enough of them for the requested content size
+    content = "\n\n".join([PARAGRAPH * 4] * max(1, args.content_tokens // 100))
+
+    async def whole():
+        await summarizer.summarize(content)
+
+    async def first_fragment():
+        fragments = summarizer.stream_summary(content)
+        await fragments.__anext__()
+        await fragments.aclose()
+
+    cases = {
+        'summarize (full response)': whole,
+        'stream (first fragment)': first_fragment,
+    }
+    print(f"{args.requests} summaries of ~{args.content_tokens} tokens, {args.concurrency} at a time")
+    print(f"{'case':<30}{'per s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, request in cases.items():
+        throughput, p50, p99 = await measure(request, args.requests, args.concurrency)
+        print(f"{name:<30}{throughput:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--content-tokens', type=int, default=1000,
+                        help='Size of each summarized text; above SUMMARY_CHUNK_TOKENS it is map-reduced')
+    parser.add_argument('--latency-ms', type=int, default=300, help='Simulated wait before the first token')
+    parser.add_argument('--token-latency-ms', type=int, default=20, help='Simulated wait between tokens')
+    asyncio.run(main(parser.parse_args()))
@@ -1,15 +1,103 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE books(
     id SERIAL PRIMARY KEY,
     title VARCHAR(255),
     author VARCHAR(255),
     genre VARCHAR(255),
     year_published INT,
-    summary TEXT
+    summary TEXT,
+    -- Rating aggregates maintained by the review write paths (see `flask reconcile-ratings`)
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    -- Versions behind the ETag/Last-Modified validators, maintained by books_touch below
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    reviews_updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'C')
+    ) STORED
 );
 
+-- Indexes backing the filters and sorts of GET /books
+CREATE INDEX ix_books_author_id ON books (author, id);
+CREATE INDEX ix_books_title_id ON books (title, id);
+CREATE INDEX ix_books_year_published_id ON books (year_published, id);
+CREATE INDEX ix_books_genre_year_published_id ON books (genre, year_published, id);
+
+-- Indexes backing GET /books/search: ranked full-text search and fuzzy author matching
+CREATE INDEX ix_books_search_vector ON books USING GIN (search_vector);
+CREATE INDEX ix_books_author_trgm ON books USING GIN (author gin_trgm_ops);
+
+-- Bump updated_at when a book's own columns change, reviews_updated_at when its rating aggregates do
+CREATE OR REPLACE FUNCTION books_touch() RETURNS trigger AS $$
+BEGIN
+    IF (NEW.title, NEW.author, NEW.genre, NEW.year_published, NEW.summary)
+       IS DISTINCT FROM (OLD.title, OLD.author, OLD.genre, OLD.year_published, OLD.summary) THEN
+        NEW.updated_at := clock_timestamp();
+    END IF;
+    IF (NEW.review_count, NEW.rating_sum) IS DISTINCT FROM (OLD.review_count, OLD.rating_sum) THEN
+        NEW.reviews_updated_at := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER books_touch BEFORE UPDATE ON books FOR EACH ROW EXECUTE FUNCTION books_touch();
+
 CREATE TABLE reviews(
     id SERIAL PRIMARY KEY,
     book_id INT REFERENCES books(id),
     review_text VARCHAR(255),
     rating INT
-);
\ No newline at end of file
+);
+
+-- Indexes backing GET /books/<id>/reviews and the rating reconciliation
+CREATE INDEX ix_reviews_book_id_id ON reviews (book_id, id);
+CREATE INDEX ix_reviews_book_id_rating_id ON reviews (book_id, rating, id);
+
+-- Background jobs (summary generation); runners claim rows with FOR UPDATE SKIP LOCKED
+CREATE TABLE jobs(
+    id UUID PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL,
+    dedupe_key VARCHAR(200),
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    result JSONB,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX ix_jobs_pending ON jobs (created_at) WHERE status IN ('queued', 'running');
+-- Identical requests share one pending job
+CREATE UNIQUE INDEX ux_jobs_dedupe_key_pending ON jobs (dedupe_key) WHERE status IN ('queued', 'running');
+
+-- Generated summaries keyed by a hash of the model, prompts and normalized content
+CREATE TABLE summary_cache(
+    content_hash CHAR(64) PRIMARY KEY,
+    model VARCHAR(100) NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- API users and keys; passwords and key secrets are stored as salted scrypt hashes only
+CREATE TABLE users(
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(150) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE api_keys(
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    prefix VARCHAR(16) NOT NULL UNIQUE,
+    key_hash VARCHAR(255) NOT NULL,
+    name VARCHAR(100),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    revoked_at TIMESTAMPTZ
+);
@@ -1,7 +1,22 @@
-from app import create_app  # Import the create_app function
+import argparse
+import os
+
+from app import config, create_app  # Import the create_app function
 
 # Create the Flask app instance
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Run the Book Management System')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=config.WEB_CONCURRENCY,
+                        help='Worker processes, each with its own event loop and connection pool')
+    parser.add_argument('--dev', action='store_true', help='Use the Flask debug server with auto-reload')
+    args = parser.parse_args()
+
+    if args.dev:
+        app.run(debug=True, host=args.host, port=args.port)
+    else:
+        import uvicorn
+        uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.workers)